@@ -1,19 +1,64 @@
 import os
-import shutil
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status, Response
-from fastapi.responses import FileResponse
-from typing import List
-from sqlalchemy import select as sqlalchemy_select
+import hashlib
+import logging
+import zipfile
+from datetime import datetime
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status, Response, Header
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
+from sqlalchemy import select as sqlalchemy_select, update as sqlalchemy_update
 from sqlmodel import Session
 from app.models.attachment import Attachment
 from app.models.ticket import Ticket
+from app.models.archive import ArchivedTicket, ArchivedAttachment
 from app.api.users import get_current_user
 from app.core.db import get_session
+from app.core.cache import cache, ticket_key
+from app.services.thumbnails import (
+    SIZES as THUMBNAIL_SIZES, attachment_hash, ensure_thumbnail, schedule_thumbnails, remove_thumbnails
+)
 
 UPLOAD_ROOT = "attachments"  # katalog na pliki
+ZIP_CHUNK_SIZE = 64 * 1024
+COPY_CHUNK_SIZE = 1024 * 1024
+# Miniatura zależy tylko od niezmiennej treści załącznika - przeglądarka może ją trzymać bez rewalidacji
+THUMBNAIL_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+# Formaty już skompresowane - w ZIP-ie zapisywane bez ponownej kompresji
+COMPRESSED_EXTENSIONS = {
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".zst",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".mp3", ".mp4", ".mov", ".avi", ".mkv", ".webm",
+    ".pdf", ".docx", ".xlsx", ".pptx", ".odt", ".ods",
+}
+
+logger = logging.getLogger("app.error")
 
 router = APIRouter(prefix="/tickets", tags=["attachments"])
 
+def _copy_with_hash(source, file_path: str) -> str:
+    # Hash treści liczony przy zapisie - miniatury nie muszą ponownie czytać pliku
+    digest = hashlib.sha256()
+    with open(file_path, "wb") as out_file:
+        for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            out_file.write(chunk)
+    return digest.hexdigest()
+
+def _save_attachments(session: Session, ticket_id: int, attachments: List[Attachment]):
+    session.add_all(attachments)
+    session.exec(
+        sqlalchemy_update(Ticket)
+        .where(Ticket.id == ticket_id)
+        .values(
+            attachment_count=Ticket.attachment_count + len(attachments),
+            last_activity_at=datetime.utcnow(),
+            version=Ticket.version + 1
+        )
+    )
+    session.commit()
+
 @router.post("/{ticket_id}/attachments", status_code=201)
 async def upload_attachments(
     ticket_id: int,
@@ -21,8 +66,9 @@ async def upload_attachments(
     user=Depends(get_current_user),
     session: Session = Depends(get_session)
 ):
+    # Endpoint jest async (UploadFile), więc baza, hash i zapis na dysk idą do puli wątków
     # Sprawdź czy ticket istnieje i czy user ma prawo do niego
-    ticket = session.get(Ticket, ticket_id)
+    ticket = await run_in_threadpool(session.get, Ticket, ticket_id)
     if not ticket:
         raise HTTPException(status_code=404, detail="Not found")
     if user.role == "client" and ticket.created_by != user.id:
@@ -39,33 +85,45 @@ async def upload_attachments(
         if os.path.exists(file_path):
             raise HTTPException(status_code=409, detail=f"File {filename} already exists")
 
-        with open(file_path, "wb") as out_file:
-            shutil.copyfileobj(upload.file, out_file)
+        content_hash = await run_in_threadpool(_copy_with_hash, upload.file, file_path)
 
         att = Attachment(
             ticket_id=ticket_id,
             filename=filename,
             content_type=upload.content_type,
-            path=file_path
+            path=file_path,
+            content_hash=content_hash
         )
-        session.add(att)
-        saved_attachments.append(filename)
-    session.commit()
-    return {"msg": "Pliki zapisane", "files": saved_attachments}
+        saved_attachments.append(att)
+    await run_in_threadpool(_save_attachments, session, ticket_id, saved_attachments)
+    cache.invalidate(ticket_key(ticket_id))
+    for att in saved_attachments:
+        schedule_thumbnails(att.id, att.content_type)
+    return {"msg": "Pliki zapisane", "files": [att.filename for att in saved_attachments]}
 
-@router.get("/{ticket_id}/attachments")
-def list_attachments(
-    ticket_id: int,
-    user=Depends(get_current_user),
-    session: Session = Depends(get_session)
-):
+def attachments_query(model, ticket_id: int):
+    return sqlalchemy_select(model).where(model.ticket_id == ticket_id)
+
+def ticket_attachments(session: Session, ticket_id: int, user):
+    # Wspólna kontrola dostępu dla listy załączników i archiwum ZIP
     ticket = session.get(Ticket, ticket_id)
+    model = Attachment
+    if not ticket:
+        ticket = session.get(ArchivedTicket, ticket_id)
+        model = ArchivedAttachment
     if not ticket:
         raise HTTPException(status_code=404, detail="Not found")
     if user.role == "client" and ticket.created_by != user.id:
         raise HTTPException(status_code=403, detail="Forbidden")
+    return session.exec(attachments_query(model, ticket_id)).scalars().all()
 
-    attachments = session.exec(sqlalchemy_select(Attachment).where(Attachment.ticket_id == ticket_id)).all()
+@router.get("/{ticket_id}/attachments")
+def list_attachments(
+    ticket_id: int,
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    attachments = ticket_attachments(session, ticket_id, user)
     return [
         {
             "id": att.id,
@@ -76,24 +134,121 @@ def list_attachments(
         for att in attachments
     ]
 
-@router.get("/attachments/{attachment_id}")
-def download_attachment(
-    attachment_id: int,
+class _ZipStream:
+    # Strumień tylko do zapisu: zipfile dopisuje nagłówki/dane, generator oddaje je klientowi.
+    # Brak seek() przełącza zipfile w tryb z deskryptorami danych - bez plików tymczasowych.
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _zip_entries(entries):
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, mode="w") as archive:
+        for filename, path, uploaded_at in entries:
+            if not os.path.exists(path):
+                logger.error(f"Brak pliku załącznika na dysku: {path}")
+                continue
+            info = zipfile.ZipInfo(filename, date_time=uploaded_at.timetuple()[:6])
+            info.file_size = os.path.getsize(path)
+            extension = os.path.splitext(filename)[1].lower()
+            info.compress_type = zipfile.ZIP_STORED if extension in COMPRESSED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            with open(path, "rb") as source, archive.open(info, mode="w") as target:
+                while True:
+                    chunk = source.read(ZIP_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    data = stream.drain()
+                    if data:
+                        yield data
+            yield stream.drain()
+    # Katalog centralny zapisywany przy zamknięciu archiwum
+    yield stream.drain()
+
+@router.get("/{ticket_id}/attachments.zip")
+def download_attachments_zip(
+    ticket_id: int,
     user=Depends(get_current_user),
     session: Session = Depends(get_session)
 ):
+    attachments = ticket_attachments(session, ticket_id, user)
+    # Tylko proste wartości - generator działa już po zamknięciu sesji żądania
+    entries = [(att.filename, att.path, att.uploaded_at) for att in attachments]
+    return StreamingResponse(
+        _zip_entries(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="ticket-{ticket_id}-attachments.zip"'}
+    )
+
+def attachment_for_user(session: Session, attachment_id: int, user):
+    # Załącznik (także z archiwum) po kontroli dostępu - wspólne dla pobierania i miniatur
     att = session.get(Attachment, attachment_id)
-    if not att:
-        raise HTTPException(status_code=404, detail="Not found")
-    ticket = session.get(Ticket, att.ticket_id)
+    if att:
+        ticket = session.get(Ticket, att.ticket_id)
+    else:
+        att = session.get(ArchivedAttachment, attachment_id)
+        if not att:
+            raise HTTPException(status_code=404, detail="Not found")
+        ticket = session.get(ArchivedTicket, att.ticket_id)
     if user.role == "client" and ticket.created_by != user.id:
         raise HTTPException(status_code=403, detail="Forbidden")
+    return att
+
+@router.get("/attachments/{attachment_id}")
+def download_attachment(
+    attachment_id: int,
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    att = attachment_for_user(session, attachment_id, user)
     return FileResponse(
         att.path,
         media_type=att.content_type,
         filename=att.filename
     )
 
+@router.get("/attachments/{attachment_id}/thumbnail")
+def attachment_thumbnail(
+    attachment_id: int,
+    size: str = "thumbnail",
+    if_none_match: Optional[str] = Header(default=None),
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    if size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=400, detail=f"Nieznany rozmiar: {size}")
+    att = attachment_for_user(session, attachment_id, user)
+    # Połączenie wraca do puli przed ewentualnym liczeniem hasha i generowaniem
+    session.close()
+    if not os.path.exists(att.path):
+        raise HTTPException(status_code=404, detail="Not found")
+    content_hash = attachment_hash(att)
+    etag = f'"{content_hash}-{size}"'
+    headers = {"ETag": etag, "Cache-Control": THUMBNAIL_CACHE_CONTROL}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    path, content_type = att.path, att.content_type
+    try:
+        # Zwykle gotowe z zadania w tle; inaczej generujemy teraz (równoległe żądania czekają na jeden wynik)
+        thumbnail = ensure_thumbnail(path, content_type, content_hash, size)
+    except Exception:
+        logger.error(f"Błąd generowania miniatury załącznika {attachment_id}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+    if thumbnail is None:
+        raise HTTPException(status_code=404, detail="Podgląd niedostępny dla tego typu pliku")
+    return FileResponse(thumbnail, media_type="image/webp", headers=headers)
+
 @router.delete("/attachments/{attachment_id}")
 def delete_attachment(
     attachment_id: int,
@@ -106,11 +261,30 @@ def delete_attachment(
     ticket = session.get(Ticket, att.ticket_id)
     if user.role == "client" and ticket.created_by != user.id:
         raise HTTPException(status_code=403, detail="Forbidden")
+    # Po usunięciu i commit obiekt jest wygaszony - potrzebne wartości kopiujemy wcześniej
+    ticket_id, path, content_hash = att.ticket_id, att.path, att.content_hash
     try:
-        if os.path.exists(att.path):
-            os.remove(att.path)
+        if os.path.exists(path):
+            os.remove(path)
     except Exception:
         pass
     session.delete(att)
+    session.exec(
+        sqlalchemy_update(Ticket)
+        .where(Ticket.id == ticket_id)
+        .values(
+            attachment_count=Ticket.attachment_count - 1,
+            last_activity_at=datetime.utcnow(),
+            version=Ticket.version + 1
+        )
+    )
     session.commit()
+    cache.invalidate(ticket_key(ticket_id))
+    # Miniatury są wspólne dla identycznych plików zgłoszenia - usuwamy je z ostatnim z nich
+    if content_hash and not session.exec(
+        sqlalchemy_select(Attachment.id)
+        .where(Attachment.ticket_id == ticket_id, Attachment.content_hash == content_hash)
+        .limit(1)
+    ).first():
+        remove_thumbnails(path, content_hash)
     return {"msg": "Załącznik usunięty"}
@@ -7,24 +7,30 @@ from sqlmodel import Session, select
 from app.models.user import User
 from app.models.password_reset import PasswordResetToken
 from app.core.db import get_session
-from passlib.context import CryptContext
 from jose import jwt, JWTError, ExpiredSignatureError
 from app.core.config import settings
+from app.core.security import hash_password, verify_password
 from datetime import datetime, timedelta
 from fastapi.security import OAuth2PasswordBearer
 from app.api.mail import send_mail, MailRequest
+from app.services.routing import agent_router
 
 logger = logging.getLogger("app.error")
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# Zapytania budowane w jednym miejscu - te same sprawdza app.core.query_plans
+def user_by_email_query(email: str):
+    return select(User).where(User.email == email)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def reset_token_query(email: str, code: str, now: datetime):
+    return select(PasswordResetToken).where(
+        PasswordResetToken.email == email,
+        PasswordResetToken.code == code,
+        PasswordResetToken.used == False,
+        PasswordResetToken.expires_at > now
+    )
 
 def create_access_token(user_id: int, email: str):
     expire = datetime.utcnow() + timedelta(minutes=settings.jwt_exp_minutes)
@@ -61,7 +67,7 @@ class MeResponse(BaseModel):
 @router.post("/register", response_model=RegisterResponse)
 def register(data: RegisterRequest, session: Session = Depends(get_session)):
     try:
-        result = session.exec(select(User).where(User.email == data.email))
+        result = session.exec(user_by_email_query(data.email))
         user = result.first()
         if user:
             raise HTTPException(status_code=400, detail="Email already registered")
@@ -75,20 +81,26 @@ def register(data: RegisterRequest, session: Session = Depends(get_session)):
         session.add(new_user)
         session.commit()
         session.refresh(new_user)
-        return RegisterResponse(msg="Registration successful")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Błąd rejestracji użytkownika {data.email}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Registration failed")
+    # Konto już zapisane - błąd puli agentów nie może zamienić rejestracji w 500
+    agent_router.on_user_change(new_user, session)
+    return RegisterResponse(msg="Registration successful")
 
 @router.post("/login", response_model=TokenResponse)
 def login(data: LoginRequest, session: Session = Depends(get_session)):
     try:
-        result = session.exec(select(User).where(User.email == data.email))
+        result = session.exec(user_by_email_query(data.email))
         user = result.first()
         if not user or not verify_password(data.password, user.hashed_password):
             raise HTTPException(status_code=401, detail="Invalid credentials")
         token = create_access_token(user_id=user.id, email=user.email)
         return TokenResponse(access_token=token)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Błąd logowania użytkownika {data.email}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Login failed")
@@ -124,7 +136,7 @@ def request_password_reset(
     session: Session = Depends(get_session)
 ):
     # Don't leak info if email exists or not
-    user = session.exec(select(User).where(User.email == data.email)).first()
+    user = session.exec(user_by_email_query(data.email)).first()
     if not user:
         # Always return the same for non-existing users
         return {"msg": "Jeśli podany adres istnieje, kod resetu został wysłany na e-mail."}
@@ -165,18 +177,10 @@ def reset_password(
     session: Session = Depends(get_session)
 ):
     # Find token
-    token = session.exec(
-        select(PasswordResetToken)
-        .where(
-            PasswordResetToken.email == data.email,
-            PasswordResetToken.code == data.code,
-            PasswordResetToken.used == False,
-            PasswordResetToken.expires_at > datetime.utcnow()
-        )
-    ).first()
+    token = session.exec(reset_token_query(data.email, data.code, datetime.utcnow())).first()
     if not token:
         raise HTTPException(status_code=400, detail="Nieprawidłowy kod lub kod wygasł")
-    user = session.exec(select(User).where(User.email == data.email)).first()
+    user = session.exec(user_by_email_query(data.email)).first()
     if not user:
         raise HTTPException(status_code=400, detail="Nie znaleziono użytkownika")
     user.hashed_password = hash_password(data.new_password)
@@ -0,0 +1,224 @@
+"""
+POST /batch - kilka żądań API w jednym round-tripie.
+
+Podżądania trafiają bezpośrednio do routera aplikacji (bez middleware: CORS
+i kompresja dotyczą całej paczki), a użytkownik jest uwierzytelniany raz
+i przekazywany w scope. Admission control liczy każde podżądanie osobno - w jego
+pasie i z limitami jego trasy; sama paczka nie zajmuje globalnego slotu. Kolejne żądania GET wykonują się
+równolegle - każde z własną sesją, bo sesja SQLAlchemy nie może być używana
+z kilku wątków naraz (odczyty słowników i zgłoszeń i tak idą zwykle z cache).
+Pozostałe metody wykonują się po kolei, w podanej kolejności, na wspólnej
+sesji paczki. Każda pozycja ma własny status - błąd jednej nie przerywa reszty.
+Wynik pozycji musi być JSON-em: pliki, strumienie i inne formaty dostają 406
+bez buforowania treści.
+"""
+import json
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlmodel import Session
+from app.api.users import get_current_user, BATCH_USER_KEY
+from app.core.admission import ADMISSION_KEY
+from app.core.compression import is_file_download
+from app.core.db import get_session, BATCH_SESSION_KEY
+from app.core.config import settings
+
+logger = logging.getLogger("app.error")
+
+router = APIRouter(tags=["batch"])
+
+BATCH_PATH = "/batch"
+# Nagłówki ustalane przez paczkę, nie przez pozycję
+RESERVED_HEADERS = {"authorization", "content-length", "content-type", "host", "accept-encoding"}
+
+class UnsupportedResponse(Exception):
+    """Podżądanie odpowiada plikiem, strumieniem albo nie-JSON-em - przerywa wysyłanie treści."""
+
+class BatchItem(BaseModel):
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+
+class BatchIn(BaseModel):
+    requests: List[BatchItem]
+
+class BatchResult(BaseModel):
+    id: Optional[str] = None
+    status: int
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+
+def _error(item: BatchItem, status: int, detail: str) -> BatchResult:
+    return BatchResult(id=item.id, status=status, body={"detail": detail})
+
+def _is_json(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type == "application/json" or media_type.endswith("+json")
+
+def _check_start(headers: dict):
+    # Odpowiedź bez treści (204/304) nie ma Content-Type
+    content_type = headers.get(b"content-type", b"").decode("latin-1")
+    if is_file_download(headers) or (content_type and not _is_json(content_type)):
+        raise UnsupportedResponse()
+
+def _settle_session(session: Session, user, failed: bool):
+    # Nieudana pozycja nie może zostawić przerwanej transakcji kolejnym
+    if failed:
+        session.rollback()
+    # Commit wygasza obiekty sesji - użytkownik jest odświeżany tutaj, a nie leniwie w równoległych odczytach
+    if inspect(user).expired_attributes:
+        session.refresh(user)
+
+async def _call(request: Request, item: BatchItem, user, session: Optional[Session]) -> BatchResult:
+    method = item.method.upper()
+    path, _, query = item.path.partition("?")
+    body = b"" if item.body is None else json.dumps(item.body).encode()
+    headers = [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in item.headers.items()
+        if name.lower() not in RESERVED_HEADERS
+    ]
+    if not any(name == b"accept" for name, _ in headers):
+        headers.append((b"accept", b"application/json"))
+    authorization = request.headers.get("authorization")
+    if authorization:
+        # OAuth2PasswordBearer w zależnościach wymaga nagłówka; sam token nie jest ponownie dekodowany
+        headers.append((b"authorization", authorization.encode("latin-1")))
+    if body:
+        headers.append((b"content-type", b"application/json"))
+        headers.append((b"content-length", str(len(body)).encode()))
+
+    parent = request.scope
+    scope = {
+        "type": "http",
+        "asgi": parent.get("asgi", {"version": "3.0"}),
+        "http_version": parent.get("http_version", "1.1"),
+        "method": method,
+        "scheme": parent.get("scheme", "http"),
+        "server": parent.get("server"),
+        "client": parent.get("client"),
+        "root_path": parent.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": headers,
+        "state": {},
+        "app": parent["app"],
+        BATCH_USER_KEY: user,
+    }
+    # Obsługa HTTPException i walidacji jak w zwykłym żądaniu
+    if "starlette.exception_handlers" in parent:
+        scope["starlette.exception_handlers"] = parent["starlette.exception_handlers"]
+    if session is not None:
+        scope[BATCH_SESSION_KEY] = session
+
+    body_sent = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Klient paczki wciąż czeka - rozłączenie zgłoszone tutaj przerwałoby odpowiedź podżądania
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    status = 500
+    response_headers = {}
+    chunks = []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            headers = {name.lower(): value for name, value in message.get("headers", [])}
+            _check_start(headers)
+            status = message["status"]
+            for name, value in headers.items():
+                response_headers[name.decode("latin-1")] = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            # Kolejne kawałki to strumień (eksport, ZIP) - nie buforujemy go w pamięci
+            if message.get("more_body", False):
+                raise UnsupportedResponse()
+            chunks.append(message.get("body", b""))
+
+    try:
+        # Stos zamykania zależności z yield (np. sesji) - w zwykłym żądaniu tworzy go middleware FastAPI
+        async with AsyncExitStack() as stack:
+            scope["fastapi_middleware_astack"] = stack
+            await request.app.router(scope, receive, send)
+    except UnsupportedResponse:
+        return _error(item, 406, "Pliki, strumienie i odpowiedzi inne niż JSON nie są obsługiwane w /batch")
+    except StarletteHTTPException as exc:
+        # 404/405 routera - poza trasą, więc nie obsłużone przez handlery wyjątków
+        return _error(item, exc.status_code, exc.detail)
+    except Exception:
+        logger.error(f"Błąd podżądania {method} {item.path} w /batch", exc_info=True)
+        return _error(item, 500, "Internal server error")
+    finally:
+        finished.set()
+    response_headers.pop("content-length", None)
+    data = b"".join(chunks)
+    return BatchResult(
+        id=item.id,
+        status=status,
+        headers=response_headers,
+        body=json.loads(data) if data else None
+    )
+
+async def _dispatch(request: Request, item: BatchItem, user, session: Optional[Session]) -> BatchResult:
+    method = item.method.upper()
+    path = item.path.partition("?")[0]
+    if not path.startswith("/") or path.startswith("//"):
+        return _error(item, 400, "Ścieżka musi zaczynać się od /")
+    if path.rstrip("/") == BATCH_PATH:
+        return _error(item, 400, "Zagnieżdżone /batch nie jest obsługiwane")
+    admission = request.scope.get(ADMISSION_KEY)
+    if admission is None:
+        return await _call(request, item, user, session)
+    acquired = await admission.acquire(request.scope, admission.gates_for(method, path))
+    if acquired is None:
+        result = _error(item, 503, "Serwer jest przeciążony, spróbuj ponownie później")
+        result.headers["retry-after"] = str(admission.retry_after)
+        return result
+    try:
+        return await _call(request, item, user, session)
+    finally:
+        admission.release(acquired)
+
+@router.post(BATCH_PATH, response_model=List[BatchResult])
+async def batch(
+    data: BatchIn,
+    request: Request,
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    if not data.requests:
+        return []
+    if len(data.requests) > settings.batch_max_requests:
+        raise HTTPException(status_code=400, detail=f"Maksymalnie {settings.batch_max_requests} żądań w paczce")
+    results = [None] * len(data.requests)
+    i = 0
+    while i < len(data.requests):
+        if data.requests[i].method.upper() == "GET":
+            # Ciąg kolejnych odczytów - równolegle
+            j = i
+            while j < len(data.requests) and data.requests[j].method.upper() == "GET":
+                j += 1
+            results[i:j] = await asyncio.gather(*(
+                _dispatch(request, item, user, None) for item in data.requests[i:j]
+            ))
+            i = j
+        else:
+            results[i] = await _dispatch(request, data.requests[i], user, session)
+            await run_in_threadpool(_settle_session, session, user, results[i].status >= 400)
+            i += 1
+    return results
@@ -1,11 +1,13 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from app.models.category import Category
 from app.api.users import get_current_user
 from pydantic import BaseModel
 from sqlmodel import Session
 from sqlalchemy import select as sqlalchemy_select
 from app.core.db import get_session
+from app.core.cache import cache, CATEGORIES_KEY
+from app.core.wire import precompressed_response
 
 logger = logging.getLogger("app.error")
 
@@ -15,11 +17,14 @@ class CategoryIn(BaseModel):
     name: str
 
 @router.get("/")
-def list_categories(session: Session = Depends(get_session)):
+def list_categories(request: Request, session: Session = Depends(get_session)):
     try:
-        result = session.exec(sqlalchemy_select(Category))
-        categories = result.scalars().all()
-        return categories
+        # Słownik zmienia się rzadko - czytany z cache, unieważniany przy tworzeniu;
+        # skompresowana odpowiedź liczona raz na wersję treści
+        categories = cache.get(CATEGORIES_KEY, lambda: [
+            row.model_dump() for row in session.exec(sqlalchemy_select(Category)).scalars().all()
+        ])
+        return precompressed_response(request, categories)
     except Exception as e:
         logger.error("Błąd pobierania kategorii", exc_info=True)
         raise
@@ -34,6 +39,7 @@ def create_category(data: CategoryIn, user=Depends(get_current_user), session: S
         cat = Category(name=data.name)
         session.add(cat)
         session.commit()
+        cache.invalidate(CATEGORIES_KEY)
         session.refresh(cat)
         return cat
     except Exception as e:
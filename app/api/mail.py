@@ -20,18 +20,22 @@ class MailRequest(BaseModel):
     body: str
     html: bool = False  # NOWE pole
 
+def build_message(data: MailRequest) -> MIMEText:
+    # Ustal MIME typu maila na html jeśli html=True, w przeciwnym razie text/plain
+    mime_type = "html" if data.html else "plain"
+    msg = MIMEText(data.body, mime_type, "utf-8")
+    msg["Subject"] = data.subject
+    msg["From"] = FROM_ADDR
+    msg["To"] = data.to
+    return msg
+
 @router.post("/send")
 def send_mail(data: MailRequest):
     if not SMTP_HOST or not SMTP_USER or not SMTP_PASS:
         logger.error("Brak konfiguracji SMTP (SMTP_USER/SMTP_PASS)")
         raise HTTPException(status_code=500, detail="SMTP not configured")
     try:
-        # Ustal MIME typu maila na html jeśli html=True, w przeciwnym razie text/plain
-        mime_type = "html" if data.html else "plain"
-        msg = MIMEText(data.body, mime_type, "utf-8")
-        msg["Subject"] = data.subject
-        msg["From"] = FROM_ADDR
-        msg["To"] = data.to
+        msg = build_message(data)
 
         # OVH wymaga SMTP_SSL na porcie 465, bez starttls!
         with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT) as server:
@@ -42,3 +46,46 @@ def send_mail(data: MailRequest):
     except Exception as e:
         logger.error(f"Błąd wysyłki e-maila do {data.to}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Błąd wysyłki e-maila")
+
+class SmtpBatch:
+    """
+    Jedno połączenie SMTP na wiele wiadomości. send() zgłasza błąd tylko dla
+    swojej wiadomości - po zerwanym połączeniu kolejna wysyłka otwiera nowe.
+    """
+    def __init__(self):
+        if not SMTP_HOST or not SMTP_USER or not SMTP_PASS:
+            logger.error("Brak konfiguracji SMTP (SMTP_USER/SMTP_PASS)")
+            raise RuntimeError("SMTP not configured")
+        self.server = None
+
+    def send(self, data: MailRequest):
+        if self.server is None:
+            server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT)
+            try:
+                server.login(SMTP_USER, SMTP_PASS)
+            except Exception:
+                server.close()
+                raise
+            self.server = server
+        try:
+            self.server.sendmail(FROM_ADDR, [data.to], build_message(data).as_string())
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+            # Odrzucony adres lub treść - połączenie nadal jest używalne
+            raise
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                self.server.close()
+            self.server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,65 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from typing import Optional
+from sqlalchemy import select as sqlalchemy_select
+from sqlmodel import Session
+from app.models.notification import Notification, NotificationPreference
+from app.api.users import get_current_user
+from app.core.db import get_session
+from app.core.config import settings
+
+logger = logging.getLogger("app.error")
+
+router = APIRouter(prefix="/notifications", tags=["notifications"])
+
+class PreferencesIn(BaseModel):
+    email_enabled: bool = True
+    digest_minutes: Optional[int] = None
+
+@router.get("/")
+def list_notifications(
+    limit: int = 50,
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    try:
+        result = session.exec(
+            sqlalchemy_select(Notification)
+            .where(Notification.user_id == user.id)
+            .order_by(Notification.created_at.desc())
+            .limit(min(limit, 200))
+        )
+        return result.scalars().all()
+    except Exception as e:
+        logger.error("Błąd pobierania powiadomień", exc_info=True)
+        raise
+
+@router.get("/preferences")
+def get_preferences(user=Depends(get_current_user), session: Session = Depends(get_session)):
+    pref = session.get(NotificationPreference, user.id)
+    return {
+        "email_enabled": pref.email_enabled if pref else True,
+        "digest_minutes": pref.digest_minutes if pref else None,
+        "default_digest_minutes": settings.notification_digest_minutes
+    }
+
+@router.put("/preferences")
+def update_preferences(
+    data: PreferencesIn,
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    try:
+        if data.digest_minutes is not None and data.digest_minutes < 0:
+            raise HTTPException(status_code=400, detail="digest_minutes must be >= 0")
+        pref = session.get(NotificationPreference, user.id) or NotificationPreference(user_id=user.id)
+        pref.email_enabled = data.email_enabled
+        pref.digest_minutes = data.digest_minutes
+        session.add(pref)
+        session.commit()
+        session.refresh(pref)
+        return pref
+    except Exception as e:
+        logger.error("Błąd zapisu preferencji powiadomień", exc_info=True)
+        raise
@@ -1,11 +1,14 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from app.models.priority import Priority
 from app.api.users import get_current_user
 from pydantic import BaseModel
+from typing import Optional
 from sqlmodel import Session
 from sqlalchemy import select as sqlalchemy_select
 from app.core.db import get_session
+from app.core.cache import cache, PRIORITIES_KEY
+from app.core.wire import precompressed_response
 
 logger = logging.getLogger("app.error")
 
@@ -15,12 +18,22 @@ class PriorityIn(BaseModel):
     name: str
     level: int
 
+def cached_priorities(session: Session) -> list:
+    # Słownik zmienia się rzadko - czytany z cache, unieważniany przy tworzeniu
+    return cache.get(PRIORITIES_KEY, lambda: [
+        row.model_dump() for row in session.exec(sqlalchemy_select(Priority)).scalars().all()
+    ])
+
+def priority_level(session: Session, priority_id: Optional[int]) -> Optional[int]:
+    if priority_id is None:
+        return None
+    return next((p["level"] for p in cached_priorities(session) if p["id"] == priority_id), None)
+
 @router.get("/")
-def list_priorities(session: Session = Depends(get_session)):
+def list_priorities(request: Request, session: Session = Depends(get_session)):
     try:
-        result = session.exec(sqlalchemy_select(Priority))
-        priorities = result.scalars().all()
-        return priorities
+        # Skompresowana odpowiedź liczona raz na wersję treści
+        return precompressed_response(request, cached_priorities(session))
     except Exception as e:
         logger.error("Błąd pobierania priorytetów", exc_info=True)
         raise
@@ -35,6 +48,7 @@ def create_priority(data: PriorityIn, user=Depends(get_current_user), session: S
         prio = Priority(name=data.name, level=data.level)
         session.add(prio)
         session.commit()
+        cache.invalidate(PRIORITIES_KEY)
         session.refresh(prio)
         return prio
     except Exception as e:
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.api.users import get_current_user
+from app.core.config import settings
+from app.core.profiler import list_captures, load_capture
+
+router = APIRouter(prefix="/admin/profiles", tags=["admin"])
+
+def require_admin(user=Depends(get_current_user)):
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return user
+
+@router.get("/")
+def profiles_list(user=Depends(require_admin)):
+    return {"enabled": settings.profiler_enabled, "captures": list_captures()}
+
+@router.get("/{capture_id}")
+def profile_detail(capture_id: str, user=Depends(require_admin)):
+    capture = load_capture(capture_id)
+    if not capture:
+        raise HTTPException(status_code=404, detail="Not found")
+    return capture
+
+@router.get("/{capture_id}/flamegraph", response_class=PlainTextResponse)
+def profile_flamegraph(capture_id: str, user=Depends(require_admin)):
+    # Folded stacks - do otwarcia w speedscope.app lub flamegraph.pl
+    capture = load_capture(capture_id)
+    if not capture:
+        raise HTTPException(status_code=404, detail="Not found")
+    body = "\n".join(f"{stack} {count}" for stack, count in capture["stacks"].items())
+    return PlainTextResponse(
+        body,
+        headers={"Content-Disposition": f'attachment; filename="{capture_id}.folded"'}
+    )
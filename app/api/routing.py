@@ -0,0 +1,53 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from typing import Optional, List
+from sqlalchemy import delete as sqlalchemy_delete
+from sqlmodel import Session
+from app.models.agent_skill import AgentSkill
+from app.models.user import User
+from app.api.users import get_current_user
+from app.core.db import get_session
+from app.services.routing import agent_router
+
+logger = logging.getLogger("app.error")
+
+router = APIRouter(prefix="/routing", tags=["routing"])
+
+class SkillIn(BaseModel):
+    category_id: Optional[int] = None
+    priority_id: Optional[int] = None
+    weight: float = 2.0
+
+@router.get("/agents")
+def list_agent_loads(user=Depends(get_current_user)):
+    if user.role not in ["helpdesk", "admin"]:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return agent_router.snapshot()
+
+@router.put("/agents/{user_id}/skills")
+def set_agent_skills(
+    user_id: int,
+    skills: List[SkillIn],
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    try:
+        if user.role != "admin":
+            raise HTTPException(status_code=403, detail="Forbidden")
+        agent = session.get(User, user_id)
+        if not agent:
+            raise HTTPException(status_code=404, detail="User not found")
+        if any(s.weight <= 0 for s in skills):
+            raise HTTPException(status_code=400, detail="Waga musi być dodatnia")
+        session.exec(sqlalchemy_delete(AgentSkill).where(AgentSkill.user_id == user_id))
+        for s in skills:
+            session.add(AgentSkill(user_id=user_id, category_id=s.category_id, priority_id=s.priority_id, weight=s.weight))
+        session.commit()
+        agent_router.rebuild(session)
+        return [s.dict() for s in skills]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Błąd zapisu umiejętności agenta {user_id}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal Server Error")
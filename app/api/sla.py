@@ -0,0 +1,37 @@
+import logging
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session
+from app.api.users import get_current_user
+from app.core.db import get_session
+from app.services import sla
+
+logger = logging.getLogger("app.error")
+
+router = APIRouter(prefix="/sla", tags=["sla"])
+
+@router.get("/stats")
+def sla_stats(
+    days: int = Query(30, ge=1, le=365),
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    try:
+        if user.role not in ["helpdesk", "admin"]:
+            raise HTTPException(status_code=403, detail="Forbidden")
+        since = datetime.utcnow() - timedelta(days=days)
+        return {
+            "since": since,
+            "breaches": sla.breach_stats(session, since),
+            # Stan kolejki terminów tego workera - pełny tylko u właściciela
+            "queue": {
+                "owner": sla.is_owner(),
+                "pending": len(sla.deadline_queue),
+                "next_due": sla.deadline_queue.next_due(),
+            },
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Błąd pobierania statystyk SLA", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -1,19 +1,143 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Response, Request
 from pydantic import BaseModel
 from typing import Optional, List
-from sqlalchemy import select as sqlalchemy_select
+from sqlalchemy import select as sqlalchemy_select, update as sqlalchemy_update, func
 from sqlmodel import Session
 from datetime import datetime
 
 from app.models.ticket import Ticket, Comment, TicketRead, CommentOut, AuthorOut
+from app.models.ticket_out import TicketOut
+from app.models.archive import ArchivedTicket, ArchivedComment
 from app.models.user import User
 from app.api.users import get_current_user
 from app.core.db import get_session
+from app.services.notifications import record_ticket_event
+from app.services.dedup import index_ticket, remove_ticket, duplicate_clusters
+from app.services.routing import agent_router
+from app.services import sla
+from app.api.priorities import priority_level
+from app.core.config import settings
+from app.core.cache import cache, ticket_key
+from app.core.wire import negotiated_response, columnar_tickets
 
 logger = logging.getLogger("app.error")
 router = APIRouter(prefix="/tickets", tags=["tickets"])
 
+# Ile razy ponowić pobranie z kolejki, gdy inny agent przejmie zgłoszenie pierwszy
+CLAIM_RETRIES = 5
+# Ile razy ponowić zmianę zgłoszenia bez If-Match, gdy w międzyczasie zmieniła się jego wersja
+UPDATE_RETRIES = 3
+
+def queue_candidate_query():
+    # Kolejność kolumn indeksu ix_ticket_queue - PostgreSQL czyta pierwszy wiersz z indeksu bez sortowania
+    return (
+        sqlalchemy_select(Ticket.id)
+        .where(Ticket.assigned_to.is_(None), Ticket.status == "open")
+        .order_by(Ticket.priority_level.asc().nulls_last(), Ticket.created_at, Ticket.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+
+def ticket_etag(ticket: Ticket) -> str:
+    return f'"{ticket.id}-{ticket.version}"'
+
+# Dozwolone sortowania listy (malejąco) - wszystkie po kolumnach tabeli ticket, bez złączeń
+TICKET_SORTS = {
+    "created": "created_at",
+    "last_activity": "last_activity_at",
+    "comment_count": "comment_count",
+    "attachment_count": "attachment_count",
+}
+
+# Ile identyfikatorów w jednym IN przy doczytywaniu komentarzy listy
+IN_CHUNK_SIZE = 1000
+
+def ticket_list_query(created_by: Optional[int], sort: Optional[str]):
+    # Sortowania obsługują indeksy (kolumna, id) z modelu Ticket; lista klienta - (created_by, ...)
+    stmt = sqlalchemy_select(Ticket)
+    if created_by is not None:
+        stmt = stmt.where(Ticket.created_by == created_by)
+    if sort is not None:
+        stmt = stmt.order_by(getattr(Ticket, TICKET_SORTS[sort]).desc(), Ticket.id.desc())
+    return stmt
+
+def ticket_sort_key(sort: str):
+    # Ten sam porządek co ticket_list_query, dla list łączonych z archiwum; NULL na końcu
+    column = TICKET_SORTS[sort]
+    def key(ticket: TicketRead):
+        value = getattr(ticket, column)
+        return (value is not None, value, ticket.id)
+    return key
+
+def comment_batch_query(model, ticket_ids: List[int]):
+    return sqlalchemy_select(model).where(model.ticket_id.in_(ticket_ids)).order_by(model.ticket_id, model.id)
+
+def comments_by_ticket(session: Session, model, ticket_ids: List[int]) -> dict:
+    """
+    Komentarze wielu zgłoszeń (Comment albo ArchivedComment) z autorami - dwa
+    zapytania na paczkę identyfikatorów zamiast dwóch na zgłoszenie.
+    """
+    grouped = {ticket_id: [] for ticket_id in ticket_ids}
+    for start in range(0, len(ticket_ids), IN_CHUNK_SIZE):
+        chunk = ticket_ids[start:start + IN_CHUNK_SIZE]
+        rows = session.exec(comment_batch_query(model, chunk)).scalars().all()
+        author_ids = {c.author_id for c in rows}
+        authors = {
+            u.id: AuthorOut(id=u.id, email=u.email, full_name=u.full_name)
+            for u in session.exec(
+                sqlalchemy_select(User.id, User.email, User.full_name).where(User.id.in_(author_ids))
+            ).all()
+        } if author_ids else {}
+        for c in rows:
+            grouped[c.ticket_id].append(CommentOut(
+                id=c.id,
+                ticket_id=c.ticket_id,
+                content=c.content,
+                created_at=c.created_at,
+                author=authors.get(c.author_id)
+            ))
+    return grouped
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    # Nagłówki If-Match / If-None-Match mogą zawierać listę tagów lub "*"
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+def archived_ticket_read(session: Session, ticket: ArchivedTicket, comments: Optional[List[CommentOut]] = None) -> TicketRead:
+    # Listy przekazują komentarze wczytane zbiorczo (comments_by_ticket)
+    if comments is None:
+        comments = comments_by_ticket(session, ArchivedComment, [ticket.id])[ticket.id]
+    return TicketRead(
+        id=ticket.id,
+        title=ticket.title,
+        description=ticket.description,
+        category_id=ticket.category_id,
+        priority_id=ticket.priority_id,
+        created_by=ticket.created_by,
+        assigned_to=ticket.assigned_to,
+        status=ticket.status,
+        created_at=ticket.created_at,
+        updated_at=ticket.updated_at,
+        version=ticket.version,
+        comment_count=ticket.comment_count,
+        attachment_count=ticket.attachment_count,
+        last_comment_at=ticket.last_comment_at,
+        last_activity_at=ticket.last_activity_at,
+        first_response_due=ticket.first_response_due,
+        first_response_at=ticket.first_response_at,
+        resolution_due=ticket.resolution_due,
+        archived=True,
+        comments=comments
+    )
+
 class TicketIn(BaseModel):
     title: str
     description: str
@@ -29,12 +153,42 @@ def new_ticket_form():
         "priority_id": None
     }
 
+@router.get("/duplicates")
+def list_duplicate_clusters(
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    try:
+        if user.role not in ["helpdesk", "admin"]:
+            raise HTTPException(status_code=403, detail="Forbidden")
+        clusters = duplicate_clusters(session)
+        ids = [ticket_id for cluster in clusters for ticket_id in cluster]
+        tickets = {
+            t.id: t for t in session.exec(sqlalchemy_select(Ticket).where(Ticket.id.in_(ids))).scalars()
+        } if ids else {}
+        return [
+            {
+                "ticket_ids": cluster,
+                "tickets": [
+                    {"id": tickets[i].id, "title": tickets[i].title, "created_at": tickets[i].created_at}
+                    for i in cluster if i in tickets
+                ]
+            }
+            for cluster in clusters
+        ]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Błąd wyszukiwania duplikatów zgłoszeń", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
 @router.post("/", response_model=TicketRead)
 def create_ticket(
     data: TicketIn,
     user=Depends(get_current_user),
     session: Session = Depends(get_session)
 ):
+    reserved = None
     try:
         ticket = Ticket(
             title=data.title,
@@ -43,9 +197,23 @@ def create_ticket(
             priority_id=data.priority_id,
             created_by=user.id
         )
+        ticket.priority_level = priority_level(session, data.priority_id)
+        for name, value in sla.deadline_values(ticket.priority_level, ticket.created_at).items():
+            setattr(ticket, name, value)
         session.add(ticket)
+        session.flush()
+        duplicates = index_ticket(session, ticket)
+        if settings.auto_assign:
+            # Obciążenie agentów z pamięci - bez zapytań COUNT na ścieżce żądania
+            reserved = agent_router.assign(ticket.category_id, ticket.priority_id)
+            if reserved is not None:
+                ticket.assigned_to = reserved
+                session.add(ticket)
+                record_ticket_event(session, ticket, "assigned", f"Zgłoszenie przypisane do użytkownika #{reserved}", user.id)
         session.commit()
+        reserved = None
         session.refresh(ticket)
+        sla.track_ticket(ticket)
         return TicketRead(
             id=ticket.id,
             title=ticket.title,
@@ -57,44 +225,39 @@ def create_ticket(
             status=ticket.status,
             created_at=ticket.created_at,
             updated_at=ticket.updated_at,
-            comments=[]
+            version=ticket.version,
+            comment_count=ticket.comment_count,
+            attachment_count=ticket.attachment_count,
+            last_comment_at=ticket.last_comment_at,
+            last_activity_at=ticket.last_activity_at,
+            first_response_due=ticket.first_response_due,
+            first_response_at=ticket.first_response_at,
+            resolution_due=ticket.resolution_due,
+            comments=[],
+            possible_duplicates=duplicates
         )
     except Exception as e:
+        # Zgłoszenie nie powstało - oddaj zarezerwowany slot agenta
+        agent_router.release(reserved)
         logger.error("Błąd tworzenia zgłoszenia", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 @router.get("/", response_model=List[TicketRead])
 def list_tickets(
+    request: Request,
+    sort: Optional[str] = None,
+    include_archived: bool = False,
     user=Depends(get_current_user),
     session: Session = Depends(get_session)
 ):
     try:
-        if user.role == "client":
-            stmt = sqlalchemy_select(Ticket).where(Ticket.created_by == user.id)
-        else:
-            stmt = sqlalchemy_select(Ticket)
-        result = session.exec(stmt)
-        tickets = result.scalars().all()
+        if sort is not None and sort not in TICKET_SORTS:
+            raise HTTPException(status_code=400, detail=f"Nieznane sortowanie: {sort}")
+        stmt = ticket_list_query(user.id if user.role == "client" else None, sort)
+        tickets = session.exec(stmt).scalars().all()
+        comments = comments_by_ticket(session, Comment, [t.id for t in tickets])
         tickets_out = []
         for t in tickets:
-            comments_query = session.exec(sqlalchemy_select(Comment).where(Comment.ticket_id == t.id))
-            comments = []
-            for c in comments_query.scalars().all():
-                author_obj = session.get(User, c.author_id)
-                author = AuthorOut(
-                    id=author_obj.id,
-                    email=author_obj.email,
-                    full_name=author_obj.full_name
-                ) if author_obj else None
-                comments.append(
-                    CommentOut(
-                        id=c.id,
-                        ticket_id=c.ticket_id,
-                        content=c.content,
-                        created_at=c.created_at,
-                        author=author
-                    )
-                )
             tickets_out.append(
                 TicketRead(
                     id=t.id,
@@ -107,57 +270,91 @@ def list_tickets(
                     status=t.status,
                     created_at=t.created_at,
                     updated_at=t.updated_at,
-                    comments=comments
+                    version=t.version,
+                    comment_count=t.comment_count,
+                    attachment_count=t.attachment_count,
+                    last_comment_at=t.last_comment_at,
+                    last_activity_at=t.last_activity_at,
+                    first_response_due=t.first_response_due,
+                    first_response_at=t.first_response_at,
+                    resolution_due=t.resolution_due,
+                    comments=comments[t.id]
                 )
             )
-        return tickets_out
+        # Archiwum tylko na żądanie - domyślna lista obejmuje wyłącznie gorącą tabelę
+        if include_archived:
+            archived_stmt = sqlalchemy_select(ArchivedTicket)
+            if user.role == "client":
+                archived_stmt = archived_stmt.where(ArchivedTicket.created_by == user.id)
+            archived = session.exec(archived_stmt.order_by(ArchivedTicket.id.desc())).scalars().all()
+            archived_comments = comments_by_ticket(session, ArchivedComment, [a.id for a in archived])
+            for a in archived:
+                tickets_out.append(archived_ticket_read(session, a, archived_comments[a.id]))
+            if sort is not None:
+                # Obie części są posortowane osobno - wspólny porządek wg tego samego klucza
+                tickets_out.sort(key=ticket_sort_key(sort), reverse=True)
+        # JSON domyślnie; MessagePack / wariant kolumnowy wg nagłówka Accept
+        return negotiated_response(request, tickets_out, columnar_tickets)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Błąd pobierania listy zgłoszeń", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+def load_ticket_read(session: Session, ticket_id: int) -> Optional[dict]:
+    """Pełny widok zgłoszenia (z komentarzami) w postaci do cache; None gdy nie istnieje."""
+    ticket = session.get(Ticket, ticket_id)
+    if not ticket:
+        # Zarchiwizowane zgłoszenia zachowują identyfikator
+        archived = session.get(ArchivedTicket, ticket_id)
+        return archived_ticket_read(session, archived).model_dump() if archived else None
+    # Autorzy komentarzy jednym zapytaniem, nie po jednym na komentarz
+    comments = comments_by_ticket(session, Comment, [ticket_id])[ticket_id]
+    return TicketRead(
+        id=ticket.id,
+        title=ticket.title,
+        description=ticket.description,
+        category_id=ticket.category_id,
+        priority_id=ticket.priority_id,
+        created_by=ticket.created_by,
+        assigned_to=ticket.assigned_to,
+        status=ticket.status,
+        created_at=ticket.created_at,
+        updated_at=ticket.updated_at,
+        version=ticket.version,
+        comment_count=ticket.comment_count,
+        attachment_count=ticket.attachment_count,
+        last_comment_at=ticket.last_comment_at,
+        last_activity_at=ticket.last_activity_at,
+        first_response_due=ticket.first_response_due,
+        first_response_at=ticket.first_response_at,
+        resolution_due=ticket.resolution_due,
+        comments=comments
+    ).model_dump()
+
 @router.get("/{ticket_id}", response_model=TicketRead)
 def get_ticket(
     ticket_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
     user=Depends(get_current_user),
     session: Session = Depends(get_session)
 ):
     try:
-        ticket = session.get(Ticket, ticket_id)
-        if not ticket:
+        # Gorące zgłoszenia serwowane z cache; każdy zapis unieważnia klucz na wszystkich workerach
+        data = cache.get(ticket_key(ticket_id), lambda: load_ticket_read(session, ticket_id))
+        if data is None:
             raise HTTPException(status_code=404, detail="Not found")
+        ticket = TicketRead(**data)
         if user.role == "client" and ticket.created_by != user.id:
             raise HTTPException(status_code=403, detail="Forbidden")
-        comments_query = session.exec(sqlalchemy_select(Comment).where(Comment.ticket_id == ticket_id))
-        comments = []
-        for c in comments_query.scalars().all():
-            author_obj = session.get(User, c.author_id)
-            author = AuthorOut(
-                id=author_obj.id,
-                email=author_obj.email,
-                full_name=author_obj.full_name
-            ) if author_obj else None
-            comments.append(
-                CommentOut(
-                    id=c.id,
-                    ticket_id=c.ticket_id,
-                    content=c.content,
-                    created_at=c.created_at,
-                    author=author
-                )
-            )
-        return TicketRead(
-            id=ticket.id,
-            title=ticket.title,
-            description=ticket.description,
-            category_id=ticket.category_id,
-            priority_id=ticket.priority_id,
-            created_by=ticket.created_by,
-            assigned_to=ticket.assigned_to,
-            status=ticket.status,
-            created_at=ticket.created_at,
-            updated_at=ticket.updated_at,
-            comments=comments
-        )
+        etag = ticket_etag(ticket)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return ticket
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Błąd pobierania zgłoszenia {ticket_id}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -170,6 +367,8 @@ class TicketUpdate(BaseModel):
 def update_ticket(
     ticket_id: int,
     data: TicketUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(default=None),
     user=Depends(get_current_user),
     session: Session = Depends(get_session)
 ):
@@ -182,31 +381,50 @@ def update_ticket(
                 raise HTTPException(status_code=403, detail="Forbidden")
         elif user.role not in ["helpdesk", "admin"]:
             raise HTTPException(status_code=403, detail="Forbidden")
-        if data.status is not None:
-            ticket.status = data.status
-        if data.assigned_to is not None and user.role in ["helpdesk", "admin"]:
-            ticket.assigned_to = data.assigned_to
-        ticket.updated_at = datetime.utcnow()
+        if if_match is not None and not etag_matches(if_match, ticket_etag(ticket)):
+            raise HTTPException(status_code=412, detail="Zgłoszenie zostało zmienione przez innego użytkownika")
+        for attempt in range(UPDATE_RETRIES):
+            now = datetime.utcnow()
+            values = {"updated_at": now, "last_activity_at": now, "version": Ticket.version + 1}
+            if data.status is not None:
+                values["status"] = data.status
+                values.update(sla.status_change_values(ticket, data.status, now))
+            if data.assigned_to is not None and user.role in ["helpdesk", "admin"]:
+                values["assigned_to"] = data.assigned_to
+            old_status, old_assignee = ticket.status, ticket.assigned_to
+            # Zapis warunkowy zamiast blokady wiersza; ostatnia próba bez If-Match nadpisuje bez warunku
+            stmt = sqlalchemy_update(Ticket).where(Ticket.id == ticket_id).values(**values)
+            if if_match is not None or attempt < UPDATE_RETRIES - 1:
+                stmt = stmt.where(Ticket.version == ticket.version)
+            result = session.exec(stmt)
+            if result.rowcount == 1:
+                break
+            session.rollback()
+            # Klient z If-Match zmieniał konkretną wersję - nie nakładamy zmian na cudze
+            if if_match is not None:
+                raise HTTPException(status_code=412, detail="Zgłoszenie zostało zmienione przez innego użytkownika")
+            # Bez If-Match: odczyt bieżącej wersji i ponowienie
+            ticket = session.get(Ticket, ticket_id, populate_existing=True)
+            if not ticket:
+                raise HTTPException(status_code=404, detail="Not found")
+        session.refresh(ticket)
+        if ticket.status != old_status:
+            record_ticket_event(session, ticket, "status", f"Status zmieniony: {old_status} → {ticket.status}", user.id)
+            # Zamknięte zgłoszenie nie jest kandydatem na duplikat; ponownie otwarte wraca do indeksu
+            if ticket.status == "closed":
+                remove_ticket(session, ticket.id)
+            elif old_status == "closed":
+                index_ticket(session, ticket)
+        if ticket.assigned_to != old_assignee:
+            record_ticket_event(session, ticket, "assigned", f"Zgłoszenie przypisane do użytkownika #{ticket.assigned_to}", user.id)
         session.commit()
+        cache.invalidate(ticket_key(ticket_id))
+        agent_router.on_ticket_change(old_assignee, old_status, ticket.assigned_to, ticket.status)
         session.refresh(ticket)
-        comments_query = session.exec(sqlalchemy_select(Comment).where(Comment.ticket_id == ticket_id))
-        comments = []
-        for c in comments_query.scalars().all():
-            author_obj = session.get(User, c.author_id)
-            author = AuthorOut(
-                id=author_obj.id,
-                email=author_obj.email,
-                full_name=author_obj.full_name
-            ) if author_obj else None
-            comments.append(
-                CommentOut(
-                    id=c.id,
-                    ticket_id=c.ticket_id,
-                    content=c.content,
-                    created_at=c.created_at,
-                    author=author
-                )
-            )
+        if ticket.status != old_status:
+            sla.track_ticket(ticket)
+        response.headers["ETag"] = ticket_etag(ticket)
+        comments = comments_by_ticket(session, Comment, [ticket_id])[ticket_id]
         return TicketRead(
             id=ticket.id,
             title=ticket.title,
@@ -218,8 +436,18 @@ def update_ticket(
             status=ticket.status,
             created_at=ticket.created_at,
             updated_at=ticket.updated_at,
+            version=ticket.version,
+            comment_count=ticket.comment_count,
+            attachment_count=ticket.attachment_count,
+            last_comment_at=ticket.last_comment_at,
+            last_activity_at=ticket.last_activity_at,
+            first_response_due=ticket.first_response_due,
+            first_response_at=ticket.first_response_at,
+            resolution_due=ticket.resolution_due,
             comments=comments
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Błąd aktualizacji zgłoszenia {ticket_id}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -240,9 +468,34 @@ def add_comment(
             raise HTTPException(status_code=404, detail="Not found")
         if user.role == "client" and ticket.created_by != user.id:
             raise HTTPException(status_code=403, detail="Forbidden")
-        comment = Comment(ticket_id=ticket_id, author_id=user.id, content=data.content)
+        now = datetime.utcnow()
+        comment = Comment(ticket_id=ticket_id, author_id=user.id, content=data.content, created_at=now)
         session.add(comment)
+        record_ticket_event(
+            session, ticket, "comment",
+            f"Nowy komentarz od {user.full_name or user.email}: {data.content[:200]}",
+            user.id
+        )
+        values = {
+            "comment_count": Ticket.comment_count + 1,
+            "last_comment_at": now,
+            "last_activity_at": now,
+            "version": Ticket.version + 1
+        }
+        # Pierwszy komentarz agenta spełnia termin pierwszej odpowiedzi (COALESCE - wyścig dwóch agentów)
+        first_response = user.role in ["helpdesk", "admin"] and ticket.first_response_at is None
+        if first_response:
+            values["first_response_at"] = func.coalesce(Ticket.first_response_at, now)
+        # Liczniki w tej samej transakcji co komentarz; nowy komentarz unieważnia też ETag
+        session.exec(
+            sqlalchemy_update(Ticket)
+            .where(Ticket.id == ticket_id)
+            .values(**values)
+        )
         session.commit()
+        cache.invalidate(ticket_key(ticket_id))
+        if first_response:
+            sla.publish_deadlines(ticket_id, {sla.FIRST_RESPONSE: None})
         session.refresh(comment)
         author = AuthorOut(
             id=user.id,
@@ -259,3 +512,65 @@ def add_comment(
     except Exception as e:
         logger.error(f"Błąd dodawania komentarza do zgłoszenia {ticket_id}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal Server Error")
+
+# === Kolejka zgłoszeń dla agentów ===
+
+@router.post("/queue/claim", response_model=TicketOut)
+def claim_next_ticket(
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Przypisuje wywołującemu agentowi następne nieprzypisane otwarte zgłoszenie
+    (kolejność: Priority.level zapisany w zgłoszeniu, potem najstarsze).
+
+    Na PostgreSQL wiersz jest blokowany przez FOR UPDATE SKIP LOCKED, więc
+    równolegli agenci dostają różne zgłoszenia bez czekania na siebie.
+    SQLite pomija klauzulę blokady - tam przed podwójnym przypisaniem chroni
+    warunkowy UPDATE (assigned_to IS NULL) i ponowienie próby.
+    """
+    try:
+        if user.role not in ["helpdesk", "admin"]:
+            raise HTTPException(status_code=403, detail="Forbidden")
+        for _ in range(CLAIM_RETRIES):
+            candidate_id = session.exec(queue_candidate_query()).scalar_one_or_none()
+            if candidate_id is None:
+                session.rollback()
+                raise HTTPException(status_code=404, detail="Brak zgłoszeń w kolejce")
+            now = datetime.utcnow()
+            result = session.exec(
+                sqlalchemy_update(Ticket)
+                .where(Ticket.id == candidate_id, Ticket.assigned_to.is_(None))
+                .values(assigned_to=user.id, updated_at=now, last_activity_at=now, version=Ticket.version + 1)
+            )
+            if result.rowcount == 1:
+                ticket = session.get(Ticket, candidate_id)
+                record_ticket_event(session, ticket, "assigned", f"Zgłoszenie przypisane do użytkownika #{user.id}", user.id)
+                session.commit()
+                cache.invalidate(ticket_key(candidate_id))
+                agent_router.on_ticket_change(None, "open", user.id, "open")
+                return TicketOut(
+                    id=ticket.id,
+                    title=ticket.title,
+                    description=ticket.description,
+                    category_id=ticket.category_id,
+                    priority_id=ticket.priority_id,
+                    created_by=ticket.created_by,
+                    assigned_to=ticket.assigned_to,
+                    status=ticket.status,
+                    created_at=ticket.created_at,
+                    updated_at=ticket.updated_at,
+                    version=ticket.version,
+                    comment_count=ticket.comment_count,
+                    attachment_count=ticket.attachment_count,
+                    last_comment_at=ticket.last_comment_at,
+                    last_activity_at=ticket.last_activity_at
+                )
+            # Inny agent był szybszy (tylko bez SKIP LOCKED) - spróbuj kolejnego
+            session.rollback()
+        raise HTTPException(status_code=409, detail="Nie udało się pobrać zgłoszenia, spróbuj ponownie")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Błąd pobierania zgłoszenia z kolejki", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -0,0 +1,277 @@
+import os
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, Response
+from pydantic import BaseModel
+from sqlalchemy import select as sqlalchemy_select, update as sqlalchemy_update, delete as sqlalchemy_delete
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from app.models.upload import UploadSession
+from app.models.attachment import Attachment
+from app.models.ticket import Ticket
+from app.api.users import get_current_user
+from app.api.attachments import UPLOAD_ROOT
+from app.core.db import get_session, engine
+from app.core.config import settings
+from app.core.cache import cache, ticket_key
+from app.services.thumbnails import schedule_thumbnails
+
+logger = logging.getLogger("app.error")
+
+# Wznawialny upload w stylu tus (https://tus.io): utwórz sesję, wysyłaj kawałki
+# z offsetem (PATCH), sprawdzaj offset (HEAD), zakończ (finalize).
+router = APIRouter(prefix="/tickets", tags=["attachments"])
+
+TUS_VERSION = "1.0.0"
+EXPIRE_BATCH = 100
+
+class UploadCreate(BaseModel):
+    filename: str
+    content_type: str = "application/octet-stream"
+    size: int
+
+def _expiry() -> datetime:
+    return datetime.utcnow() + timedelta(hours=settings.upload_expiry_hours)
+
+def _headers(upload: UploadSession, offset: int = None) -> dict:
+    return {
+        "Upload-Offset": str(upload.offset if offset is None else offset),
+        "Upload-Length": str(upload.size),
+        "Tus-Resumable": TUS_VERSION,
+    }
+
+def remove_upload_files(paths: List[str]):
+    """Usuwa częściowe pliki sesji uploadu - wołane po commit usunięcia wierszy."""
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception:
+            logger.error(f"Błąd usuwania pliku uploadu {path}", exc_info=True)
+
+def expire_uploads(session: Session) -> int:
+    """
+    Usuwa paczkę przeterminowanych, nieukończonych sesji uploadu razem
+    z częściowymi plikami. Zwraca liczbę usuniętych sesji.
+    """
+    # SKIP LOCKED: sprzątanie może ruszyć w kilku workerach naraz
+    expired = session.exec(
+        sqlalchemy_select(UploadSession.id, UploadSession.path)
+        .where(UploadSession.expires_at < datetime.utcnow())
+        .limit(EXPIRE_BATCH)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not expired:
+        session.rollback()
+        return 0
+    session.exec(sqlalchemy_delete(UploadSession).where(UploadSession.id.in_([row.id for row in expired])))
+    session.commit()
+    remove_upload_files([row.path for row in expired])
+    return len(expired)
+
+_stop = threading.Event()
+_sweeper: Optional[threading.Thread] = None
+
+def _sweep_loop():
+    while not _stop.wait(settings.upload_sweep_seconds):
+        try:
+            with Session(engine) as session:
+                while expire_uploads(session) == EXPIRE_BATCH:
+                    pass
+        except Exception:
+            logger.error("Błąd sprzątania wygasłych uploadów", exc_info=True)
+
+def start_upload_sweeper():
+    global _sweeper
+    if settings.upload_sweep_seconds <= 0 or _sweeper is not None:
+        return
+    _stop.clear()
+    _sweeper = threading.Thread(target=_sweep_loop, name="upload-sweeper", daemon=True)
+    _sweeper.start()
+
+def stop_upload_sweeper():
+    global _sweeper
+    _stop.set()
+    if _sweeper is not None:
+        _sweeper.join(timeout=5)
+        _sweeper = None
+
+def _get_upload(session: Session, upload_id: str, user) -> UploadSession:
+    upload = session.get(UploadSession, upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Not found")
+    if upload.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if upload.expires_at < datetime.utcnow():
+        raise HTTPException(status_code=410, detail="Upload expired")
+    return upload
+
+@router.post("/{ticket_id}/uploads", status_code=201)
+def create_upload(
+    ticket_id: int,
+    data: UploadCreate,
+    response: Response,
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    ticket = session.get(Ticket, ticket_id)
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Not found")
+    if user.role == "client" and ticket.created_by != user.id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if data.size < 0 or data.size > settings.upload_max_size:
+        raise HTTPException(status_code=413, detail="File too large")
+    filename = os.path.basename(data.filename)
+    if filename in ("", ".", ".."):
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    ticket_folder = os.path.join(UPLOAD_ROOT, str(ticket_id))
+    os.makedirs(ticket_folder, exist_ok=True)
+    file_path = os.path.join(ticket_folder, filename)
+    # Kawałki trafiają od razu do pliku docelowego - plik tworzymy teraz, żeby zarezerwować nazwę
+    try:
+        with open(file_path, "xb"):
+            pass
+    except FileExistsError:
+        raise HTTPException(status_code=409, detail=f"File {filename} already exists")
+
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        ticket_id=ticket_id,
+        user_id=user.id,
+        filename=filename,
+        content_type=data.content_type,
+        size=data.size,
+        path=file_path,
+        expires_at=_expiry()
+    )
+    session.add(upload)
+    session.commit()
+    session.refresh(upload)
+    response.headers.update(_headers(upload))
+    response.headers["Location"] = f"/tickets/uploads/{upload.id}"
+    return {"upload_id": upload.id, "offset": upload.offset, "size": upload.size, "expires_at": upload.expires_at}
+
+@router.head("/uploads/{upload_id}")
+@router.get("/uploads/{upload_id}")
+def get_upload(
+    upload_id: str,
+    response: Response,
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    upload = _get_upload(session, upload_id, user)
+    response.headers.update(_headers(upload))
+    response.headers["Cache-Control"] = "no-store"
+    return {"upload_id": upload.id, "offset": upload.offset, "size": upload.size, "expires_at": upload.expires_at}
+
+def _advance_offset(session: Session, upload_id: str, expected: int, offset: int) -> bool:
+    result = session.exec(
+        sqlalchemy_update(UploadSession)
+        .where(UploadSession.id == upload_id, UploadSession.offset == expected)
+        .values(offset=offset, expires_at=_expiry())
+    )
+    if result.rowcount != 1:
+        session.rollback()
+        return False
+    session.commit()
+    return True
+
+@router.patch("/uploads/{upload_id}", status_code=204)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(...),
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    # Endpoint jest async (strumień treści), więc każda operacja na bazie idzie do puli wątków
+    upload = await run_in_threadpool(_get_upload, session, upload_id, user)
+    if upload_offset != upload.offset:
+        raise HTTPException(status_code=409, detail="Upload-Offset mismatch", headers=_headers(upload))
+    path, size = upload.path, upload.size
+    # Zwolnij połączenie do puli na czas przesyłania treści - może to trwać minuty
+    await run_in_threadpool(session.commit)
+
+    offset = upload_offset
+    with open(path, "r+b") as out:
+        out.seek(offset)
+        try:
+            async for chunk in request.stream():
+                if offset + len(chunk) > size:
+                    raise HTTPException(status_code=413, detail="Chunk exceeds declared upload size")
+                await run_in_threadpool(out.write, chunk)
+                offset += len(chunk)
+        except ClientDisconnect:
+            # Zapisujemy to, co dotarło - klient wznowi od nowego offsetu
+            logger.info(f"Przerwany upload {upload_id} na offsecie {offset}")
+
+    if not await run_in_threadpool(_advance_offset, session, upload_id, upload_offset, offset):
+        raise HTTPException(status_code=409, detail="Concurrent upload to the same session")
+    return Response(status_code=204, headers={"Upload-Offset": str(offset), "Tus-Resumable": TUS_VERSION})
+
+@router.post("/uploads/{upload_id}/finalize", status_code=201)
+def finalize_upload(
+    upload_id: str,
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    upload = _get_upload(session, upload_id, user)
+    if upload.offset != upload.size:
+        raise HTTPException(status_code=409, detail="Upload incomplete", headers=_headers(upload))
+    att = Attachment(
+        ticket_id=upload.ticket_id,
+        filename=upload.filename,
+        content_type=upload.content_type,
+        path=upload.path
+    )
+    # Usunięcie sesji, wiersz Attachment i liczniki zgłoszenia w jednej transakcji;
+    # warunkowy DELETE chroni przed podwójnym zakończeniem
+    result = session.exec(
+        sqlalchemy_delete(UploadSession)
+        .where(UploadSession.id == upload_id, UploadSession.offset == UploadSession.size)
+    )
+    if result.rowcount != 1:
+        session.rollback()
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+    session.add(att)
+    session.exec(
+        sqlalchemy_update(Ticket)
+        .where(Ticket.id == att.ticket_id)
+        .values(
+            attachment_count=Ticket.attachment_count + 1,
+            last_activity_at=datetime.utcnow(),
+            version=Ticket.version + 1
+        )
+    )
+    session.commit()
+    cache.invalidate(ticket_key(att.ticket_id))
+    session.refresh(att)
+    # Hash i miniatury w tle - kawałki nie przechodziły przez jeden strumień, więc hash liczy zadanie
+    schedule_thumbnails(att.id, att.content_type)
+    return {
+        "id": att.id,
+        "filename": att.filename,
+        "content_type": att.content_type,
+        "uploaded_at": att.uploaded_at
+    }
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+def abort_upload(
+    upload_id: str,
+    user=Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    upload = session.get(UploadSession, upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Not found")
+    if upload.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    path = upload.path
+    session.delete(upload)
+    session.commit()
+    remove_upload_files([path])
+    return Response(status_code=204, headers={"Tus-Resumable": TUS_VERSION})
@@ -1,11 +1,15 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, Path, Body
+from fastapi import APIRouter, Depends, HTTPException, Path, Body, Query, Request
 from app.models.user import User
 from app.core.security import decode_access_token, verify_password, hash_password
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session, select
-from sqlalchemy import select as sqlalchemy_select
+from sqlalchemy import select as sqlalchemy_select, func, or_
+from sqlalchemy.orm import make_transient_to_detached
 from app.core.db import get_session
+from app.core.cache import cache, user_key
+from app.services.routing import agent_router, CLOSED_STATUSES
+from app.models.ticket import Ticket
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 
@@ -13,15 +17,36 @@ logger = logging.getLogger("app.error")
 
 router = APIRouter(prefix="/users", tags=["users"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+# Klucz scope z użytkownikiem uwierzytelnionym raz dla całej paczki POST /batch
+BATCH_USER_KEY = "helpdesk.batch_user"
 
-def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+# Pola użytkownika trzymane w cache - bez hashed_password (doczytywany z bazy przy pierwszym dostępie)
+CACHED_USER_FIELDS = ("id", "email", "full_name", "role", "is_active")
+
+def _user_row(session: Session, email: str) -> Optional[dict]:
+    user = session.exec(select(User).where(User.email == email)).first()
+    if not user:
+        return None
+    return {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+
+def cached_user(session: Session, email: str) -> Optional[User]:
+    """Użytkownik z cache, podpięty do sesji bez zapytania - zmiany zapisują się normalnie."""
+    data = cache.get(user_key(email), lambda: _user_row(session, email))
+    if data is None:
+        return None
+    user = User(**data)
+    make_transient_to_detached(user)
+    return session.merge(user, load=False)
+
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
     try:
+        batch_user = request.scope.get(BATCH_USER_KEY)
+        if batch_user is not None:
+            return batch_user
         payload = decode_access_token(token)
         if not payload:
             raise HTTPException(status_code=401, detail="Invalid token")
-        user = session.exec(
-            select(User).where(User.email == payload["sub"])
-        ).first()
+        user = cached_user(session, payload["sub"])
         if not user or not user.is_active:
             raise HTTPException(status_code=404, detail="User not found or inactive")
         return user
@@ -42,18 +67,95 @@ def me(user: User = Depends(get_current_user)):
         logger.error("Błąd pobierania danych użytkownika", exc_info=True)
         raise
 
+# Kolumny wyświetlane w panelu admina - bez hashed_password
+DIRECTORY_COLUMNS = (User.id, User.email, User.full_name, User.role, User.is_active)
+
 @router.get("/")
 def users_list(current: User = Depends(get_current_user), session: Session = Depends(get_session)):
     try:
         if current.role != "admin":
             raise HTTPException(status_code=403, detail="Forbidden")
-        result = session.exec(sqlalchemy_select(User))
-        users = result.scalars().all()
-        return users
+        result = session.exec(sqlalchemy_select(*DIRECTORY_COLUMNS).order_by(User.id))
+        return [dict(row._mapping) for row in result]
     except Exception as e:
         logger.error("Błąd pobierania listy użytkowników", exc_info=True)
         raise
 
+# === Admin: katalog użytkowników ===
+
+def _prefix_pattern(value: str) -> str:
+    escaped = value.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
+
+def open_ticket_counts_query(user_ids: list):
+    return (
+        sqlalchemy_select(Ticket.created_by, Ticket.assigned_to, func.count())
+        .where(
+            Ticket.status.not_in(CLOSED_STATUSES),
+            or_(Ticket.created_by.in_(user_ids), Ticket.assigned_to.in_(user_ids))
+        )
+        .group_by(Ticket.created_by, Ticket.assigned_to)
+    )
+
+def directory_query(q: Optional[str], role: Optional[str], is_active: Optional[bool], after: Optional[str], limit: int):
+    stmt = sqlalchemy_select(*DIRECTORY_COLUMNS)
+    if q:
+        # Prefiks e-maila lub imienia i nazwiska - oba warunki mają indeksy na lower(...)
+        pattern = _prefix_pattern(q.strip())
+        stmt = stmt.where(or_(
+            func.lower(User.email).like(pattern, escape="\\"),
+            func.lower(User.full_name).like(pattern, escape="\\")
+        ))
+    if role is not None:
+        stmt = stmt.where(User.role == role)
+    if is_active is not None:
+        stmt = stmt.where(User.is_active == is_active)
+    # Stronicowanie po kursorze (unikalny e-mail) - koszt strony nie rośnie z jej numerem
+    if after is not None:
+        stmt = stmt.where(User.email > after)
+    return stmt.order_by(User.email).limit(limit)
+
+def open_ticket_counts(session: Session, user_ids: list) -> dict:
+    """Otwarte zgłoszenia (utworzone, przypisane) dla podanych użytkowników - jedno zapytanie."""
+    counts = {user_id: {"open_tickets_created": 0, "open_tickets_assigned": 0} for user_id in user_ids}
+    if not user_ids:
+        return counts
+    rows = session.exec(open_ticket_counts_query(user_ids)).all()
+    for created_by, assigned_to, count in rows:
+        if created_by in counts:
+            counts[created_by]["open_tickets_created"] += count
+        if assigned_to in counts:
+            counts[assigned_to]["open_tickets_assigned"] += count
+    return counts
+
+@router.get("/directory", summary="Katalog użytkowników z wyszukiwaniem i stronicowaniem (admin)")
+def users_directory(
+    q: Optional[str] = None,
+    role: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    after: Optional[str] = Query(default=None, description="E-mail ostatniego użytkownika z poprzedniej strony"),
+    limit: int = Query(default=50, ge=1, le=200),
+    current: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    try:
+        if current.role != "admin":
+            raise HTTPException(status_code=403, detail="Forbidden")
+        rows = session.exec(directory_query(q, role, is_active, after, limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        counts = open_ticket_counts(session, [row.id for row in rows])
+        items = [{**row._mapping, **counts[row.id]} for row in rows]
+        return {
+            "items": items,
+            "next_cursor": items[-1]["email"] if has_more else None
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Błąd pobierania katalogu użytkowników", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
 # === Profile update ===
 
 class ProfileUpdateRequest(BaseModel):
@@ -69,6 +171,7 @@ def update_profile(
         user.full_name = data.full_name
         session.add(user)
         session.commit()
+        cache.invalidate(user_key(user.email))
         session.refresh(user)
         return {
             "msg": "Profil został zaktualizowany",
@@ -124,6 +227,7 @@ def admin_update_user(
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
+        old_email = user.email
         if data.full_name is not None:
             user.full_name = data.full_name
         if data.email is not None:
@@ -138,7 +242,10 @@ def admin_update_user(
 
         session.add(user)
         session.commit()
+        cache.invalidate(user_key(old_email), user_key(user.email))
         session.refresh(user)
+        # Zmiana roli lub dezaktywacja zmienia pulę agentów do automatycznego przypisywania
+        agent_router.on_user_change(user, session)
 
         return {
             "id": user.id,
@@ -191,8 +298,11 @@ def delete_user(
         user = session.get(User, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
+        email = user.email
         session.delete(user)
         session.commit()
+        cache.invalidate(user_key(email))
+        agent_router.remove_user(user_id)
         return {"msg": "Użytkownik został usunięty"}
     except Exception as e:
         logger.error(f"Błąd usuwania użytkownika {user_id}", exc_info=True)
@@ -0,0 +1,342 @@
+"""
+Masowy eksport i import danych helpdesku z pominięciem REST API.
+
+    python -m app.bulk export --out DIR [--format ndjson|csv] [--include-secrets]
+    python -m app.bulk import --in DIR [--format ndjson|csv]
+
+Eksport czyta tabele kursorem po stronie serwera (yield_per), więc zużycie pamięci
+nie zależy od liczby wierszy. Import zapisuje paczkami przez COPY (PostgreSQL) albo
+executemany (SQLite) i przemapowuje klucze obce: użytkownicy po e-mailu, kategorie
+i priorytety po nazwie, pozostałe wiersze dostają nowe identyfikatory.
+Ścieżki załączników są przepisywane na attachments/<nowe ticket_id>/; pliki
+kopiuje import z --attachments-from (katalog attachments źródłowej instalacji),
+bez tej opcji trzeba je rozłożyć według nowych ścieżek samodzielnie.
+Zarchiwizowane zgłoszenia (z komentarzami i załącznikami) trafiają do osobnych
+plików archived_* i wracają do archiwum bazy docelowej.
+"""
+import io
+import os
+import sys
+import csv
+import json
+import logging
+import shutil
+import argparse
+from datetime import datetime
+from sqlalchemy import select as sqlalchemy_select, insert, func, text, Integer, Boolean, DateTime, Float
+from sqlmodel import Session
+from app.models.category import Category
+from app.models.priority import Priority
+from app.models.user import User
+from app.models.ticket import Ticket, Comment
+from app.models.attachment import Attachment
+from app.models.archive import ArchivedTicket, ArchivedComment, ArchivedAttachment
+from app.api.attachments import UPLOAD_ROOT
+from app.core.db import engine, init_db
+from app.core.cache import cache, CATEGORIES_KEY, PRIORITIES_KEY
+
+logger = logging.getLogger("app.bulk")
+
+BATCH_SIZE = 10000
+
+# Kolejność ma znaczenie - import musi znać nowe ID rodziców przed dziećmi
+ENTITIES = [
+    ("categories", Category),
+    ("priorities", Priority),
+    ("users", User),
+    ("tickets", Ticket),
+    ("comments", Comment),
+    ("attachments", Attachment),
+    ("archived_tickets", ArchivedTicket),
+    ("archived_comments", ArchivedComment),
+    ("archived_attachments", ArchivedAttachment),
+]
+
+# Hasło, którym nie da się zalogować (verify_password odrzuca nierozpoznany hash) -
+# konto trzeba odzyskać resetem hasła
+UNUSABLE_PASSWORD = "!"
+
+# Archiwum zachowuje identyfikatory - nowe ID nie mogą się z nimi pokrywać
+ARCHIVE_TABLES = {
+    Ticket.__table__.name: ArchivedTicket.__table__,
+    Comment.__table__.name: ArchivedComment.__table__,
+    Attachment.__table__.name: ArchivedAttachment.__table__,
+}
+HOT_TABLES = {archive.name: hot for hot, archive in (
+    (Ticket.__table__, ArchivedTicket.__table__),
+    (Comment.__table__, ArchivedComment.__table__),
+    (Attachment.__table__, ArchivedAttachment.__table__),
+)}
+
+# === Eksport ===
+
+def _to_text(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def export_data(out_dir: str, fmt: str = "ndjson", include_secrets: bool = False):
+    os.makedirs(out_dir, exist_ok=True)
+    with Session(engine) as session:
+        for name, model in ENTITIES:
+            table = model.__table__
+            columns = [c for c in table.columns if include_secrets or c.name != "hashed_password"]
+            result = session.exec(
+                sqlalchemy_select(*columns)
+                .order_by(table.c.id)
+                .execution_options(yield_per=BATCH_SIZE)
+            )
+            path = os.path.join(out_dir, f"{name}.{fmt}")
+            count = 0
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                if fmt == "csv":
+                    writer = csv.writer(f)
+                    writer.writerow([c.name for c in columns])
+                    for row in result:
+                        writer.writerow(["" if v is None else _to_text(v) for v in row])
+                        count += 1
+                else:
+                    for row in result:
+                        f.write(json.dumps({k: _to_text(v) for k, v in row._mapping.items()}, ensure_ascii=False))
+                        f.write("\n")
+                        count += 1
+            logger.info(f"Eksport {name}: {count} wierszy -> {path}")
+
+# === Import ===
+
+def _coerce(column, value):
+    # CSV nie odróżnia NULL od pustego napisu - dla kolumn nietekstowych "" oznacza NULL
+    if value is None:
+        return None
+    column_type = column.type
+    if isinstance(column_type, (Integer, Boolean, DateTime, Float)) and value == "":
+        return None
+    if isinstance(column_type, Boolean) and isinstance(value, str):
+        return value.lower() in ("1", "true", "t", "yes")
+    if isinstance(column_type, Integer):
+        return int(value)
+    if isinstance(column_type, Float):
+        return float(value)
+    if isinstance(column_type, DateTime) and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+def _read_rows(path: str, fmt: str, table):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f) if fmt == "csv" else (json.loads(line) for line in f if line.strip())
+        for raw in reader:
+            yield {k: _coerce(table.c[k], v) for k, v in raw.items() if k in table.c}
+
+def _batches(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _reserve_ids(session: Session, table, count: int) -> list:
+    # Nowe ID nadajemy z góry, żeby znać mapowanie stare -> nowe bez RETURNING (COPY go nie ma).
+    # Wiersze archiwum dostają ID z gorącej tabeli - archiwizacja zachowuje identyfikatory
+    table = HOT_TABLES.get(table.name, table)
+    if session.get_bind().dialect.name == "postgresql":
+        return session.exec(
+            text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :n)"),
+            params={"table": f'"{table.name}"', "n": count}
+        ).scalars().all()
+    # SQLite: jeden zapisujący naraz, wystarczy kontynuować od max(id) tabeli i jej archiwum
+    last = session.exec(sqlalchemy_select(func.max(table.c.id))).scalar() or 0
+    archive = ARCHIVE_TABLES.get(table.name)
+    if archive is not None:
+        last = max(last, session.exec(sqlalchemy_select(func.max(archive.c.id))).scalar() or 0)
+    start = last + 1
+    return list(range(start, start + count))
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+def _write_batch(session: Session, table, rows: list):
+    connection = session.connection()
+    if connection.dialect.name == "postgresql":
+        columns = list(rows[0].keys())
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_value(row[c]) for c in columns))
+            buffer.write("\n")
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(f'COPY "{table.name}" ({", ".join(columns)}) FROM STDIN', buffer)
+        finally:
+            cursor.close()
+    else:
+        connection.execute(insert(table), rows)
+
+def _load(session: Session, name: str, model, rows, transform, id_map: dict):
+    table = model.__table__
+    count = skipped = 0
+    for batch in _batches(rows, BATCH_SIZE):
+        prepared = []
+        for row in batch:
+            old_id = row.get("id")
+            row = transform(row)
+            if row is None:
+                skipped += 1
+                continue
+            prepared.append((old_id, row))
+        if not prepared:
+            continue
+        for (old_id, row), new_id in zip(prepared, _reserve_ids(session, table, len(prepared))):
+            row["id"] = new_id
+            if old_id is not None:
+                id_map[old_id] = new_id
+        _write_batch(session, table, [row for _, row in prepared])
+        count += len(prepared)
+    logger.info(f"Import {name}: {count} wierszy, pominięto {skipped}")
+
+def _import_catalog(session: Session, model, rows, id_map: dict):
+    # Małe słowniki - dopasowanie po unikalnej nazwie, brakujące tworzymy pojedynczo
+    existing = {obj.name: obj.id for obj in session.exec(sqlalchemy_select(model)).scalars()}
+    for row in rows:
+        if row["name"] not in existing:
+            obj = model(**{k: v for k, v in row.items() if k != "id"})
+            session.add(obj)
+            session.flush()
+            existing[obj.name] = obj.id
+        id_map[row["id"]] = existing[row["name"]]
+
+def _copy_attachment_files(source_dir: str, moves: list):
+    copied = missing = 0
+    for old_path, new_path in moves:
+        source = os.path.join(source_dir, old_path)
+        if not os.path.exists(source):
+            missing += 1
+            continue
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        shutil.copy2(source, new_path)
+        copied += 1
+    logger.info(f"Pliki załączników: skopiowano {copied}, brak w źródle {missing}")
+
+def import_data(in_dir: str, fmt: str = "ndjson", attachments_from: str = None):
+    init_db()
+    maps = {name: {} for name, _ in ENTITIES}
+    # (ścieżka względem katalogu ticketu w źródle, nowa ścieżka) - pliki kopiowane po commit
+    attachment_moves = []
+
+    def remap(row, column, name, required=False):
+        if row.get(column) is None:
+            return not required
+        new_id = maps[name].get(row[column])
+        if new_id is None:
+            return False
+        row[column] = new_id
+        return True
+
+    def user_row(row):
+        if row["email"] in existing_users:
+            maps["users"][row["id"]] = existing_users[row["email"]]
+            return None
+        row.setdefault("hashed_password", UNUSABLE_PASSWORD)
+        return row
+
+    def archived_ticket_row(row):
+        if not remap(row, "created_by", "users", required=True):
+            return None
+        row["assigned_to"] = row.get("assigned_to") if remap(row, "assigned_to", "users") else None
+        row["category_id"] = row.get("category_id") if remap(row, "category_id", "categories") else None
+        row["priority_id"] = row.get("priority_id") if remap(row, "priority_id", "priorities") else None
+        return row
+
+    def ticket_row(row):
+        row = archived_ticket_row(row)
+        if row is not None:
+            # Poziom z priorytetu w bazie docelowej - ten sam priorytet mógł mieć tam inny level
+            row["priority_level"] = priority_levels.get(row["priority_id"])
+        return row
+
+    def comment_row(row, tickets="tickets"):
+        if not remap(row, "ticket_id", tickets, required=True) or not remap(row, "author_id", "users", required=True):
+            return None
+        return row
+
+    def attachment_row(row, tickets="tickets"):
+        old_ticket_id = row.get("ticket_id")
+        if not remap(row, "ticket_id", tickets, required=True):
+            return None
+        # Plik leżał w attachments/<stare ticket_id>/ - w tej bazie ten katalog należy do innego zgłoszenia
+        filename = os.path.basename(row["path"])
+        new_path = os.path.join(UPLOAD_ROOT, str(row["ticket_id"]), filename)
+        attachment_moves.append((os.path.join(str(old_ticket_id), filename), new_path))
+        row["path"] = new_path
+        return row
+
+    transforms = {
+        "users": user_row,
+        "tickets": ticket_row,
+        "comments": comment_row,
+        "attachments": attachment_row,
+        "archived_tickets": archived_ticket_row,
+        "archived_comments": lambda row: comment_row(row, "archived_tickets"),
+        "archived_attachments": lambda row: attachment_row(row, "archived_tickets"),
+    }
+
+    with Session(engine) as session:
+        existing_users = {
+            email: user_id for user_id, email in session.exec(sqlalchemy_select(User.id, User.email))
+        }
+        priority_levels = {}
+        for name, model in ENTITIES:
+            path = os.path.join(in_dir, f"{name}.{fmt}")
+            if not os.path.exists(path):
+                logger.info(f"Import {name}: brak pliku {path}, pomijam")
+                continue
+            rows = _read_rows(path, fmt, model.__table__)
+            if name in ("categories", "priorities"):
+                _import_catalog(session, model, rows, maps[name])
+                if name == "priorities":
+                    priority_levels.update(session.exec(sqlalchemy_select(Priority.id, Priority.level)).all())
+            else:
+                _load(session, name, model, rows, transforms[name], maps[name])
+        # Całość w jednej transakcji - nieudany import nie zostawia połowy danych
+        session.commit()
+    cache.invalidate(CATEGORIES_KEY, PRIORITIES_KEY)
+    if attachments_from:
+        _copy_attachment_files(attachments_from, attachment_moves)
+    elif attachment_moves:
+        logger.warning("Ścieżki załączników przepisano na nowe ID zgłoszeń - pliki skopiuj z --attachments-from")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.bulk", description="Masowy eksport/import danych helpdesku")
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export", help="Eksport do plików NDJSON/CSV")
+    exp.add_argument("--out", required=True, help="Katalog docelowy")
+    exp.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    exp.add_argument("--include-secrets", action="store_true", help="Eksportuj także hashed_password")
+    imp = sub.add_parser("import", help="Import z plików NDJSON/CSV")
+    imp.add_argument("--in", dest="in_dir", required=True, help="Katalog z plikami eksportu")
+    imp.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    imp.add_argument("--attachments-from", help="Katalog attachments źródłowej instalacji (pliki <ticket_id>/<nazwa>)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    if args.command == "export":
+        export_data(args.out, args.format, args.include_secrets)
+    else:
+        import_data(args.in_dir, args.format, args.attachments_from)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
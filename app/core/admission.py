@@ -0,0 +1,236 @@
+"""
+Kontrola przyjmowania żądań (admission control).
+
+Synchroniczne endpointy wykonują się w puli wątków AnyIO, a każdy z nich
+potrzebuje połączenia z puli SQLAlchemy. Gdy wątków jest więcej niż połączeń,
+nadmiarowe żądania czekają na połączenie aż do timeoutu proxy. Middleware
+ogranicza liczbę jednocześnie obsługiwanych żądań (globalnie i per trasa),
+nadmiar trzyma w ograniczonej kolejce z priorytetami (agenci przed
+zalogowanymi klientami, ci przed anonimowymi), a resztę od razu odrzuca
+kodem 503 z nagłówkiem Retry-After.
+"""
+import json
+import heapq
+import asyncio
+import itertools
+from fnmatch import fnmatch
+from typing import List, Optional, Tuple
+from anyio import to_thread
+from app.core.config import settings
+from app.core.security import decode_access_token
+from app.core.cache import cache, user_key
+
+# Pasy priorytetu - mniejsza liczba obsługiwana wcześniej
+LANE_AGENT = 0
+LANE_USER = 1
+LANE_ANONYMOUS = 2
+
+# Middleware w scope - POST /batch przepuszcza przez te same bramki każde podżądanie
+ADMISSION_KEY = "helpdesk.admission"
+
+class Gate:
+    """Semafor z ograniczoną kolejką priorytetową; przy przepełnieniu wypycha najniższy priorytet."""
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.shed = 0
+        self._waiters = []  # (pas, numer kolejny, future)
+        self._seq = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def try_acquire(self) -> bool:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        return False
+
+    async def acquire(self, lane: int) -> bool:
+        if self.try_acquire():
+            return True
+        if len(self._waiters) >= self.queue_size:
+            if not self._waiters:
+                # ADMISSION_QUEUE_SIZE=0 - bez kolejki
+                self.shed += 1
+                return False
+            worst = max(self._waiters, key=lambda w: (w[0], w[1]))
+            if worst[0] <= lane:
+                self.shed += 1
+                return False
+            # Nowe żądanie ma wyższy priorytet niż najgorsze czekające - to ono dostaje 503
+            self._waiters.remove(worst)
+            heapq.heapify(self._waiters)
+            worst[2].set_result(False)
+        entry = (lane, next(self._seq), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, entry)
+        try:
+            admitted = await asyncio.wait_for(entry[2], self.timeout)
+        except asyncio.TimeoutError:
+            admitted = False
+        except asyncio.CancelledError:
+            # Klient się rozłączył - jeśli slot zdążył zostać przekazany, oddajemy go
+            future = entry[2]
+            if future.done() and not future.cancelled() and future.result():
+                self.release()
+            self._discard(entry)
+            raise
+        if not admitted:
+            self._discard(entry)
+            self.shed += 1
+        return admitted
+
+    def _discard(self, entry):
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+
+    def release(self):
+        # Slot przechodzi bezpośrednio na następnego czekającego - active się nie zmienia
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(True)
+                return
+        self.active -= 1
+
+def _parse_route(pattern: str) -> Tuple[str, str]:
+    # "GET /tickets/*" albo samo "/tickets/*" (dowolna metoda)
+    parts = pattern.split(None, 1)
+    if len(parts) == 1:
+        return "*", parts[0]
+    return parts[0].upper(), parts[1].strip()
+
+def parse_routes(value: str) -> List[Tuple[str, str]]:
+    """'PATCH /tickets/uploads/*, /docs' -> [(metoda, wzorzec)]"""
+    return [_parse_route(item.strip()) for item in value.split(",") if item.strip()]
+
+def parse_route_limits(value: str) -> List[Tuple[str, str, int]]:
+    """'POST /tickets/*/attachments=4, GET /tickets/*/attachments.zip=2' -> [(metoda, wzorzec, limit)]"""
+    rules = []
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        pattern, limit = item.rsplit("=", 1)
+        rules.append((*_parse_route(pattern.strip()), int(limit)))
+    return rules
+
+def _matches(method: str, path: str, rule_method: str, rule_path: str) -> bool:
+    return (rule_method == "*" or rule_method == method) and fnmatch(path, rule_path)
+
+def request_lane(scope) -> int:
+    """
+    Pas priorytetu z tokenu JWT; rola z lokalnego L1 cache użytkowników. Woła
+    się w pętli zdarzeń, więc bez bazy i bez L2 (Redis) - użytkownik, którego
+    ten worker jeszcze nie zna, trafia do pasa zalogowanych klientów.
+    """
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return LANE_ANONYMOUS
+            payload = decode_access_token(token)
+            if not payload or "sub" not in payload:
+                return LANE_ANONYMOUS
+            user = cache.peek(user_key(payload["sub"]))
+            if user and user.get("role") in ("helpdesk", "admin"):
+                return LANE_AGENT
+            return LANE_USER
+    return LANE_ANONYMOUS
+
+class AdmissionMiddleware:
+    """Czyste ASGI - jeden licznik na proces (worker), bez blokad: wszystko dzieje się w pętli zdarzeń."""
+
+    def __init__(self, app, max_concurrency: Optional[int] = None, route_limits: Optional[str] = None,
+                 exempt: Optional[str] = None, queue_size: Optional[int] = None,
+                 queue_timeout: Optional[float] = None, retry_after: Optional[int] = None):
+        self.app = app
+        queue_size = settings.admission_queue_size if queue_size is None else queue_size
+        queue_timeout = settings.admission_queue_timeout if queue_timeout is None else queue_timeout
+        self.retry_after = settings.admission_retry_after if retry_after is None else retry_after
+        limit = max_concurrency or settings.admission_max_concurrency or settings.thread_limit
+        self.gate = Gate("*", limit, queue_size, queue_timeout)
+        routes = settings.admission_route_limits if route_limits is None else route_limits
+        self.routes = [
+            (method, path, Gate(f"{method} {path}", route_limit, queue_size, queue_timeout))
+            for method, path, route_limit in parse_route_limits(routes)
+        ]
+        exempt = settings.admission_exempt if exempt is None else exempt
+        self.exempt = parse_routes(exempt)
+
+    def gates_for(self, method: str, path: str) -> List[Gate]:
+        gates = [gate for rule_method, rule_path, gate in self.routes if _matches(method, path, rule_method, rule_path)]
+        # Trasy wyłączone (np. długie uploady strumieniowe) nie zajmują globalnych slotów puli wątków
+        if not any(_matches(method, path, m, p) for m, p in self.exempt):
+            gates.append(self.gate)
+        return gates
+
+    async def acquire(self, scope, gates: List[Gate]) -> Optional[List[Gate]]:
+        """Zajmuje sloty wszystkich bramek; None - przeciążenie (nic nie zostaje zajęte)."""
+        lane = None
+        acquired = []
+        try:
+            for gate in gates:
+                if not gate.try_acquire():
+                    # Pas liczymy dopiero przy kolejce - szybka ścieżka nie dekoduje tokenu
+                    if lane is None:
+                        lane = request_lane(scope)
+                    if not await gate.acquire(lane):
+                        self.release(acquired)
+                        return None
+                acquired.append(gate)
+        except BaseException:
+            self.release(acquired)
+            raise
+        return acquired
+
+    @staticmethod
+    def release(acquired: List[Gate]):
+        for gate in reversed(acquired):
+            gate.release()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+        scope[ADMISSION_KEY] = self
+        gates = self.gates_for(scope["method"], scope["path"])
+        if not gates:
+            return await self.app(scope, receive, send)
+        acquired = await self.acquire(scope, gates)
+        if acquired is None:
+            return await self._reject(send)
+
+        async def send_wrapper(message):
+            # Handler zwrócił odpowiedź - globalny slot (wątek i połączenie z bazą) wraca do puli,
+            # zanim ruszy strumień pliku czy ZIP-a; limity per trasa obejmują całą transmisję
+            if message["type"] == "http.response.start" and self.gate in acquired:
+                acquired.remove(self.gate)
+                self.gate.release()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.release(acquired)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": "Serwer jest przeciążony, spróbuj ponownie później"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+async def configure_thread_limiter():
+    """Rozmiar puli wątków AnyIO (domyślnie 40) dopasowany do puli połączeń bazy."""
+    to_thread.current_default_thread_limiter().total_tokens = settings.thread_limit
@@ -0,0 +1,298 @@
+"""
+Dwupoziomowy cache współdzielony między workerami.
+
+L1 to lokalny LRU w pamięci procesu (odczyt bez I/O). L2 jest opcjonalny
+i mówi protokołem Redisa (CACHE_URL=redis://...); CACHE_URL=memory:// daje
+zastępnik w pamięci do testów i pracy lokalnej. Zapis w API po commit woła
+cache.invalidate(...): klucze znikają z L1 i L2, a komunikat pub/sub czyści
+L1 pozostałych workerów. Bez CACHE_URL działa tylko L1 - wystarcza przy
+jednym workerze. Przy kilku workerach (WEB_CONCURRENCY > 1) bez wspólnego L2
+cache jest wyłączony: unieważnienia nie docierają do innych procesów, więc
+dezaktywacja konta, zmiana roli czy ETag zgłoszenia byłyby nieaktualne aż do
+wygaśnięcia TTL.
+"""
+import json
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from time import monotonic
+from typing import Callable, Optional
+from app.core.config import settings
+
+logger = logging.getLogger("app.error")
+
+CHANNEL = "helpdesk:cache:invalidate"
+_MISSING = object()
+
+def _default(value):
+    if isinstance(value, datetime):
+        return {"__dt__": value.isoformat()}
+    raise TypeError(f"Nieobsługiwany typ w cache: {type(value).__name__}")
+
+def _object_hook(value: dict):
+    if len(value) == 1 and "__dt__" in value:
+        return datetime.fromisoformat(value["__dt__"])
+    return value
+
+def dumps(value) -> bytes:
+    return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+def loads(data: bytes):
+    return json.loads(data, object_hook=_object_hook)
+
+class LocalCache:
+    """LRU z TTL, bezpieczny wątkowo."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            expires, value = item
+            if expires < monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._data[key] = (monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+class MemoryBackend:
+    """Zastępnik L2 w pamięci procesu - wspólny dla wszystkich instancji Cache w tym procesie."""
+
+    # Inne procesy (workery) nie widzą tych danych ani komunikatów
+    shared = False
+
+    _store = {}
+    _subscribers = []
+    _lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._store.get(key)
+        if item is None or item[0] < monotonic():
+            return None
+        return item[1]
+
+    def set(self, key: str, value: bytes, ttl: int):
+        with self._lock:
+            self._store[key] = (monotonic() + ttl, value)
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._store.pop(key, None)
+
+    def publish(self, channel: str, message: bytes):
+        with self._lock:
+            subscribers = [callback for ch, callback in self._subscribers if ch == channel]
+        for callback in subscribers:
+            callback(message)
+
+    def subscribe(self, channel: str, callback: Callable[[bytes], None]):
+        with self._lock:
+            self._subscribers.append((channel, callback))
+        return lambda: self._unsubscribe(channel, callback)
+
+    def _unsubscribe(self, channel, callback):
+        with self._lock:
+            if (channel, callback) in self._subscribers:
+                self._subscribers.remove((channel, callback))
+
+class RedisBackend:
+    """L2 w Redisie (lub zgodnym: Azure Cache for Redis, KeyDB, Valkey). Wymaga pakietu redis."""
+
+    shared = True
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_URL wskazuje Redisa, ale pakiet redis nie jest zainstalowany (pip install redis)")
+        self._client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int):
+        self._client.set(key, value, ex=ttl)
+
+    def delete(self, keys):
+        self._client.delete(*keys)
+
+    def publish(self, channel: str, message: bytes):
+        self._client.publish(channel, message)
+
+    def subscribe(self, channel: str, callback: Callable[[bytes], None]):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{channel: lambda message: callback(message["data"])})
+        worker = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+        def unsubscribe():
+            worker.stop()
+            pubsub.close()
+        return unsubscribe
+
+def create_backend(url: str):
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Nieobsługiwany CACHE_URL: {url}")
+
+def cache_enabled(backend, workers: int) -> bool:
+    # Jeden worker albo wspólny L2 z pub/sub - inaczej unieważnienia nie docierają do wszystkich
+    return workers <= 1 or (backend is not None and backend.shared)
+
+class Cache:
+    def __init__(self, backend=None, max_size: int = 1024, ttl: int = 300, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.ttl = ttl
+        self.local = LocalCache(max_size, ttl)
+        self.origin = uuid.uuid4().hex
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._unsubscribe = None
+
+    def start(self):
+        """Subskrypcja unieważnień od innych workerów."""
+        if not self.enabled:
+            logger.warning("Cache wyłączony: kilka workerów bez wspólnego CACHE_URL (redis://)")
+        if self.backend is None or self._unsubscribe is not None:
+            return
+        self._unsubscribe = self.backend.subscribe(CHANNEL, self._on_message)
+
+    def stop(self):
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    def _on_message(self, message: bytes):
+        try:
+            payload = loads(message)
+        except Exception:
+            logger.error("Nieprawidłowy komunikat unieważnienia cache", exc_info=True)
+            return
+        if payload.get("origin") == self.origin:
+            return
+        self._drop_local(payload.get("keys", []))
+
+    def _drop_local(self, keys):
+        with self._lock:
+            self._generation += 1
+        self.local.delete(keys)
+
+    def get(self, key: str, loader: Optional[Callable[[], object]] = None):
+        """
+        Zwraca wartość z L1, potem z L2; przy braku woła loader i zapisuje wynik
+        (None nie jest zapisywane). Wartości muszą dać się zserializować do JSON.
+        Wyłączony cache zawsze woła loader.
+        """
+        if not self.enabled:
+            return loader() if loader is not None else None
+        value = self.local.get(key)
+        if value is not _MISSING:
+            return value
+        generation = self._generation
+        if self.backend is not None:
+            try:
+                data = self.backend.get(key)
+            except Exception:
+                logger.error("Błąd odczytu z cache L2", exc_info=True)
+                data = None
+            if data is not None:
+                value = loads(data)
+                self._store_local(key, value, generation)
+                return value
+        if loader is None:
+            return None
+        value = loader()
+        if value is not None:
+            self.set(key, value, generation)
+        return value
+
+    def peek(self, key: str):
+        """Tylko L1, bez I/O i bez loadera - do odczytów z pętli zdarzeń."""
+        if not self.enabled:
+            return None
+        value = self.local.get(key)
+        return None if value is _MISSING else value
+
+    def _store_local(self, key: str, value, generation: int):
+        # Unieważnienie w trakcie ładowania - wynik mógł być przeczytany przed zapisem, nie utrwalamy go
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self.local.set(key, value)
+            return True
+
+    def set(self, key: str, value, generation: Optional[int] = None):
+        if not self.enabled:
+            return
+        if generation is None:
+            generation = self._generation
+        if not self._store_local(key, value, generation):
+            return
+        if self.backend is not None:
+            try:
+                self.backend.set(key, dumps(value), self.ttl)
+            except Exception:
+                logger.error("Błąd zapisu do cache L2", exc_info=True)
+
+    def invalidate(self, *keys: str):
+        """Wołać po commit - inaczej inny worker może zdążyć wczytać starą wersję."""
+        keys = [k for k in keys if k]
+        if not keys:
+            return
+        self._drop_local(keys)
+        if self.backend is None:
+            return
+        try:
+            self.backend.delete(keys)
+            self.backend.publish(CHANNEL, dumps({"origin": self.origin, "keys": keys}))
+        except Exception:
+            logger.error("Błąd unieważniania cache L2", exc_info=True)
+
+    def clear_local(self):
+        self.local.clear()
+
+_backend = create_backend(settings.cache_url)
+cache = Cache(
+    _backend, settings.cache_size, settings.cache_ttl_seconds,
+    enabled=cache_enabled(_backend, settings.server_workers)
+)
+
+# Klucze używane przez API - w jednym miejscu, żeby zapis i odczyt się nie rozjechały
+def user_key(email: str) -> str:
+    return f"user:{email}"
+
+def ticket_key(ticket_id: int) -> str:
+    return f"ticket:{ticket_id}"
+
+CATEGORIES_KEY = "categories"
+PRIORITIES_KEY = "priorities"
@@ -0,0 +1,157 @@
+"""
+Kompresja odpowiedzi (brotli/gzip) wg Accept-Encoding.
+
+Kompresowane są tylko typy tekstowe i nasze formaty danych (JSON, MessagePack)
+powyżej COMPRESSION_MIN_SIZE - pliki załączników (także tekstowe i JSON:
+Content-Disposition: attachment albo Accept-Ranges z FileResponse), ZIP-y
+i miniatury idą bez zmian (Range/ETag musi dotyczyć oryginału).
+Odpowiedzi z gotowym Content-Encoding (np. z precompressed_response) są
+przepuszczane bez ponownej kompresji.
+"""
+import gzip
+import zlib
+from typing import Optional
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # bez pakietu brotli zostaje gzip
+    brotli = None
+
+GZIP_LEVEL = 6
+# Dynamiczne odpowiedzi: niska jakość brotli jest szybsza od gzip -6 i daje mniejszy wynik
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/msgpack", "application/x-msgpack")
+COMPRESSIBLE_SUFFIXES = ("+json", "+msgpack")
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type.startswith(COMPRESSIBLE_TYPES) or media_type.endswith(COMPRESSIBLE_SUFFIXES)
+
+def is_file_download(headers: dict) -> bool:
+    # Plik (FileResponse wysyła Accept-Ranges) - zakresy bajtów dotyczą treści bez kompresji
+    disposition = headers.get(b"content-disposition", b"").lower()
+    return disposition.startswith(b"attachment") or b"accept-ranges" in headers
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """'br' lub 'gzip' zgodnie z Accept-Encoding (z uwzględnieniem q=0); None - bez kompresji."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+def compress(data: bytes, encoding: str, quality: Optional[int] = None) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY if quality is None else quality)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL if quality is None else quality, mtime=0)
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+            self._process = self._compressor.process
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+            self._process = self._compressor.compress
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flush po każdym kawałku - strumień (np. eksport) nie może utknąć w buforze kompresora
+        return self._process(data) + self._flush()
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.compression_min_size if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept_encoding = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                headers = {name.lower(): value for name, value in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if (
+                    b"content-encoding" in headers
+                    or message["status"] in (204, 206, 304)
+                    or not is_compressible(content_type)
+                    or is_file_download(headers)
+                ):
+                    passthrough = True
+                    return await send(message)
+                # Nagłówki wysyłamy dopiero z pierwszym kawałkiem treści - wtedy wiadomo, czy kompresować
+                start = message
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(self._start(start, None))
+                    return await send(message)
+                if not more_body:
+                    data = compress(body, encoding)
+                    await send(self._start(start, encoding, length=len(data)))
+                    return await send({"type": "http.response.body", "body": data})
+                compressor = _StreamCompressor(encoding)
+                await send(self._start(start, encoding))
+            data = compressor.chunk(body) if body else b""
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _start(start, encoding: Optional[str], length: Optional[int] = None):
+        headers = []
+        for name, value in start.get("headers", []):
+            if encoding and name.lower() == b"content-length":
+                continue
+            # Skompresowana treść to inna reprezentacja - silny ETag staje się słabym
+            if encoding and name.lower() == b"etag" and not value.startswith(b"W/"):
+                value = b"W/" + value
+            headers.append((name, value))
+        headers.append((b"vary", b"Accept-Encoding"))
+        if encoding:
+            headers.append((b"content-encoding", encoding.encode()))
+            if length is not None:
+                headers.append((b"content-length", str(length).encode()))
+        return {**start, "headers": headers}
@@ -11,5 +11,86 @@ class Settings(BaseSettings):
     jwt_secret: str = os.getenv("JWT_SECRET", "supersecretkey")
     jwt_algorithm: str = os.getenv("JWT_ALGORITHM", "HS256")
     jwt_exp_minutes: int = int(os.getenv("JWT_EXP_MINUTES", 60 * 24))
+    # Powiadomienia e-mail: okno łączenia zdarzeń w jeden digest i częstotliwość wysyłki (0 = wyłączone)
+    notification_digest_minutes: int = int(os.getenv("NOTIFICATION_DIGEST_MINUTES", 15))
+    notification_flush_seconds: int = int(os.getenv("NOTIFICATION_FLUSH_SECONDS", 60))
+    # Nieudana wysyłka digestu: odstęp ponowienia i limit prób, po którym zdarzenia są porzucane
+    notification_retry_seconds: int = int(os.getenv("NOTIFICATION_RETRY_SECONDS", 300))
+    notification_max_attempts: int = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", 5))
+    # Log wolnych zapytań i wykrywanie N+1 (ten sam kształt zapytania > N razy w jednym żądaniu)
+    db_echo: bool = os.getenv("DB_ECHO", "false").lower() == "true"
+    slow_query_ms: float = float(os.getenv("SLOW_QUERY_MS", 200))
+    n_plus_one_threshold: int = int(os.getenv("N_PLUS_ONE_THRESHOLD", 10))
+    # Archiwizacja zamkniętych zgłoszeń (python -m app.services.archive)
+    archive_after_days: int = int(os.getenv("ARCHIVE_AFTER_DAYS", 365))
+    archive_batch_size: int = int(os.getenv("ARCHIVE_BATCH_SIZE", 500))
+    # Wznawialny upload załączników: ważność nieukończonej sesji i maksymalny rozmiar pliku
+    upload_expiry_hours: int = int(os.getenv("UPLOAD_EXPIRY_HOURS", 24))
+    upload_max_size: int = int(os.getenv("UPLOAD_MAX_SIZE", 10 * 1024 ** 3))
+    upload_sweep_seconds: int = int(os.getenv("UPLOAD_SWEEP_SECONDS", 3600))
+    # Wykrywanie duplikatów zgłoszeń: okno wyszukiwania i minimalne podobieństwo (Jaccard)
+    dedup_window_days: int = int(os.getenv("DEDUP_WINDOW_DAYS", 14))
+    dedup_threshold: float = float(os.getenv("DEDUP_THRESHOLD", 0.5))
+    # Automatyczne przypisywanie nowych zgłoszeń do agentów helpdesku (wyłączone: agenci biorą z kolejki /tickets/queue/claim)
+    auto_assign: bool = os.getenv("AUTO_ASSIGN", "false").lower() == "true"
+    routing_resync_seconds: int = int(os.getenv("ROUTING_RESYNC_SECONDS", 300))
+    # Cache: lokalny LRU + opcjonalny wspólny L2 (redis://... lub memory://); puste = tylko L1 (jeden worker)
+    cache_url: str = os.getenv("CACHE_URL", "")
+    cache_size: int = int(os.getenv("CACHE_SIZE", 1024))
+    cache_ttl_seconds: int = int(os.getenv("CACHE_TTL_SECONDS", 300))
+    # Pula połączeń bazy i pula wątków dla synchronicznych endpointów - wątków nie więcej niż połączeń
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", 5))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    db_pool_timeout: int = int(os.getenv("DB_POOL_TIMEOUT", 30))
+    thread_limit: int = int(os.getenv("THREAD_LIMIT", db_pool_size + db_max_overflow))
+    # Admission control: limit współbieżności (0 = THREAD_LIMIT), kolejka, limity per trasa, trasy wyłączone
+    admission_enabled: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    admission_max_concurrency: int = int(os.getenv("ADMISSION_MAX_CONCURRENCY", 0))
+    admission_queue_size: int = int(os.getenv("ADMISSION_QUEUE_SIZE", 100))
+    admission_queue_timeout: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 10))
+    admission_retry_after: int = int(os.getenv("ADMISSION_RETRY_AFTER", 5))
+    admission_route_limits: str = os.getenv(
+        "ADMISSION_ROUTE_LIMITS",
+        "GET /tickets/*/attachments.zip=4, POST /tickets/*/attachments=8"
+    )
+    # Wyłączone z globalnego limitu: uploady (treść płynie przed wywołaniem handlera, multipart ma własny limit trasy)
+    # i POST /batch (każde podżądanie zajmuje własny slot)
+    admission_exempt: str = os.getenv(
+        "ADMISSION_EXEMPT",
+        "PATCH /tickets/uploads/*, POST /tickets/*/attachments, POST /batch"
+    )
+    # Miniatury i podglądy załączników generowane w tle (0 = tylko na żądanie)
+    thumbnail_workers: int = int(os.getenv("THUMBNAIL_WORKERS", 2))
+    # Serwer produkcyjny (python -m app.server): liczba workerów, wymiana workerów, wygaszanie
+    server_bind: str = os.getenv("SERVER_BIND", f"0.0.0.0:{os.getenv('PORT', 8000)}")
+    # Domyślnie jeden worker bez CACHE_URL - cache i kolejka SLA wymagają wtedy wspólnego Redisa
+    server_workers: int = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) if os.getenv("CACHE_URL") else 1))
+    server_max_requests: int = int(os.getenv("SERVER_MAX_REQUESTS", 10000))
+    server_max_requests_jitter: int = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", 1000))
+    server_max_memory_mb: int = int(os.getenv("SERVER_MAX_MEMORY_MB", 0))
+    server_graceful_timeout: int = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", 30))
+    server_timeout: int = int(os.getenv("SERVER_TIMEOUT", 120))
+    server_keepalive: int = int(os.getenv("SERVER_KEEPALIVE", 5))
+    # Migracje schematu (alembic upgrade head) przy starcie aplikacji; python -m app.server robi to raz w masterze
+    db_init_on_startup: bool = os.getenv("DB_INIT_ON_STARTUP", "true").lower() == "true"
+    # Kompresja odpowiedzi (brotli/gzip) od tego rozmiaru w bajtach
+    compression_min_size: int = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+    # SLA: minuty do pierwszej odpowiedzi i do rozwiązania wg Priority.level ("poziom=minuty", * = pozostałe)
+    sla_enabled: bool = os.getenv("SLA_ENABLED", "true").lower() == "true"
+    sla_first_response: str = os.getenv("SLA_FIRST_RESPONSE", "1=60, 2=240, 3=480, *=1440")
+    sla_resolution: str = os.getenv("SLA_RESOLUTION", "1=480, 2=1440, 3=4320, *=10080")
+    # Jeden worker trzyma kolejkę terminów; pozostałe co SLA_ELECTION_SECONDS próbują przejąć tę rolę.
+    # Właściciel co SLA_RESYNC_SECONDS zastępuje kolejkę terminami z bazy (zgubione komunikaty pub/sub; 0 = wyłączone)
+    sla_election_seconds: int = int(os.getenv("SLA_ELECTION_SECONDS", 30))
+    sla_resync_seconds: int = int(os.getenv("SLA_RESYNC_SECONDS", 60))
+    sla_lock_file: str = os.getenv("SLA_LOCK_FILE", "/tmp/helpdesk-sla.lock")
+    # POST /batch: maksymalna liczba podżądań w jednej paczce
+    batch_max_requests: int = int(os.getenv("BATCH_MAX_REQUESTS", 20))
+    # Profiler żądań (admin + nagłówek X-Profile lub próbkowanie ruchu); wyłączony = zero narzutu
+    profiler_enabled: bool = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+    profiler_sample_rate: float = float(os.getenv("PROFILER_SAMPLE_RATE", 0))
+    profiler_interval_ms: float = float(os.getenv("PROFILER_INTERVAL_MS", 5))
+    profiler_dir: str = os.getenv("PROFILER_DIR", "/tmp/profiles")
+    profiler_max_captures: int = int(os.getenv("PROFILER_MAX_CAPTURES", 100))
 
 settings = Settings()
@@ -1,17 +1,60 @@
-from sqlmodel import SQLModel, create_engine, Session
+import logging
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from fastapi import Request
+from sqlalchemy import inspect, make_url
+from sqlmodel import create_engine, Session
 from app.core.config import settings
+from app.core.query_log import install_query_log
+
+logger = logging.getLogger("app.db")
 
 DATABASE_URL = settings.database_url
-print("=== DATABASE_URL ===")
-print(DATABASE_URL)
-print("====================")
 
-engine = create_engine(DATABASE_URL, echo=True, future=True)
+# SQLite ma własną pulę bez tych parametrów
+pool_options = {} if DATABASE_URL.startswith("sqlite") else {
+    "pool_size": settings.db_pool_size,
+    "max_overflow": settings.db_max_overflow,
+    "pool_timeout": settings.db_pool_timeout,
+    "pool_pre_ping": True,
+}
+# Wartości parametrów SQL trafiają do komunikatów wyjątków (logowanych z exc_info) - tylko przy DB_ECHO
+engine = create_engine(
+    DATABASE_URL, echo=settings.db_echo, hide_parameters=not settings.db_echo, future=True, **pool_options
+)
+install_query_log(engine)
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+# Rewizja odpowiadająca schematowi z create_all sprzed migracji
+BASELINE_REVISION = "0001"
 
-def get_session():
+# Klucz scope z sesją współdzieloną przez podżądania POST /batch
+BATCH_SESSION_KEY = "helpdesk.batch_session"
+
+def get_session(request: Request):
+    shared = request.scope.get(BATCH_SESSION_KEY)
+    if shared is not None:
+        yield shared
+        return
     with Session(engine) as session:
         yield session
 
+def migrate(conn):
+    """
+    alembic upgrade head na podanym połączeniu. Baza utworzona wcześniej przez
+    create_all (tabele bez alembic_version) jest najpierw oznaczana rewizją
+    bazową, a migracje dodają tylko brakujące kolumny, indeksy i tabele.
+    """
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["connection"] = conn
+    tables = inspect(conn).get_table_names()
+    if "ticket" in tables and "alembic_version" not in tables:
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+
 def init_db():
+    # Adres bazy bez hasła - logi nie mogą zawierać danych logowania
+    logger.info("Migracja bazy %s", make_url(DATABASE_URL).render_as_string(hide_password=True))
     with engine.begin() as conn:
-        SQLModel.metadata.create_all(conn)
+        migrate(conn)
@@ -0,0 +1,69 @@
+"""
+Operacje migracji Alembic odporne na bazy utworzone wcześniej przez create_all.
+
+Baza bez alembic_version jest oznaczana rewizją bazową, ale create_all nowszych
+wersji modeli utworzył już część późniejszych kolumn, indeksów i tabel - rewizje
+pomijają to, co istnieje. Przy --sql (tryb offline) schemat jest pusty i skrypt
+tworzy wszystko.
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+class Schema:
+    """Schemat bazy z początku rewizji: tabela -> kolumny (nullable), indeksy (kolumny), klucze obce."""
+
+    def __init__(self):
+        self.tables = {} if context.is_offline_mode() else self._reflect()
+
+    @staticmethod
+    def _reflect() -> dict:
+        inspector = sa.inspect(op.get_bind())
+        return {
+            table: {
+                "columns": {c["name"]: c["nullable"] for c in inspector.get_columns(table)},
+                "indexes": {i["name"]: i["column_names"] for i in inspector.get_indexes(table)},
+                "foreign_keys": [fk["constrained_columns"] for fk in inspector.get_foreign_keys(table)],
+            }
+            for table in inspector.get_table_names()
+        }
+
+    def has_table(self, table: str) -> bool:
+        return table in self.tables
+
+    def has_column(self, table: str, column: str) -> bool:
+        return self.has_table(table) and column in self.tables[table]["columns"]
+
+    def is_nullable(self, table: str, column: str) -> bool:
+        # Kolumna dodana w tej rewizji (brak w schemacie) jest jeszcze NULL-owalna
+        return self.tables.get(table, {}).get("columns", {}).get(column, True)
+
+    def has_foreign_key(self, table: str, columns: list) -> bool:
+        return columns in self.tables.get(table, {}).get("foreign_keys", [])
+
+    def add_column(self, table: str, column: sa.Column) -> bool:
+        """Dodaje brakującą kolumnę; True, jeśli została dodana (wymaga uzupełnienia danych)."""
+        if self.has_column(table, column.name):
+            return False
+        op.add_column(table, column)
+        return True
+
+    def create_index(self, name: str, table: str, columns: list, where: str = None, **kw):
+        # Indeks o tej nazwie z innymi kolumnami (np. ix_ticket_queue po priority_id) jest budowany od nowa
+        existing = self.tables.get(table, {}).get("indexes", {}).get(name)
+        if existing is not None and all(isinstance(c, str) for c in columns) and existing != columns:
+            op.drop_index(name, table_name=table)
+        # IF NOT EXISTS zamiast inspektora - SQLite nie zwraca indeksów wyrażeń (lower(email))
+        if where is not None:
+            kw.update(postgresql_where=sa.text(where), sqlite_where=sa.text(where))
+        op.create_index(name, table, columns, if_not_exists=True, **kw)
+
+    def create_table(self, name: str, *columns, indexes=()):
+        if not self.has_table(name):
+            op.create_table(name, *columns)
+            self.tables[name] = {
+                "columns": {c.name: c.nullable for c in columns if isinstance(c, sa.Column)},
+                "indexes": {},
+                "foreign_keys": [],
+            }
+        for index_name, index_columns in indexes:
+            self.create_index(index_name, name, index_columns)
@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import logging
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import event, select as sqlalchemy_select
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.security import decode_access_token
+from app.models.user import User
+
+logger = logging.getLogger("app.error")
+
+PROFILE_HEADER = b"x-profile"
+
+_current_capture: ContextVar[Optional["Capture"]] = ContextVar("profiler_capture", default=None)
+
+def _fold(frame) -> str:
+    # Format "folded stacks" (funkcja;funkcja;...) - wejście dla flamegraph.pl / speedscope
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+def _is_idle(frame) -> bool:
+    # Pętla zdarzeń czekająca w select() albo wątek puli czekający na zadanie -
+    # to nie jest czas obsługi żądania
+    filename = frame.f_code.co_filename
+    return filename.endswith("selectors.py") or (filename.endswith("threading.py") and frame.f_code.co_name == "wait")
+
+class Capture:
+    """
+    Próbkujący profiler jednego żądania. Wątek pętli zdarzeń jest próbkowany
+    tylko wtedy, gdy wykonuje zadanie (task) tego żądania, a wątki puli - tylko
+    w trakcie zapytań SQL żądania (rejestrowane przez hooki silnika). Dzięki temu
+    do profilu nie trafia praca równoległych żądań.
+    """
+
+    def __init__(self, method: str, path: str, user_email: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.user_email = user_email
+        self.started_at = datetime.utcnow()
+        self.duration_ms = 0.0
+        self.status_code = None
+        self.loop_thread = threading.get_ident()
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.threads = set()
+        self.stacks = Counter()
+        self.sql = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id[:8]}", daemon=True)
+
+    def _run(self):
+        interval = settings.profiler_interval_ms / 1000
+        while not self._stop.wait(interval):
+            frames = sys._current_frames()
+            idents = list(self.threads)
+            # Pętla może w tej chwili obsługiwać inne żądanie - liczy się tylko nasz task
+            if asyncio.current_task(self.loop) is self.task:
+                idents.append(self.loop_thread)
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is not None and not _is_idle(frame):
+                    self.stacks[_fold(frame)] += 1
+
+    def start(self):
+        self._t0 = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration_ms = (time.perf_counter() - self._t0) * 1000
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "user": self.user_email,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms, 2),
+            "status_code": self.status_code,
+            "samples": sum(self.stacks.values()),
+            "sql_count": len(self.sql),
+        }
+
+    def to_dict(self) -> dict:
+        data = self.summary()
+        data["stacks"] = dict(self.stacks)
+        data["sql"] = self.sql
+        return data
+
+# === Przechowywanie ===
+
+def _capture_path(capture_id: str) -> str:
+    return os.path.join(settings.profiler_dir, f"{capture_id}.json")
+
+def save_capture(capture: Capture):
+    os.makedirs(settings.profiler_dir, exist_ok=True)
+    with open(_capture_path(capture.id), "w") as f:
+        json.dump(capture.to_dict(), f)
+    # Trzymamy tylko ostatnie N przechwyceń
+    files = sorted(
+        (os.path.join(settings.profiler_dir, name) for name in os.listdir(settings.profiler_dir) if name.endswith(".json")),
+        key=os.path.getmtime
+    )
+    for path in files[:-settings.profiler_max_captures]:
+        os.remove(path)
+
+def list_captures() -> list:
+    if not os.path.isdir(settings.profiler_dir):
+        return []
+    result = []
+    for name in os.listdir(settings.profiler_dir):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(settings.profiler_dir, name)) as f:
+            data = json.load(f)
+        data.pop("stacks", None)
+        data.pop("sql", None)
+        result.append(data)
+    return sorted(result, key=lambda c: c["started_at"], reverse=True)
+
+def load_capture(capture_id: str) -> Optional[dict]:
+    # capture_id to hex z uuid4 - nie dopuszczamy ścieżek
+    if not capture_id.isalnum():
+        return None
+    path = _capture_path(capture_id)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+# === SQL ===
+
+def install_sql_capture(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        capture = _current_capture.get()
+        if capture is not None:
+            # Wątek puli próbkujemy tylko na czas zapytania - potem może obsługiwać inne żądanie
+            ident = threading.get_ident()
+            if ident != capture.loop_thread:
+                capture.threads.add(ident)
+            context._profiler_t0 = time.perf_counter()
+
+    def _finish(context):
+        capture = _current_capture.get()
+        if capture is not None and hasattr(context, "_profiler_t0"):
+            capture.threads.discard(threading.get_ident())
+            return capture
+        return None
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        capture = _finish(context)
+        if capture is not None:
+            capture.sql.append({
+                "statement": statement,
+                "duration_ms": round((time.perf_counter() - context._profiler_t0) * 1000, 3),
+            })
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        if exception_context.execution_context is not None:
+            _finish(exception_context.execution_context)
+
+# === Middleware ===
+
+def _admin_email(token: str) -> Optional[str]:
+    from app.core.db import engine
+    payload = decode_access_token(token)
+    if not payload:
+        return None
+    with Session(engine) as session:
+        user = session.exec(sqlalchemy_select(User).where(User.email == payload["sub"])).scalars().first()
+    if user and user.is_active and user.role == "admin":
+        return user.email
+    return None
+
+class ProfilerMiddleware:
+    """
+    Profiluje żądania admina z nagłówkiem X-Profile: 1 oraz losową część ruchu
+    (PROFILER_SAMPLE_RATE). Dodawany do aplikacji tylko przy PROFILER_ENABLED=true.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        user_email = None
+        if headers.get(PROFILE_HEADER) == b"1":
+            auth = headers.get(b"authorization", b"").decode()
+            if auth.lower().startswith("bearer "):
+                user_email = await run_in_threadpool(_admin_email, auth[7:])
+            if user_email is None:
+                return await self.app(scope, receive, send)
+        elif not (settings.profiler_sample_rate > 0 and random.random() < settings.profiler_sample_rate):
+            return await self.app(scope, receive, send)
+
+        capture = Capture(scope["method"], scope["path"], user_email)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                capture.status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", capture.id.encode())]
+            await send(message)
+
+        token = _current_capture.set(capture)
+        capture.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            capture.stop()
+            _current_capture.reset(token)
+            try:
+                await run_in_threadpool(save_capture, capture)
+            except Exception:
+                logger.error("Błąd zapisu profilu żądania", exc_info=True)
@@ -0,0 +1,146 @@
+import os
+import sys
+import time
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from app.core.config import settings
+
+logger = logging.getLogger("app.query")
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+
+class QueryStats:
+    """Zapytania wykonane w ramach jednego żądania (lub bloku collect_queries)."""
+
+    def __init__(self, route: str = ""):
+        self.route = route
+        self.counts = Counter()
+        self.callers = {}
+        self.total_ms = 0.0
+
+    def record(self, statement: str, duration_ms: float):
+        self.counts[statement] += 1
+        self.total_ms += duration_ms
+        # Ramkę wywołującą ustalamy raz na kształt zapytania, dopiero gdy zaczyna się powtarzać
+        if self.counts[statement] == 2:
+            self.callers[statement] = app_caller()
+
+    def offenders(self, threshold: Optional[int] = None) -> list:
+        threshold = settings.n_plus_one_threshold if threshold is None else threshold
+        return [
+            {"statement": statement, "count": count, "caller": self.callers.get(statement)}
+            for statement, count in self.counts.most_common()
+            if count > threshold
+        ]
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_collectors = []
+
+def app_caller() -> Optional[str]:
+    # Pierwsza ramka z kodu aplikacji (poza tym modułem) - kto faktycznie wysłał zapytanie
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(APP_ROOT) and filename != _THIS_FILE:
+            return f"{os.path.relpath(filename, os.path.dirname(APP_ROOT))}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+def param_types(parameters):
+    """
+    Typy parametrów zapytania zamiast wartości - w logach nie mogą się znaleźć
+    hasła, tokeny resetu ani dane osobowe. executemany: typy pierwszego wiersza.
+    """
+    if isinstance(parameters, list):
+        if not parameters:
+            return []
+        return [param_types(parameters[0]), f"x{len(parameters)}"]
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, tuple):
+        return tuple(type(value).__name__ for value in parameters)
+    return type(parameters).__name__
+
+def install_query_log(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._query_log_t0 = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - context._query_log_t0) * 1000
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.record(statement, duration_ms)
+        for collector in _collectors:
+            collector.record(statement, duration_ms)
+        if duration_ms >= settings.slow_query_ms:
+            logger.warning(
+                "Slow query %.1f ms route=%s caller=%s\n%s\nparam_types=%r",
+                duration_ms,
+                stats.route if stats else "-",
+                app_caller(),
+                statement,
+                param_types(parameters)
+            )
+
+class QueryLogMiddleware:
+    """Zbiera statystyki zapytań żądania i zgłasza wzorzec N+1 po jego zakończeniu."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = QueryStats(f'{scope["method"]} {scope["path"]}')
+        token = _request_stats.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_stats.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                stats.route = f'{scope["method"]} {route.path}'
+            for offender in stats.offenders():
+                logger.warning(
+                    "N+1 suspected route=%s count=%d caller=%s\n%s",
+                    stats.route,
+                    offender["count"],
+                    offender["caller"],
+                    offender["statement"]
+                )
+
+@contextmanager
+def collect_queries():
+    """
+    Zbiera wszystkie zapytania wykonane w bloku (z dowolnego wątku).
+
+        with collect_queries() as stats:
+            client.get("/tickets/", headers=auth)
+        assert stats.count <= 5
+    """
+    stats = QueryStats("collect_queries")
+    _collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        _collectors.remove(stats)
+
+@contextmanager
+def assert_no_n_plus_one(threshold: Optional[int] = None):
+    with collect_queries() as stats:
+        yield stats
+    offenders = stats.offenders(threshold)
+    if offenders:
+        details = "\n".join(f"{o['count']}x {o['caller']}: {o['statement']}" for o in offenders)
+        raise AssertionError(f"N+1 query pattern detected:\n{details}")
@@ -0,0 +1,84 @@
+import sys
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlmodel import SQLModel
+from app.models.ticket import Comment
+from app.models.attachment import Attachment
+from app.models.category import Category  # rejestracja tabel docelowych kluczy obcych
+from app.models.priority import Priority
+from app.api.tickets import ticket_list_query, comment_batch_query, queue_candidate_query
+from app.api.attachments import attachments_query
+from app.api.users import directory_query, open_ticket_counts_query
+from app.api.auth import user_by_email_query, reset_token_query
+
+# Gorące zapytania ścieżki żądania - budowane tymi samymi funkcjami, których używają endpointy.
+# Każde musi korzystać z indeksu - dodając nowe zapytanie na ścieżce żądania, dopisz je tutaj.
+HOT_QUERIES = {
+    "tickets.list_tickets (client)": lambda: ticket_list_query(1, None),
+    "tickets.list_tickets (client, last_activity)": lambda: ticket_list_query(1, "last_activity"),
+    "tickets.list_tickets (created)": lambda: ticket_list_query(None, "created"),
+    "tickets.list_tickets (last_activity)": lambda: ticket_list_query(None, "last_activity"),
+    "tickets.list_tickets (comment_count)": lambda: ticket_list_query(None, "comment_count"),
+    "tickets.list_tickets (attachment_count)": lambda: ticket_list_query(None, "attachment_count"),
+    "tickets.list_tickets (comments)": lambda: comment_batch_query(Comment, [1, 2, 3]),
+    "tickets.claim_next_ticket": queue_candidate_query,
+    "attachments.list_attachments": lambda: attachments_query(Attachment, 1),
+    "users.directory (role)": lambda: directory_query(None, "helpdesk", True, None, 51),
+    "users.directory (open tickets)": lambda: open_ticket_counts_query([1, 2]),
+    "auth.login": lambda: user_by_email_query("user@example.com"),
+    "auth.reset_password": lambda: reset_token_query("user@example.com", "ABC123", datetime.utcnow()),
+}
+
+def explain(conn, stmt) -> str:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).fetchall()
+        return "\n".join(str(row[-1]) for row in rows)
+    rows = conn.exec_driver_sql("EXPLAIN " + str(compiled), params).fetchall()
+    return "\n".join(str(row[0]) for row in rows)
+
+def is_sequential_scan(plan: str) -> bool:
+    for line in plan.splitlines():
+        line = line.strip()
+        # PostgreSQL: "Seq Scan on ticket"; SQLite: "SCAN ticket" (bez "USING ... INDEX")
+        if "Seq Scan" in line:
+            return True
+        if line.startswith("SCAN ") and "USING" not in line:
+            return True
+    return False
+
+def check_query_plans(conn, disable_seqscan: bool = True) -> dict:
+    """
+    Uruchamia EXPLAIN dla wszystkich HOT_QUERIES i zwraca {nazwa: plan}
+    dla zapytań, które kończą się pełnym skanem tabeli. Na bazie z danymi
+    (testy, kopia produkcji po ANALYZE) disable_seqscan=False sprawdza plan,
+    który planner faktycznie wybierze.
+    """
+    if conn.dialect.name == "postgresql" and disable_seqscan:
+        # Na małej/pustej bazie planner i tak wybrałby Seq Scan - wyłączamy go,
+        # żeby pełny skan pojawił się tylko tam, gdzie nie ma użytecznego indeksu
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    offenders = {}
+    for name, build in HOT_QUERIES.items():
+        plan = explain(conn, build())
+        if is_sequential_scan(plan):
+            offenders[name] = plan
+    return offenders
+
+if __name__ == "__main__":
+    # python -m app.core.query_plans [DATABASE_URL]
+    # Bez argumentu sprawdza schemat modeli na świeżej bazie SQLite w pamięci.
+    url = sys.argv[1] if len(sys.argv) > 1 else "sqlite://"
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        if url == "sqlite://":
+            SQLModel.metadata.create_all(conn)
+        offenders = check_query_plans(conn)
+    for name, plan in offenders.items():
+        print(f"SEQUENTIAL SCAN: {name}\n{plan}\n")
+    if offenders:
+        sys.exit(1)
+    print(f"OK: {len(HOT_QUERIES)} zapytań korzysta z indeksów")
@@ -9,6 +9,9 @@ def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
+    # Konta bez hasła (np. z importu) mają znacznik zamiast hasha - passlib rzuciłby ValueError
+    if not hashed_password or pwd_context.identify(hashed_password) is None:
+        return False
     return pwd_context.verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: int = None):
@@ -0,0 +1,148 @@
+"""
+Negocjacja formatu odpowiedzi (nagłówek Accept) dla endpointów list.
+
+    application/json                           - domyślnie, bez zmian
+    application/msgpack                        - te same dane w MessagePack
+    application/vnd.helpdesk.columnar+json     - kolumnowo: nazwy pól raz, wiersze jako listy,
+                                                 autorzy komentarzy raz w słowniku "authors"
+    application/vnd.helpdesk.columnar+msgpack  - jw. w MessagePack
+
+Dla rzadko zmieniających się danych (słowniki) precompressed_response trzyma
+gotowe, maksymalnie skompresowane warianty w pamięci, kluczowane hashem treści.
+"""
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from app.core.compression import choose_encoding, compress
+from app.core.config import settings
+
+try:
+    import msgpack
+except ImportError:  # bez msgpack klient dostaje JSON
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+COLUMNAR_JSON = "application/vnd.helpdesk.columnar+json"
+COLUMNAR_MSGPACK = "application/vnd.helpdesk.columnar+msgpack"
+MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack")
+
+# Precompressed: dane generowane raz, więc najwyższa jakość kompresji się opłaca
+PRECOMPRESSED_QUALITY = {"br": 11, "gzip": 9}
+PRECOMPRESSED_MAX_ENTRIES = 64
+
+def negotiate(request: Request) -> str:
+    """Pierwszy obsługiwany typ z Accept (kolejność klienta, bez wag q); domyślnie JSON."""
+    for item in request.headers.get("accept", "").split(","):
+        media_type = item.split(";", 1)[0].strip().lower()
+        if media_type in (COLUMNAR_JSON, JSON):
+            return media_type
+        if msgpack is not None and media_type in MSGPACK_ALIASES:
+            return MSGPACK
+        if msgpack is not None and media_type == COLUMNAR_MSGPACK:
+            return COLUMNAR_MSGPACK
+    return JSON
+
+def is_columnar(media_type: str) -> bool:
+    return media_type in (COLUMNAR_JSON, COLUMNAR_MSGPACK)
+
+def columnar(rows: list) -> dict:
+    """[{a: 1, b: 2}, ...] -> {"columns": ["a", "b"], "rows": [[1, 2], ...]}"""
+    columns = list(rows[0].keys()) if rows else []
+    return {"columns": columns, "rows": [[row.get(c) for c in columns] for row in rows]}
+
+def columnar_tickets(tickets: list) -> dict:
+    """Lista TicketRead kolumnowo; komentarze osobną tabelą, autorzy zdeduplikowani po id."""
+    ticket_rows, comment_rows, authors = [], [], {}
+    # model_dump zachowuje datetime - MessagePack zapisze je jako Timestamp
+    for ticket in (t.model_dump() for t in tickets):
+        for comment in ticket.pop("comments", []):
+            author = comment.pop("author", None)
+            comment["author_id"] = author["id"] if author else None
+            if author:
+                authors[str(author["id"])] = {"email": author["email"], "full_name": author["full_name"]}
+            comment_rows.append(comment)
+        ticket_rows.append(ticket)
+    return {
+        "tickets": columnar(ticket_rows),
+        "comments": columnar(comment_rows),
+        "authors": authors,
+    }
+
+def _msgpack_default(value):
+    if isinstance(value, datetime):
+        # Naiwne daty w bazie są w UTC; rozszerzenie Timestamp jest krótsze niż tekst ISO
+        return msgpack.Timestamp.from_datetime(value if value.tzinfo else value.replace(tzinfo=timezone.utc))
+    if isinstance(value, BaseModel):
+        # model_dump zachowuje datetime (jsonable_encoder zamieniłby je na tekst) - trafią tu ponownie
+        return value.model_dump()
+    return jsonable_encoder(value)
+
+def encode(payload, media_type: str) -> bytes:
+    if media_type in (MSGPACK, COLUMNAR_MSGPACK):
+        return msgpack.packb(payload, default=_msgpack_default, datetime=False)
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode()
+
+def negotiated_response(request: Request, payload, to_columnar: Callable = columnar):
+    """
+    Odpowiedź w formacie z Accept. Dla zwykłego JSON zwraca payload bez zmian,
+    żeby FastAPI zachowało response_model i dotychczasową postać odpowiedzi.
+    """
+    media_type = negotiate(request)
+    if media_type == JSON:
+        return payload
+    if is_columnar(media_type):
+        payload = to_columnar(payload)
+    return Response(encode(payload, media_type), media_type=media_type, headers={"Vary": "Accept"})
+
+class _PrecompressedCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build: Callable[[], bytes]) -> bytes:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+        value = build()
+        with self._lock:
+            self._data[key] = value
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return value
+
+_precompressed = _PrecompressedCache(PRECOMPRESSED_MAX_ENTRIES)
+
+def precompressed_response(request: Request, payload, to_columnar: Callable = columnar) -> Response:
+    """
+    Odpowiedź dla danych zmieniających się rzadko (słowniki): serializacja jest
+    tania, a skompresowany wariant (najwyższa jakość) liczony raz na treść.
+    Hash treści służy też jako ETag - silny dla wariantu bez kompresji, słaby
+    dla skompresowanych (jak w CompressionMiddleware).
+    """
+    media_type = negotiate(request)
+    body = encode(to_columnar(payload) if is_columnar(media_type) else payload, media_type)
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if len(body) < settings.compression_min_size:
+        encoding = None
+    etag = f'"{digest}"' if encoding is None else f'W/"{digest}"'
+    headers = {"ETag": etag, "Vary": "Accept, Accept-Encoding", "Cache-Control": "no-cache"}
+    # If-None-Match porównuje się słabo - wariant z innym kodowaniem też jest aktualny
+    if request.headers.get("if-none-match", "").replace("W/", "") == f'"{digest}"':
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        body = _precompressed.get(
+            (digest, media_type, encoding),
+            lambda: compress(body, encoding, PRECOMPRESSED_QUALITY[encoding])
+        )
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=media_type, headers=headers)
@@ -3,10 +3,27 @@ import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.db import init_db
+from app.core.db import init_db, engine
+from app.core.config import settings
+from app.core.profiler import ProfilerMiddleware, install_sql_capture
+from app.core.query_log import QueryLogMiddleware
+from app.core.cache import cache
+from app.core.admission import AdmissionMiddleware, configure_thread_limiter
+from app.core.compression import CompressionMiddleware
 from app.api import auth, users, tickets, categories, priorities
 from app.api import mail  # DODAJ TEN IMPORT
 from app.api import attachments  # DODAJ TEN IMPORT (nowy router załączników)
+from app.api import notifications
+from app.api import profiles
+from app.api import uploads
+from app.api import routing
+from app.api import sla
+from app.api import batch
+from app.services.notifications import start_digest_worker, stop_digest_worker
+from app.services.routing import start_routing, stop_routing
+from app.services.thumbnails import stop_thumbnail_worker
+from app.services.sla import start_sla, stop_sla
+from app.api.uploads import start_upload_sweeper, stop_upload_sweeper
 
 # KONFIGURACJA LOGOWANIA
 logging.basicConfig(
@@ -29,6 +46,10 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Admission control przed CORS w kodzie = wewnątrz CORS, więc odpowiedzi 503 też mają nagłówki CORS
+if settings.admission_enabled:
+    app.add_middleware(AdmissionMiddleware)
+
 # DODAJ MIDDLEWARE CORS
 app.add_middleware(
     CORSMiddleware,
@@ -38,14 +59,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(QueryLogMiddleware)
+app.add_middleware(CompressionMiddleware)
+
+# Profiler żądań - bez PROFILER_ENABLED middleware i hooki SQL w ogóle nie są rejestrowane
+if settings.profiler_enabled:
+    app.add_middleware(ProfilerMiddleware)
+    install_sql_capture(engine)
+
 @app.on_event("startup")
 def on_startup():
     logging.info("Starting up and initializing the database.")
-    try:
-        init_db()
-    except Exception as e:
-        error_logger.error("Błąd podczas inicjalizacji bazy danych", exc_info=True)
-        raise
+    if settings.db_init_on_startup:
+        try:
+            init_db()
+        except Exception as e:
+            error_logger.error("Błąd podczas inicjalizacji bazy danych", exc_info=True)
+            raise
+    cache.start()
+    start_digest_worker()
+    start_routing()
+    start_sla()
+    start_upload_sweeper()
+
+# Pula wątków AnyIO musi być ustawiona w pętli zdarzeń - osobny, asynchroniczny handler
+@app.on_event("startup")
+async def on_startup_threads():
+    await configure_thread_limiter()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    stop_digest_worker()
+    stop_routing()
+    stop_sla()
+    stop_upload_sweeper()
+    stop_thumbnail_worker()
+    cache.stop()
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -64,6 +113,12 @@ app.include_router(categories.router)
 app.include_router(priorities.router)
 app.include_router(mail.router)  # DODAJ TĘ LINIĘ
 app.include_router(attachments.router)  # DODAJ TĘ LINIĘ (nowy router załączników)
+app.include_router(notifications.router)
+app.include_router(profiles.router)
+app.include_router(uploads.router)
+app.include_router(routing.router)
+app.include_router(sla.router)
+app.include_router(batch.router)
 
 if __name__ == "__main__":
     logging.info("Running in __main__ mode, starting Uvicorn server.")
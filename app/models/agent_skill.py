@@ -0,0 +1,11 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+
+class AgentSkill(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    # None = dowolna kategoria / priorytet
+    category_id: Optional[int] = Field(default=None, foreign_key="category.id")
+    priority_id: Optional[int] = Field(default=None, foreign_key="priority.id")
+    # Agent z umiejętnością weight=2 dostaje zgłoszenie, dopóki ma mniej niż 2x obciążenie innych
+    weight: float = 2.0
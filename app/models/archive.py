@@ -0,0 +1,49 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+# Zamknięte zgłoszenia przeniesione z gorących tabel ticket/comment/attachment
+# (app.services.archive). Identyfikatory są zachowane, więc stare linki dalej działają.
+
+class ArchivedTicket(SQLModel, table=True):
+    __tablename__ = "ticket_archive"
+
+    id: int = Field(primary_key=True)
+    title: str
+    description: str
+    category_id: Optional[int] = None
+    priority_id: Optional[int] = None
+    created_by: int = Field(index=True)
+    assigned_to: Optional[int] = None
+    status: str
+    created_at: datetime
+    updated_at: datetime
+    version: int = 1
+    comment_count: int = 0
+    attachment_count: int = 0
+    last_comment_at: Optional[datetime] = None
+    last_activity_at: Optional[datetime] = None
+    first_response_due: Optional[datetime] = None
+    first_response_at: Optional[datetime] = None
+    resolution_due: Optional[datetime] = None
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ArchivedComment(SQLModel, table=True):
+    __tablename__ = "comment_archive"
+
+    id: int = Field(primary_key=True)
+    ticket_id: int = Field(foreign_key="ticket_archive.id", index=True)
+    author_id: int
+    content: str
+    created_at: datetime
+
+class ArchivedAttachment(SQLModel, table=True):
+    __tablename__ = "attachment_archive"
+
+    id: int = Field(primary_key=True)
+    ticket_id: int = Field(foreign_key="ticket_archive.id", index=True)
+    filename: str
+    content_type: str
+    path: str
+    uploaded_at: datetime
+    content_hash: Optional[str] = None
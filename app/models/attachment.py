@@ -4,8 +4,10 @@ from datetime import datetime
 
 class Attachment(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    ticket_id: int = Field(foreign_key="ticket.id")
+    ticket_id: int = Field(foreign_key="ticket.id", index=True)
     filename: str
     content_type: str
     path: str
     uploaded_at: datetime = Field(default_factory=datetime.utcnow)
+    # SHA-256 treści - klucz miniatur na dysku (app.services.thumbnails)
+    content_hash: Optional[str] = None
@@ -0,0 +1,36 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index, text
+from typing import Optional
+from datetime import datetime
+
+class Notification(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    ticket_id: int = Field(foreign_key="ticket.id")
+    event: str  # "status", "assigned", "comment"
+    message: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # NULL = czeka na wysłanie w najbliższym digeście
+    sent_at: Optional[datetime] = None
+    # Wysyłka poza transakcją: wiersz jest najpierw rezerwowany (claimed_at), a po
+    # nieudanej próbie wraca do kolejki po NOTIFICATION_RETRY_SECONDS
+    claimed_at: Optional[datetime] = None
+    attempts: int = 0
+    # Porzucone po NOTIFICATION_MAX_ATTEMPTS nieudanych próbach (sent_at też jest ustawione)
+    failed_at: Optional[datetime] = None
+
+    __table_args__ = (
+        Index(
+            "ix_notification_pending",
+            "user_id",
+            "created_at",
+            postgresql_where=text("sent_at IS NULL"),
+            sqlite_where=text("sent_at IS NULL"),
+        ),
+    )
+
+class NotificationPreference(SQLModel, table=True):
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    email_enabled: bool = True
+    # Okno zbierania zdarzeń w minutach; None = wartość domyślna z konfiguracji
+    digest_minutes: Optional[int] = None
@@ -0,0 +1,21 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import UniqueConstraint
+from typing import Optional
+from datetime import datetime
+
+class SlaBreach(SQLModel, table=True):
+    __tablename__ = "sla_breach"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Bez klucza obcego - archiwizacja usuwa zgłoszenia, a historia naruszeń ma zostać do statystyk
+    ticket_id: int = Field(index=True)
+    kind: str  # "first_response" | "resolution"
+    due_at: datetime
+    breached_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    priority_id: Optional[int] = None
+    assigned_to: Optional[int] = None
+
+    # Jedno naruszenie na termin - chroni przed podwójnym zdarzeniem przy zmianie właściciela kolejki
+    __table_args__ = (
+        UniqueConstraint("ticket_id", "kind", "due_at", name="uq_sla_breach"),
+    )
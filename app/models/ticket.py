@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index, text
 from typing import Optional, List
 from datetime import datetime
 from pydantic import BaseModel
@@ -9,18 +10,66 @@ class Ticket(SQLModel, table=True):
     description: str
     category_id: Optional[int] = Field(default=None, foreign_key="category.id")
     priority_id: Optional[int] = Field(default=None, foreign_key="priority.id")
-    created_by: int
-    assigned_to: Optional[int] = Field(default=None, foreign_key="user.id")
-    status: str = "open"
+    # Kopia Priority.level z chwili utworzenia - kolejność kolejki bez złączenia z priority
+    priority_level: Optional[int] = None
+    created_by: int = Field(foreign_key="user.id", index=True)
+    assigned_to: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
+    status: str = Field(default="open", index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Wersja wiersza - podbijana przy każdej zmianie, źródło ETag i kontroli If-Match
+    version: int = 1
+    # Liczniki aktywności utrzymywane przez endpointy komentarzy i załączników
+    # (przebudowa: python -m app.services.ticket_counters)
+    comment_count: int = 0
+    attachment_count: int = 0
+    last_comment_at: Optional[datetime] = None
+    last_activity_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    # Terminy SLA wyliczane z Priority.level (app.services.sla); first_response_at - pierwsza
+    # odpowiedź agenta (komentarz albo zamknięcie zgłoszenia)
+    first_response_due: Optional[datetime] = None
+    first_response_at: Optional[datetime] = None
+    resolution_due: Optional[datetime] = None
+
+    # Indeks częściowy pod kolejkę /tickets/queue/claim - obejmuje tylko
+    # nieprzypisane otwarte zgłoszenia, więc pozostaje mały niezależnie od historii.
+    # Kolumny w kolejności ORDER BY (ASC na PostgreSQL domyślnie NULLS LAST), więc bez sortowania
+    __table_args__ = (
+        Index(
+            "ix_ticket_queue",
+            "priority_level",
+            "created_at",
+            "id",
+            postgresql_where=text("assigned_to IS NULL AND status = 'open'"),
+            sqlite_where=text("assigned_to IS NULL AND status = 'open'"),
+        ),
+        # Sortowania listy zgłoszeń (TICKET_SORTS) - (kolumna, id) odczytywane wstecz dla DESC
+        Index("ix_ticket_created_at_id", "created_at", "id"),
+        Index("ix_ticket_comment_count_id", "comment_count", "id"),
+        Index("ix_ticket_attachment_count_id", "attachment_count", "id"),
+        # Lista klienta: WHERE created_by = ? ORDER BY last_activity_at DESC
+        Index("ix_ticket_created_by_activity", "created_by", "last_activity_at", "id"),
+        # Oczekujące terminy SLA - wczytywane przy starcie do kolejki terminów
+        Index(
+            "ix_ticket_sla_first_response",
+            "first_response_due",
+            postgresql_where=text("first_response_at IS NULL AND first_response_due IS NOT NULL"),
+            sqlite_where=text("first_response_at IS NULL AND first_response_due IS NOT NULL"),
+        ),
+        Index(
+            "ix_ticket_sla_resolution",
+            "resolution_due",
+            postgresql_where=text("status NOT IN ('closed', 'resolved') AND resolution_due IS NOT NULL"),
+            sqlite_where=text("status NOT IN ('closed', 'resolved') AND resolution_due IS NOT NULL"),
+        ),
+    )
 
     class Config:
         orm_mode = True
 
 class Comment(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    ticket_id: int = Field(foreign_key="ticket.id")
+    ticket_id: int = Field(foreign_key="ticket.id", index=True)
     author_id: int = Field(foreign_key="user.id")
     content: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -45,6 +94,11 @@ class CommentOut(BaseModel):
     class Config:
         orm_mode = True
 
+# Prawdopodobny duplikat zwracany przy tworzeniu zgłoszenia
+class DuplicateOut(BaseModel):
+    ticket_id: int
+    similarity: float
+
 # TicketRead z listą komentarzy z autorami
 class TicketRead(BaseModel):
     id: int
@@ -57,7 +111,17 @@ class TicketRead(BaseModel):
     status: str
     created_at: datetime
     updated_at: datetime
+    version: int = 1
+    comment_count: int = 0
+    attachment_count: int = 0
+    last_comment_at: Optional[datetime] = None
+    last_activity_at: Optional[datetime] = None
+    first_response_due: Optional[datetime] = None
+    first_response_at: Optional[datetime] = None
+    resolution_due: Optional[datetime] = None
+    archived: bool = False
     comments: List[CommentOut] = []
+    possible_duplicates: List[DuplicateOut] = []
 
     class Config:
         orm_mode = True
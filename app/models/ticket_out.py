@@ -13,6 +13,11 @@ class TicketOut(BaseModel):
     status: str
     created_at: datetime
     updated_at: datetime
+    version: int = 1
+    comment_count: int = 0
+    attachment_count: int = 0
+    last_comment_at: Optional[datetime] = None
+    last_activity_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
@@ -0,0 +1,12 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, BigInteger
+
+# Sygnatury MinHash zgłoszeń i kubełki LSH (app.services.dedup)
+
+class TicketSignature(SQLModel, table=True):
+    ticket_id: int = Field(foreign_key="ticket.id", primary_key=True)
+    minhash: str  # wartości MinHash rozdzielone przecinkami
+
+class TicketLshBucket(SQLModel, table=True):
+    band_key: int = Field(sa_column=Column(BigInteger, primary_key=True))
+    ticket_id: int = Field(foreign_key="ticket.id", primary_key=True, index=True)
@@ -0,0 +1,15 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+class UploadSession(SQLModel, table=True):
+    id: str = Field(primary_key=True)  # uuid4 hex
+    ticket_id: int = Field(foreign_key="ticket.id")
+    user_id: int = Field(foreign_key="user.id")
+    filename: str
+    content_type: str
+    size: int
+    offset: int = 0
+    path: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(index=True)
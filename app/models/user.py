@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index, column, func
 from typing import Optional
 
 class User(SQLModel, table=True):
@@ -8,3 +9,19 @@ class User(SQLModel, table=True):
     full_name: str = ""
     role: str = "client"
     is_active: bool = True
+
+    # Wyszukiwanie po prefiksie w katalogu użytkowników (lower(x) LIKE 'abc%');
+    # text_pattern_ops pozwala PostgreSQL użyć indeksu niezależnie od collation bazy
+    __table_args__ = (
+        Index(
+            "ix_user_email_prefix",
+            func.lower(column("email")).label("email_lower"),
+            postgresql_ops={"email_lower": "text_pattern_ops"},
+        ),
+        Index(
+            "ix_user_full_name_prefix",
+            func.lower(column("full_name")).label("full_name_lower"),
+            postgresql_ops={"full_name_lower": "text_pattern_ops"},
+        ),
+        Index("ix_user_role_active", "role", "is_active"),
+    )
@@ -0,0 +1,112 @@
+"""
+Produkcyjny serwer: gunicorn jako master + workery uvicorn.
+
+    python -m app.server
+
+Aplikacja jest ładowana w masterze przed fork (preload), więc zaimportowane
+moduły są współdzielone przez workery (copy-on-write), a błąd importu
+zatrzymuje start zamiast zapętlać restart workerów. Worker jest wymieniany
+po SERVER_MAX_REQUESTS żądaniach (z rozrzutem, żeby nie wszystkie naraz)
+albo gdy jego pamięć przekroczy SERVER_MAX_MEMORY_MB. Przy zatrzymaniu
+workery przestają przyjmować połączenia i kończą trwające żądania, także
+strumieniowe, w ciągu SERVER_GRACEFUL_TIMEOUT sekund.
+
+Każdy worker ma własną pulę połączeń z bazą: łącznie to do
+WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW) połączeń.
+
+Migracje schematu (alembic upgrade head) wykonuje master raz, przed
+uruchomieniem workerów - równoległe ALTER/CREATE z kilku workerów kończą się
+na PostgreSQL błędem. Kilka workerów wymaga wspólnego cache
+(CACHE_URL=redis://...), bez niego serwer nie wystartuje.
+"""
+import os
+import signal
+import logging
+from gunicorn.app.base import BaseApplication
+from app.core.config import settings
+
+try:
+    from uvicorn_worker import UvicornWorker
+except ImportError:  # starsze uvicorn mają workera w pakiecie
+    from uvicorn.workers import UvicornWorker
+
+logger = logging.getLogger("app.error")
+
+# Zapas na zamknięcie workera po przerwaniu strumieni, zanim master wyśle SIGKILL
+SHUTDOWN_MARGIN_SECONDS = 5
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        import resource
+        # Poza Linuksem tylko szczytowe RSS (w KB) - wystarcza do wykrycia rozrostu
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class HelpdeskWorker(UvicornWorker):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Bez limitu uvicorn czekałby na strumienie (ZIP, upload) do SIGKILL od mastera
+        self.config.timeout_graceful_shutdown = max(1, self.cfg.graceful_timeout - SHUTDOWN_MARGIN_SECONDS)
+
+    async def callback_notify(self):
+        await super().callback_notify()
+        # Wywoływane cyklicznie przez pętlę uvicorn - okazja do kontroli pamięci
+        if settings.server_max_memory_mb and self.alive and current_rss_mb() > settings.server_max_memory_mb:
+            logger.warning(f"Worker {os.getpid()} przekroczył {settings.server_max_memory_mb} MB - wymiana")
+            self.alive = False
+            os.kill(os.getpid(), signal.SIGTERM)
+
+def check_workers():
+    # Cache L1 i kolejka SLA synchronizują workery wyłącznie przez pub/sub Redisa
+    if settings.server_workers > 1 and not settings.cache_url.startswith(("redis://", "rediss://", "unix://")):
+        raise SystemExit(
+            f"WEB_CONCURRENCY={settings.server_workers} wymaga CACHE_URL=redis://... "
+            "(bez wspólnego cache uruchom jeden worker)"
+        )
+
+def on_starting(server):
+    # Master, przed fork: migracje raz, a workery pomijają init_db przy starcie
+    from app.core.db import init_db
+    init_db()
+    settings.db_init_on_startup = False
+
+def post_fork(server, worker):
+    # Pula połączeń utworzona w masterze nie może trafić do workerów - każdy buduje własną.
+    # close=False: nie zamykamy gniazd, które mogą nadal należeć do innego procesu.
+    from app.core.db import engine
+    engine.dispose(close=False)
+
+class HelpdeskServer(BaseApplication):
+    def __init__(self, options: dict = None):
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+        return app
+
+def server_options() -> dict:
+    return {
+        "bind": settings.server_bind,
+        "workers": settings.server_workers,
+        "worker_class": HelpdeskWorker,
+        "preload_app": True,
+        "max_requests": settings.server_max_requests,
+        "max_requests_jitter": settings.server_max_requests_jitter,
+        "graceful_timeout": settings.server_graceful_timeout,
+        "timeout": settings.server_timeout,
+        "keepalive": settings.server_keepalive,
+        "on_starting": on_starting,
+        "post_fork": post_fork,
+        "accesslog": "-",
+    }
+
+if __name__ == "__main__":
+    check_workers()
+    HelpdeskServer(server_options()).run()
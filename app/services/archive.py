@@ -0,0 +1,88 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select as sqlalchemy_select, insert, delete, literal, DateTime
+from sqlmodel import Session
+from app.models.ticket import Ticket, Comment
+from app.models.attachment import Attachment
+from app.models.notification import Notification
+from app.models.archive import ArchivedTicket, ArchivedComment, ArchivedAttachment
+from app.models.ticket_signature import TicketSignature, TicketLshBucket
+from app.models.upload import UploadSession
+from app.api.uploads import remove_upload_files
+from app.services.dedup import prune_signatures
+from app.core.config import settings
+from app.core.db import engine
+from app.core.cache import cache, ticket_key
+
+logger = logging.getLogger("app.error")
+
+ARCHIVE_STATUSES = ["closed"]
+
+def _copy_rows(session: Session, source, target, where, archived_at: Optional[datetime] = None):
+    # INSERT ... SELECT po wspólnych kolumnach - wiersze nie przechodzą przez Pythona
+    source_table, target_table = source.__table__, target.__table__
+    names = [c.name for c in source_table.columns if c.name in target_table.columns]
+    columns = [source_table.c[name] for name in names]
+    if archived_at is not None:
+        names.append("archived_at")
+        columns.append(literal(archived_at, DateTime))
+    session.exec(insert(target_table).from_select(names, sqlalchemy_select(*columns).where(where)))
+
+def archive_batch(session: Session, cutoff: datetime, batch_size: int) -> int:
+    """Przenosi jedną paczkę zamkniętych zgłoszeń do tabel archiwum. Zwraca liczbę zgłoszeń."""
+    ids = session.exec(
+        sqlalchemy_select(Ticket.id)
+        .where(Ticket.status.in_(ARCHIVE_STATUSES), Ticket.last_activity_at < cutoff)
+        .order_by(Ticket.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not ids:
+        session.rollback()
+        return 0
+    now = datetime.utcnow()
+    _copy_rows(session, Ticket, ArchivedTicket, Ticket.id.in_(ids), archived_at=now)
+    _copy_rows(session, Comment, ArchivedComment, Comment.ticket_id.in_(ids))
+    _copy_rows(session, Attachment, ArchivedAttachment, Attachment.ticket_id.in_(ids))
+    # Powiadomienia dawno zamkniętych zgłoszeń nie mają już wartości
+    session.exec(delete(Notification).where(Notification.ticket_id.in_(ids)))
+    session.exec(delete(TicketLshBucket).where(TicketLshBucket.ticket_id.in_(ids)))
+    session.exec(delete(TicketSignature).where(TicketSignature.ticket_id.in_(ids)))
+    # Nieukończone uploady zamkniętego zgłoszenia nie zostaną już dokończone
+    upload_paths = session.exec(
+        sqlalchemy_select(UploadSession.path).where(UploadSession.ticket_id.in_(ids))
+    ).scalars().all()
+    session.exec(delete(UploadSession).where(UploadSession.ticket_id.in_(ids)))
+    session.exec(delete(Attachment).where(Attachment.ticket_id.in_(ids)))
+    session.exec(delete(Comment).where(Comment.ticket_id.in_(ids)))
+    session.exec(delete(Ticket).where(Ticket.id.in_(ids)))
+    session.commit()
+    remove_upload_files(upload_paths)
+    # Zgłoszenie jest teraz w archiwum - widok w cache ma nieaktualne archived=False
+    cache.invalidate(*[ticket_key(ticket_id) for ticket_id in ids])
+    return len(ids)
+
+def archive_closed_tickets(session: Session, older_than_days: Optional[int] = None, batch_size: Optional[int] = None) -> int:
+    """
+    Archiwizuje zamknięte zgłoszenia bez aktywności (zmiany, komentarza,
+    załącznika) od older_than_days (domyślnie ARCHIVE_AFTER_DAYS) paczkami po
+    batch_size, każda we własnej transakcji.
+    """
+    days = settings.archive_after_days if older_than_days is None else older_than_days
+    batch_size = batch_size or settings.archive_batch_size
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    total = 0
+    while True:
+        moved = archive_batch(session, cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    with Session(engine) as session:
+        moved = archive_closed_tickets(session)
+        # Zamknięte zgłoszenia czekające na archiwizację nie potrzebują już sygnatur duplikatów
+        pruned = prune_signatures(session, settings.archive_batch_size)
+    logging.info(f"Zarchiwizowano zgłoszeń: {moved}, usunięto sygnatur: {pruned}")
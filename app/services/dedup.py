@@ -0,0 +1,172 @@
+import re
+import zlib
+import random
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import select as sqlalchemy_select, delete as sqlalchemy_delete, or_
+from sqlmodel import Session
+from app.models.ticket import Ticket
+from app.models.ticket_signature import TicketSignature, TicketLshBucket
+from app.core.config import settings
+from app.core.db import engine
+
+logger = logging.getLogger("app.error")
+
+# MinHash na trigramach znakowych + LSH: 20 pasm po 3 wartości. Para o podobieństwie
+# Jaccarda 0.5 trafia do wspólnego kubełka z p≈0.93, para 0.1 - z p≈0.02.
+BANDS = 20
+ROWS = 3
+NUM_PERM = BANDS * ROWS
+MAX_TEXT = 500  # tytuł + początek opisu wystarczają, a koszt MinHash rośnie liniowo
+MAX_DUPLICATES = 5
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)  # stałe ziarno - sygnatury muszą być porównywalne między procesami
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+def shingles(text: str) -> set:
+    normalized = " ".join(re.findall(r"\w+", text.lower()))[:MAX_TEXT]
+    if len(normalized) < 3:
+        return {normalized}
+    return {normalized[i:i + 3] for i in range(len(normalized) - 2)}
+
+def minhash(text: str) -> List[int]:
+    hashes = [zlib.crc32(s.encode()) for s in shingles(text)]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+def band_keys(signature: List[int]) -> List[int]:
+    keys = []
+    for band in range(BANDS):
+        values = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(f"{band}:{values}".encode(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+def similarity(a: List[int], b: List[int]) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+def _decode(value: str) -> List[int]:
+    return [int(v) for v in value.split(",")]
+
+def _ticket_text(ticket: Ticket) -> str:
+    return f"{ticket.title} {ticket.description}"
+
+def _candidates(session: Session, keys: List[int], exclude_id: Optional[int] = None):
+    cutoff = datetime.utcnow() - timedelta(days=settings.dedup_window_days)
+    stmt = (
+        sqlalchemy_select(TicketSignature.ticket_id, TicketSignature.minhash)
+        .where(TicketSignature.ticket_id.in_(
+            sqlalchemy_select(TicketLshBucket.ticket_id).where(TicketLshBucket.band_key.in_(keys))
+        ))
+        .join(Ticket, Ticket.id == TicketSignature.ticket_id)
+        .where(Ticket.status == "open", Ticket.created_at >= cutoff)
+    )
+    if exclude_id is not None:
+        stmt = stmt.where(TicketSignature.ticket_id != exclude_id)
+    return session.exec(stmt).all()
+
+def index_ticket(session: Session, ticket: Ticket) -> List[dict]:
+    """
+    Liczy sygnaturę zgłoszenia, zwraca prawdopodobne duplikaty wśród niedawnych
+    otwartych zgłoszeń i zapisuje sygnaturę w indeksie. Bez commit.
+    """
+    signature = minhash(_ticket_text(ticket))
+    keys = band_keys(signature)
+    duplicates = []
+    for ticket_id, other in _candidates(session, keys, exclude_id=ticket.id):
+        score = similarity(signature, _decode(other))
+        if score >= settings.dedup_threshold:
+            duplicates.append({"ticket_id": ticket_id, "similarity": round(score, 2)})
+    duplicates.sort(key=lambda d: d["similarity"], reverse=True)
+
+    remove_ticket(session, ticket.id)
+    session.add(TicketSignature(ticket_id=ticket.id, minhash=",".join(map(str, signature))))
+    for key in set(keys):
+        session.add(TicketLshBucket(band_key=key, ticket_id=ticket.id))
+    return duplicates[:MAX_DUPLICATES]
+
+def remove_ticket(session: Session, ticket_id: int):
+    session.exec(sqlalchemy_delete(TicketLshBucket).where(TicketLshBucket.ticket_id == ticket_id))
+    session.exec(sqlalchemy_delete(TicketSignature).where(TicketSignature.ticket_id == ticket_id))
+
+def prune_signatures(session: Session, batch_size: int = 1000) -> int:
+    """
+    Usuwa sygnatury, które nie mogą już być kandydatami: zgłoszeń zamkniętych
+    i starszych niż okno DEDUP_WINDOW_DAYS. Paczkami, każda we własnej
+    transakcji; zwraca liczbę zgłoszeń.
+    """
+    total = 0
+    while True:
+        cutoff = datetime.utcnow() - timedelta(days=settings.dedup_window_days)
+        ids = session.exec(
+            sqlalchemy_select(TicketSignature.ticket_id)
+            .join(Ticket, Ticket.id == TicketSignature.ticket_id)
+            .where(or_(Ticket.status == "closed", Ticket.created_at < cutoff))
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            session.rollback()
+            return total
+        session.exec(sqlalchemy_delete(TicketLshBucket).where(TicketLshBucket.ticket_id.in_(ids)))
+        session.exec(sqlalchemy_delete(TicketSignature).where(TicketSignature.ticket_id.in_(ids)))
+        session.commit()
+        total += len(ids)
+
+def duplicate_clusters(session: Session) -> List[List[int]]:
+    """Grupy podobnych niedawnych otwartych zgłoszeń (co najmniej 2 w grupie)."""
+    cutoff = datetime.utcnow() - timedelta(days=settings.dedup_window_days)
+    rows = session.exec(
+        sqlalchemy_select(TicketLshBucket.band_key, TicketSignature.ticket_id, TicketSignature.minhash)
+        .join(TicketSignature, TicketSignature.ticket_id == TicketLshBucket.ticket_id)
+        .join(Ticket, Ticket.id == TicketLshBucket.ticket_id)
+        .where(Ticket.status == "open", Ticket.created_at >= cutoff)
+        .order_by(TicketLshBucket.band_key, TicketLshBucket.ticket_id)
+    ).all()
+
+    parent = {}
+
+    def find(x):
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    signatures = {}
+    buckets = {}
+    for key, ticket_id, value in rows:
+        buckets.setdefault(key, []).append(ticket_id)
+        if ticket_id not in signatures:
+            signatures[ticket_id] = _decode(value)
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        # Weryfikacja względem pierwszego członka kubełka - O(n) zamiast wszystkich par
+        head = members[0]
+        for other in members[1:]:
+            if similarity(signatures[head], signatures[other]) >= settings.dedup_threshold:
+                parent[find(other)] = find(head)
+
+    clusters = {}
+    for ticket_id in parent:
+        clusters.setdefault(find(ticket_id), []).append(ticket_id)
+    return sorted((sorted(c) for c in clusters.values() if len(c) > 1), key=len, reverse=True)
+
+def reindex_open_tickets(session: Session) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=settings.dedup_window_days)
+    tickets = session.exec(
+        sqlalchemy_select(Ticket).where(Ticket.status == "open", Ticket.created_at >= cutoff)
+    ).scalars().all()
+    for ticket in tickets:
+        index_ticket(session, ticket)
+        session.flush()
+    session.commit()
+    return len(tickets)
+
+if __name__ == "__main__":
+    # Uzupełnienie indeksu, np. po imporcie (python -m app.services.dedup)
+    logging.basicConfig(level=logging.INFO)
+    with Session(engine) as session:
+        count = reindex_open_tickets(session)
+    logging.info(f"Zindeksowano zgłoszeń: {count}")
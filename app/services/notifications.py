@@ -0,0 +1,193 @@
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from string import Template
+from typing import List, Optional
+from sqlalchemy import select as sqlalchemy_select, update as sqlalchemy_update, or_
+from sqlmodel import Session
+from app.models.notification import Notification, NotificationPreference
+from app.models.ticket import Ticket
+from app.models.user import User
+from app.api.mail import MailRequest, SmtpBatch
+from app.core.config import settings
+from app.core.db import engine
+
+logger = logging.getLogger("app.error")
+
+TEMPLATES = {
+    "subject": "Helpdesk: $count nowych zdarzeń w Twoich zgłoszeniach",
+    "body": "Dzień dobry $name,\n\nod ostatniej wiadomości w Twoich zgłoszeniach wydarzyło się:\n\n$tickets\n",
+    "ticket": "#$ticket_id $title\n$events",
+    "event": "  - $message",
+}
+
+@lru_cache(maxsize=None)
+def get_template(name: str) -> Template:
+    return Template(TEMPLATES[name])
+
+def record_ticket_event(session: Session, ticket: Ticket, event: str, message: str, actor_id: Optional[int] = None):
+    """
+    Zapisuje zdarzenie zgłoszenia dla autora i przypisanego agenta (bez osoby,
+    która je wywołała). Nie robi commit - zdarzenie trafia do bazy razem ze zmianą.
+    """
+    recipients = {ticket.created_by, ticket.assigned_to} - {None, actor_id}
+    for user_id in recipients:
+        session.add(Notification(user_id=user_id, ticket_id=ticket.id, event=event, message=message))
+
+def render_digest(user: User, notifications: List[Notification], tickets: dict) -> MailRequest:
+    by_ticket = OrderedDict()
+    for n in notifications:
+        by_ticket.setdefault(n.ticket_id, []).append(n)
+    blocks = []
+    for ticket_id, events in by_ticket.items():
+        # Seria zmian statusu zwija się do ostatniej - liczy się stan końcowy
+        last_status = max((n.id for n in events if n.event == "status"), default=None)
+        lines = [
+            get_template("event").substitute(message=n.message)
+            for n in events
+            if n.event != "status" or n.id == last_status
+        ]
+        ticket = tickets.get(ticket_id)
+        blocks.append(get_template("ticket").substitute(
+            ticket_id=ticket_id,
+            title=ticket.title if ticket else "",
+            events="\n".join(lines)
+        ))
+    return MailRequest(
+        to=user.email,
+        subject=get_template("subject").substitute(count=len(notifications)),
+        body=get_template("body").substitute(name=user.full_name or user.email, tickets="\n\n".join(blocks)),
+        html=False
+    )
+
+def _claim_digests(session: Session, now: datetime) -> List[tuple]:
+    """
+    Wybiera digesty, których okno łączenia już minęło, i rezerwuje ich zdarzenia
+    (claimed_at). Krótka transakcja - blokady wierszy nie obejmują wysyłki SMTP.
+    Zwraca listę (id zdarzeń, wiadomość).
+    """
+    retry_before = now - timedelta(seconds=settings.notification_retry_seconds)
+    # SKIP LOCKED: kilka workerów może wywołać flush równocześnie bez podwójnej rezerwacji
+    pending = session.exec(
+        sqlalchemy_select(Notification)
+        .where(
+            Notification.sent_at.is_(None),
+            or_(Notification.claimed_at.is_(None), Notification.claimed_at < retry_before)
+        )
+        .order_by(Notification.user_id, Notification.created_at, Notification.id)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not pending:
+        session.rollback()
+        return []
+
+    by_user = OrderedDict()
+    for n in pending:
+        by_user.setdefault(n.user_id, []).append(n)
+    users = {
+        u.id: u for u in session.exec(sqlalchemy_select(User).where(User.id.in_(by_user.keys()))).scalars()
+    }
+    prefs = {
+        p.user_id: p for p in session.exec(
+            sqlalchemy_select(NotificationPreference).where(NotificationPreference.user_id.in_(by_user.keys()))
+        ).scalars()
+    }
+    ticket_ids = {n.ticket_id for n in pending}
+    tickets = {
+        t.id: t for t in session.exec(sqlalchemy_select(Ticket).where(Ticket.id.in_(ticket_ids))).scalars()
+    }
+
+    claimed = []
+    for user_id, notifications in by_user.items():
+        pref = prefs.get(user_id)
+        window = timedelta(minutes=pref.digest_minutes if pref and pref.digest_minutes is not None
+                           else settings.notification_digest_minutes)
+        if notifications[0].created_at + window > now:
+            continue  # okno jeszcze otwarte - zbieramy dalej
+        user = users.get(user_id)
+        if user and user.is_active and (pref is None or pref.email_enabled):
+            claimed.append(([n.id for n in notifications], render_digest(user, notifications, tickets)))
+            for n in notifications:
+                n.claimed_at = now
+                session.add(n)
+        else:
+            # Wyłączone powiadomienia / nieaktywne konto - zdarzenia są tylko oznaczane
+            for n in notifications:
+                n.sent_at = now
+                session.add(n)
+    session.commit()
+    return claimed
+
+def _mark_digest(session: Session, ids: List[int], now: datetime, delivered: bool):
+    if delivered:
+        session.exec(sqlalchemy_update(Notification).where(Notification.id.in_(ids)).values(sent_at=now))
+    else:
+        # claimed_at zostaje - zdarzenia wrócą do kolejki po NOTIFICATION_RETRY_SECONDS
+        session.exec(
+            sqlalchemy_update(Notification).where(Notification.id.in_(ids))
+            .values(attempts=Notification.attempts + 1)
+        )
+        session.exec(
+            sqlalchemy_update(Notification)
+            .where(Notification.id.in_(ids), Notification.attempts >= settings.notification_max_attempts)
+            .values(sent_at=now, failed_at=now)
+        )
+    session.commit()
+
+def flush_digests(session: Session, now: Optional[datetime] = None) -> int:
+    """
+    Wysyła zaległe digesty, których okno łączenia już minęło, jednym połączeniem
+    SMTP. Każda wiadomość jest oznaczana osobno zaraz po wysyłce - błąd jednej
+    (np. odrzucony adres) nie cofa ani nie wstrzymuje pozostałych.
+    Zwraca liczbę wysłanych wiadomości.
+    """
+    now = now or datetime.utcnow()
+    claimed = _claim_digests(session, now)
+    if not claimed:
+        return 0
+    sent = 0
+    try:
+        smtp = SmtpBatch()
+    except Exception:
+        for ids, _ in claimed:
+            _mark_digest(session, ids, now, delivered=False)
+        raise
+    with smtp:
+        for ids, message in claimed:
+            try:
+                smtp.send(message)
+            except Exception:
+                logger.error(f"Błąd wysyłki digestu do {message.to}", exc_info=True)
+                _mark_digest(session, ids, now, delivered=False)
+                continue
+            _mark_digest(session, ids, now, delivered=True)
+            sent += 1
+    return sent
+
+_stop = threading.Event()
+_worker: Optional[threading.Thread] = None
+
+def _digest_loop():
+    while not _stop.wait(settings.notification_flush_seconds):
+        try:
+            with Session(engine) as session:
+                flush_digests(session)
+        except Exception:
+            logger.error("Błąd wysyłki digestów powiadomień", exc_info=True)
+
+def start_digest_worker():
+    global _worker
+    if settings.notification_flush_seconds <= 0 or _worker is not None:
+        return
+    _stop.clear()
+    _worker = threading.Thread(target=_digest_loop, name="notification-digests", daemon=True)
+    _worker.start()
+
+def stop_digest_worker():
+    global _worker
+    _stop.set()
+    if _worker is not None:
+        _worker.join(timeout=5)
+        _worker = None
@@ -0,0 +1,148 @@
+import logging
+import threading
+from typing import Optional
+from sqlalchemy import select as sqlalchemy_select, func
+from sqlmodel import Session
+from app.models.ticket import Ticket
+from app.models.user import User
+from app.models.agent_skill import AgentSkill
+from app.core.config import settings
+from app.core.db import engine
+
+logger = logging.getLogger("app.error")
+
+# Zgłoszenia w tych statusach nie obciążają agenta
+CLOSED_STATUSES = {"closed", "resolved"}
+
+class AgentRouter:
+    """
+    Wybiera agenta helpdesku dla nowego zgłoszenia na podstawie liczby jego
+    otwartych zgłoszeń (opcjonalnie ważonej umiejętnościami). Liczniki żyją
+    w pamięci i są aktualizowane przy każdej zmianie przypisania/statusu,
+    więc ścieżka żądania nie wykonuje COUNT(*). Pełna przebudowa z bazy
+    następuje przy starcie i okresowo (zmiany z innych workerów).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loads = {}   # user_id -> liczba otwartych zgłoszeń (tylko aktywni agenci)
+        self.skills = {}  # user_id -> [(category_id, priority_id, weight)]
+
+    def rebuild(self, session: Session):
+        agents = session.exec(
+            sqlalchemy_select(User.id).where(User.role == "helpdesk", User.is_active == True)
+        ).scalars().all()
+        counts = dict(session.exec(
+            sqlalchemy_select(Ticket.assigned_to, func.count(Ticket.id))
+            .where(Ticket.assigned_to.is_not(None), Ticket.status.not_in(CLOSED_STATUSES))
+            .group_by(Ticket.assigned_to)
+        ).all())
+        skills = {}
+        for skill in session.exec(sqlalchemy_select(AgentSkill)).scalars():
+            skills.setdefault(skill.user_id, []).append((skill.category_id, skill.priority_id, skill.weight))
+        with self._lock:
+            self.loads = {agent_id: counts.get(agent_id, 0) for agent_id in agents}
+            self.skills = skills
+
+    def _weight(self, agent_id: int, category_id: Optional[int], priority_id: Optional[int]) -> float:
+        weight = 1.0
+        for skill_category, skill_priority, skill_weight in self.skills.get(agent_id, []):
+            if skill_category not in (None, category_id) or skill_priority not in (None, priority_id):
+                continue
+            weight = max(weight, skill_weight)
+        return weight
+
+    def assign(self, category_id: Optional[int] = None, priority_id: Optional[int] = None) -> Optional[int]:
+        """Wybiera agenta i od razu rezerwuje mu zgłoszenie (release() przy wycofaniu)."""
+        with self._lock:
+            if not self.loads:
+                return None
+            agent_id = min(
+                self.loads,
+                key=lambda a: ((self.loads[a] + 1) / self._weight(a, category_id, priority_id), a)
+            )
+            self.loads[agent_id] += 1
+            return agent_id
+
+    def release(self, agent_id: Optional[int]):
+        self._adjust(agent_id, -1)
+
+    def _adjust(self, agent_id: Optional[int], delta: int):
+        if agent_id is None:
+            return
+        with self._lock:
+            if agent_id in self.loads:
+                self.loads[agent_id] = max(0, self.loads[agent_id] + delta)
+
+    def on_ticket_change(self, old_assignee: Optional[int], old_status: str, new_assignee: Optional[int], new_status: str):
+        was_open = old_status not in CLOSED_STATUSES
+        is_open = new_status not in CLOSED_STATUSES
+        if was_open:
+            self._adjust(old_assignee, -1)
+        if is_open:
+            self._adjust(new_assignee, +1)
+
+    def on_user_change(self, user: User, session: Session):
+        """
+        Aktualizuje pulę agentów po zapisanej zmianie użytkownika. Nie zgłasza
+        wyjątków - zmiana jest już w bazie, a pulę poprawi okresowa przebudowa.
+        """
+        try:
+            is_agent = user.role == "helpdesk" and user.is_active
+            with self._lock:
+                known = user.id in self.loads
+            if is_agent and not known:
+                count = session.exec(
+                    sqlalchemy_select(func.count(Ticket.id))
+                    .where(Ticket.assigned_to == user.id, Ticket.status.not_in(CLOSED_STATUSES))
+                ).scalar()
+                with self._lock:
+                    self.loads[user.id] = count
+            elif not is_agent and known:
+                self.remove_user(user.id)
+        except Exception:
+            logger.error(f"Błąd aktualizacji puli agentów dla użytkownika {user.id}", exc_info=True)
+
+    def remove_user(self, user_id: int):
+        with self._lock:
+            self.loads.pop(user_id, None)
+            self.skills.pop(user_id, None)
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [
+                {"user_id": agent_id, "open_tickets": load, "skills": [
+                    {"category_id": c, "priority_id": p, "weight": w} for c, p, w in self.skills.get(agent_id, [])
+                ]}
+                for agent_id, load in sorted(self.loads.items())
+            ]
+
+agent_router = AgentRouter()
+
+_stop = threading.Event()
+_worker: Optional[threading.Thread] = None
+
+def _resync_loop():
+    while not _stop.wait(settings.routing_resync_seconds):
+        try:
+            with Session(engine) as session:
+                agent_router.rebuild(session)
+        except Exception:
+            logger.error("Błąd przebudowy obciążenia agentów", exc_info=True)
+
+def start_routing():
+    global _worker
+    with Session(engine) as session:
+        agent_router.rebuild(session)
+    if settings.routing_resync_seconds <= 0 or _worker is not None:
+        return
+    _stop.clear()
+    _worker = threading.Thread(target=_resync_loop, name="routing-resync", daemon=True)
+    _worker.start()
+
+def stop_routing():
+    global _worker
+    _stop.set()
+    if _worker is not None:
+        _worker.join(timeout=5)
+        _worker = None
@@ -0,0 +1,433 @@
+"""
+Terminy SLA: pierwsza odpowiedź i rozwiązanie, wyliczane z Priority.level.
+
+Terminy są zapisywane w wierszu zgłoszenia (create_ticket, zmiana statusu,
+komentarz agenta), a zdarzenia naruszeń odpala kolejka terminów w pamięci
+(kopiec po dacie) zamiast cyklicznego przeszukiwania tabeli ticket. Kolejkę
+trzyma dokładnie jeden worker - właściciel blokady (advisory lock na
+PostgreSQL, flock pliku SLA_LOCK_FILE na pozostałych bazach). Przy przejęciu
+roli właściciel wczytuje oczekujące terminy jednym zapytaniem po indeksach
+częściowych; zmiany z innych workerów dostaje przez pub/sub backendu cache
+(CACHE_URL=redis://... - wymagany przy kilku workerach), a okresowy resync
+(SLA_RESYNC_SECONDS) zastępuje kolejkę stanem z bazy: uzupełnia zgubione
+komunikaty, poprawia zmienione terminy i usuwa już nieaktualne.
+
+Przed zapisem naruszenia termin jest sprawdzany z bazą, więc nieaktualne
+wpisy w kopcu są nieszkodliwe; unikalny klucz (ticket_id, kind, due_at)
+gwarantuje jedno zdarzenie na termin także przy zmianie właściciela.
+"""
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Dict, Optional
+from sqlalchemy import select as sqlalchemy_select, func, text, exists
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+from app.models.ticket import Ticket
+from app.models.user import User
+from app.models.notification import Notification
+from app.models.sla_breach import SlaBreach
+from app.services.routing import CLOSED_STATUSES
+from app.core.cache import cache, dumps, loads
+from app.core.config import settings
+from app.core.db import engine
+
+try:
+    import fcntl
+except ImportError:  # bez fcntl (Windows) każdy proces jest właścicielem - tylko jeden worker
+    fcntl = None
+
+logger = logging.getLogger("app.error")
+
+FIRST_RESPONSE = "first_response"
+RESOLUTION = "resolution"
+CHANNEL = "helpdesk:sla:deadlines"
+# Klucz advisory lock na PostgreSQL ("SLA")
+ADVISORY_LOCK_KEY = 0x534C41
+# Przebudowa kopca, gdy nieaktualne wpisy przeważają nad oczekującymi
+COMPACT_MIN_SIZE = 1024
+
+LABELS = {
+    FIRST_RESPONSE: "pierwszej odpowiedzi",
+    RESOLUTION: "rozwiązania",
+}
+
+def parse_targets(value: str) -> Dict[str, int]:
+    """'1=60, 2=240, *=1440' -> {"1": 60, "2": 240, "*": 1440} (minuty)"""
+    targets = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        level, minutes = item.split("=", 1)
+        targets[level.strip()] = int(minutes)
+    return targets
+
+TARGETS = {
+    FIRST_RESPONSE: parse_targets(settings.sla_first_response),
+    RESOLUTION: parse_targets(settings.sla_resolution),
+}
+
+def due_date(kind: str, level: Optional[int], start: datetime) -> Optional[datetime]:
+    targets = TARGETS[kind]
+    minutes = targets.get(str(level)) if level is not None else None
+    if minutes is None:
+        minutes = targets.get("*")
+    # Brak wpisu albo 0 minut - bez terminu
+    return start + timedelta(minutes=minutes) if minutes else None
+
+def deadline_values(level: Optional[int], start: datetime) -> dict:
+    """Kolumny terminów dla nowego zgłoszenia."""
+    if not settings.sla_enabled:
+        return {}
+    return {
+        "first_response_due": due_date(FIRST_RESPONSE, level, start),
+        "resolution_due": due_date(RESOLUTION, level, start),
+    }
+
+def status_change_values(ticket: Ticket, new_status: str, now: datetime) -> dict:
+    """
+    Kolumny SLA przy zmianie statusu: zamknięcie bez komentarza agenta liczy się
+    jako pierwsza odpowiedź, ponowne otwarcie daje nowy termin rozwiązania.
+    """
+    if not settings.sla_enabled:
+        return {}
+    was_closed = ticket.status in CLOSED_STATUSES
+    closing = new_status in CLOSED_STATUSES
+    if closing and not was_closed and ticket.first_response_at is None:
+        return {"first_response_at": now}
+    if was_closed and not closing:
+        return {"resolution_due": due_date(RESOLUTION, ticket.priority_level, now)}
+    return {}
+
+def pending_deadlines(ticket: Ticket) -> dict:
+    """Terminy, które mogą jeszcze zostać naruszone; None - termin spełniony albo nieaktualny."""
+    open_ticket = ticket.status not in CLOSED_STATUSES
+    return {
+        FIRST_RESPONSE: ticket.first_response_due if open_ticket and ticket.first_response_at is None else None,
+        RESOLUTION: ticket.resolution_due if open_ticket else None,
+    }
+
+class DeadlineQueue:
+    """
+    Kopiec (termin, ticket_id, rodzaj) z leniwym usuwaniem: aktualny termin
+    każdej pary (ticket_id, rodzaj) jest w słowniku, wpisy z kopca niezgodne
+    ze słownikiem są pomijane przy zdejmowaniu.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._pending = {}  # (ticket_id, rodzaj) -> termin
+        self._cond = threading.Condition()
+        self._stopped = False
+
+    def __len__(self):
+        return len(self._pending)
+
+    def schedule(self, ticket_id: int, kind: str, due: Optional[datetime]):
+        key = (ticket_id, kind)
+        with self._cond:
+            if due is None:
+                self._pending.pop(key, None)
+                return
+            if self._pending.get(key) == due:
+                return
+            self._pending[key] = due
+            heapq.heappush(self._heap, (due, ticket_id, kind))
+            if len(self._heap) > COMPACT_MIN_SIZE and len(self._heap) > 2 * len(self._pending):
+                self._heap = [(d, t, k) for (t, k), d in self._pending.items()]
+                heapq.heapify(self._heap)
+            # Nowy najbliższy termin - budzimy wątek, który czeka na poprzedni
+            if self._heap[0][1:] == (ticket_id, kind):
+                self._cond.notify()
+
+    def clear(self):
+        with self._cond:
+            self._heap = []
+            self._pending = {}
+
+    def sync(self, deadlines: dict):
+        """Zastępuje całą kolejkę: {(ticket_id, rodzaj): termin}."""
+        with self._cond:
+            self._pending = dict(deadlines)
+            self._heap = [(d, t, k) for (t, k), d in self._pending.items()]
+            heapq.heapify(self._heap)
+            self._cond.notify()
+
+    def next_due(self) -> Optional[datetime]:
+        with self._cond:
+            return min(self._pending.values(), default=None)
+
+    def pop_due(self):
+        """Czeka do najbliższego terminu; zwraca (ticket_id, rodzaj, termin) albo None po stop()."""
+        with self._cond:
+            while not self._stopped:
+                while self._heap and self._pending.get(self._heap[0][1:]) != self._heap[0][0]:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, ticket_id, kind = self._heap[0]
+                delay = (due - datetime.utcnow()).total_seconds()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                del self._pending[(ticket_id, kind)]
+                return ticket_id, kind, due
+            return None
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def reset(self):
+        with self._cond:
+            self._stopped = False
+
+class OwnershipLock:
+    """Blokada właściciela kolejki, zwalniana automatycznie, gdy proces umrze."""
+
+    def __init__(self):
+        self._conn = None
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._conn is not None or self._file is not None
+
+    def try_acquire(self) -> bool:
+        if self.held:
+            return True
+        if engine.dialect.name == "postgresql":
+            # Osobne połączenie trzymane przez cały czas posiadania blokady (sesyjny advisory lock)
+            conn = engine.connect()
+            try:
+                acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}).scalar()
+                conn.commit()
+            except Exception:
+                conn.close()
+                raise
+            if acquired:
+                self._conn = conn
+            else:
+                conn.close()
+            return bool(acquired)
+        if fcntl is None:
+            self._file = True
+            return True
+        f = open(settings.sla_lock_file, "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def check(self) -> bool:
+        """Czy blokada nadal jest nasza - zerwane połączenie z PostgreSQL zwalnia advisory lock."""
+        if self._conn is None:
+            return self.held
+        try:
+            self._conn.execute(text("SELECT 1"))
+            self._conn.commit()
+            return True
+        except Exception:
+            logger.warning("Utracono połączenie z blokadą kolejki SLA", exc_info=True)
+            self.release()
+            return False
+
+    def release(self):
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+                self._conn.commit()
+            except Exception:
+                pass
+            self._conn.close()
+            self._conn = None
+        if self._file is not None:
+            if self._file is not True:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+                self._file.close()
+            self._file = None
+
+deadline_queue = DeadlineQueue()
+ownership = OwnershipLock()
+_stop = threading.Event()
+_workers = []
+_unsubscribe = None
+
+def is_owner() -> bool:
+    return ownership.held
+
+def _apply(ticket_id: int, deadlines: dict):
+    for kind, due in deadlines.items():
+        deadline_queue.schedule(ticket_id, kind, due)
+
+def publish_deadlines(ticket_id: int, deadlines: dict):
+    """
+    Wołać po commit. Właściciel aktualizuje kolejkę od razu, pozostałe workery
+    wysyłają zmianę przez pub/sub (bez CACHE_URL jest tylko jeden worker).
+    """
+    if not settings.sla_enabled:
+        return
+    if is_owner():
+        _apply(ticket_id, deadlines)
+        return
+    if cache.backend is None:
+        return
+    try:
+        cache.backend.publish(CHANNEL, dumps({"ticket_id": ticket_id, "deadlines": deadlines}))
+    except Exception:
+        logger.error("Błąd publikacji terminów SLA", exc_info=True)
+
+def track_ticket(ticket: Ticket):
+    publish_deadlines(ticket.id, pending_deadlines(ticket))
+
+def _on_message(message: bytes):
+    if not is_owner():
+        return
+    try:
+        payload = loads(message)
+        _apply(payload["ticket_id"], payload["deadlines"])
+    except Exception:
+        logger.error("Nieprawidłowy komunikat terminów SLA", exc_info=True)
+
+def load_pending(session: Session) -> int:
+    """Zastępuje kolejkę oczekującymi terminami z bazy (bez już zapisanych naruszeń); zwraca ich liczbę."""
+    def not_breached(kind, column):
+        return ~exists().where(SlaBreach.ticket_id == Ticket.id, SlaBreach.kind == kind, SlaBreach.due_at == column)
+
+    first_response = session.exec(
+        sqlalchemy_select(Ticket.id, Ticket.first_response_due)
+        .where(
+            Ticket.first_response_at.is_(None),
+            Ticket.first_response_due.is_not(None),
+            Ticket.status.not_in(CLOSED_STATUSES),
+            not_breached(FIRST_RESPONSE, Ticket.first_response_due)
+        )
+    ).all()
+    resolution = session.exec(
+        sqlalchemy_select(Ticket.id, Ticket.resolution_due)
+        .where(
+            Ticket.status.not_in(CLOSED_STATUSES),
+            Ticket.resolution_due.is_not(None),
+            not_breached(RESOLUTION, Ticket.resolution_due)
+        )
+    ).all()
+    # Baza jest źródłem prawdy - wpisy spoza wyniku (zamknięte, zmienione, zapisane naruszenia) znikają.
+    # Komunikat pub/sub, który minie się z odczytem, poprawi następny resync; record_breach i tak sprawdza termin z bazą
+    deadlines = {(ticket_id, FIRST_RESPONSE): due for ticket_id, due in first_response}
+    deadlines.update({(ticket_id, RESOLUTION): due for ticket_id, due in resolution})
+    deadline_queue.sync(deadlines)
+    return len(first_response) + len(resolution)
+
+def record_breach(ticket_id: int, kind: str, due: datetime) -> bool:
+    """Zapisuje naruszenie i powiadomienia; False - termin już nieaktualny albo zapisany."""
+    with Session(engine) as session:
+        ticket = session.get(Ticket, ticket_id)
+        if ticket is None or pending_deadlines(ticket)[kind] != due:
+            return False
+        # Alert dla przypisanego agenta, a przy nieprzypisanym zgłoszeniu - dla administratorów.
+        # Odbiorcy przed dodaniem naruszenia - autoflush zapytania ominąłby obsługę IntegrityError niżej
+        if ticket.assigned_to is not None:
+            recipients = [ticket.assigned_to]
+        else:
+            recipients = session.exec(
+                sqlalchemy_select(User.id).where(User.role == "admin", User.is_active == True)
+            ).scalars().all()
+        session.add(SlaBreach(
+            ticket_id=ticket.id,
+            kind=kind,
+            due_at=due,
+            priority_id=ticket.priority_id,
+            assigned_to=ticket.assigned_to
+        ))
+        message = f"Przekroczony termin {LABELS[kind]} (SLA): {due:%Y-%m-%d %H:%M} UTC"
+        for user_id in recipients:
+            session.add(Notification(user_id=user_id, ticket_id=ticket.id, event="sla_breach", message=message))
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            return False
+        return True
+
+def breach_stats(session: Session, since: datetime) -> list:
+    rows = session.exec(
+        sqlalchemy_select(SlaBreach.kind, SlaBreach.priority_id, func.count(SlaBreach.id))
+        .where(SlaBreach.breached_at >= since)
+        .group_by(SlaBreach.kind, SlaBreach.priority_id)
+    ).all()
+    return [{"kind": kind, "priority_id": priority_id, "count": count} for kind, priority_id, count in rows]
+
+def _take_ownership():
+    if not ownership.try_acquire():
+        return False
+    with Session(engine) as session:
+        count = load_pending(session)
+    logger.info(f"Worker przejął kolejkę terminów SLA ({count} oczekujących)")
+    return True
+
+def _timer_loop():
+    while True:
+        item = deadline_queue.pop_due()
+        if item is None:
+            return
+        try:
+            record_breach(*item)
+        except Exception:
+            logger.error(f"Błąd zapisu naruszenia SLA zgłoszenia {item[0]}", exc_info=True)
+
+def _election_loop():
+    last_resync = monotonic()
+    while not _stop.wait(settings.sla_election_seconds):
+        try:
+            if not is_owner():
+                if _take_ownership():
+                    last_resync = monotonic()
+            elif not ownership.check():
+                deadline_queue.clear()
+            elif settings.sla_resync_seconds > 0 and monotonic() - last_resync >= settings.sla_resync_seconds:
+                with Session(engine) as session:
+                    load_pending(session)
+                last_resync = monotonic()
+        except Exception:
+            logger.error("Błąd obsługi kolejki terminów SLA", exc_info=True)
+
+def start_sla():
+    global _unsubscribe
+    if not settings.sla_enabled or _workers:
+        return
+    if settings.server_workers > 1 and not (cache.backend is not None and cache.backend.shared):
+        # Terminy z workerów bez kolejki nie dotarłyby do właściciela aż do resync
+        raise RuntimeError("SLA przy kilku workerach wymaga CACHE_URL=redis://... (pub/sub terminów)")
+    _stop.clear()
+    deadline_queue.reset()
+    try:
+        _take_ownership()
+    except Exception:
+        logger.error("Błąd przejmowania kolejki terminów SLA", exc_info=True)
+    if cache.backend is not None:
+        _unsubscribe = cache.backend.subscribe(CHANNEL, _on_message)
+    for target, name in ((_timer_loop, "sla-timer"), (_election_loop, "sla-election")):
+        worker = threading.Thread(target=target, name=name, daemon=True)
+        worker.start()
+        _workers.append(worker)
+
+def stop_sla():
+    global _unsubscribe
+    _stop.set()
+    deadline_queue.stop()
+    for worker in _workers:
+        worker.join(timeout=5)
+    _workers.clear()
+    if _unsubscribe is not None:
+        _unsubscribe()
+        _unsubscribe = None
+    deadline_queue.clear()
+    ownership.release()
@@ -0,0 +1,171 @@
+import os
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional
+from sqlalchemy import update as sqlalchemy_update
+from sqlmodel import Session
+from app.models.attachment import Attachment
+from app.core.config import settings
+from app.core.db import engine
+
+try:
+    from PIL import Image
+except ImportError:  # podglądy obrazów wymagają Pillow
+    Image = None
+
+try:
+    import pypdfium2
+except ImportError:  # podglądy PDF wymagają pypdfium2
+    pypdfium2 = None
+
+logger = logging.getLogger("app.error")
+
+# Miniatura do listy załączników i większy podgląd (dla PDF - pierwsza strona)
+SIZES = {
+    "thumbnail": (320, 320),
+    "preview": (1280, 1280),
+}
+THUMBS_DIR = ".thumbs"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Generowanie w toku: (ścieżka wyniku) -> Future; kolejne żądania czekają na ten sam wynik
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def is_supported(content_type: str) -> bool:
+    if content_type == "application/pdf":
+        return pypdfium2 is not None and Image is not None
+    return Image is not None and content_type.startswith("image/") and content_type != "image/svg+xml"
+
+def thumbnail_path(original_path: str, content_hash: str, size: str) -> str:
+    # Obok oryginału, po hashu treści - ten sam plik załączony dwa razy ma jedną miniaturę
+    return os.path.join(os.path.dirname(original_path), THUMBS_DIR, f"{content_hash}-{size}.webp")
+
+def _open_image(path: str, content_type: str, box):
+    if content_type == "application/pdf":
+        pdf = pypdfium2.PdfDocument(path)
+        try:
+            page = pdf[0]
+            # Renderujemy od razu w docelowej skali zamiast pełnej strony
+            width, height = page.get_size()
+            return page.render(scale=min(box[0] / width, box[1] / height)).to_pil()
+        finally:
+            pdf.close()
+    image = Image.open(path)
+    # JPEG: dekodowanie od razu w zmniejszonej skali - wielokrotnie szybsze niż pełny obraz
+    image.draft("RGB", box)
+    return image
+
+def _render(original_path: str, content_type: str, target: str, size: str):
+    box = SIZES[size]
+    image = _open_image(original_path, content_type, box)
+    try:
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        image.thumbnail(box)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Zapis przez plik tymczasowy - równoległy odczyt nigdy nie zobaczy połowy pliku
+        tmp = f"{target}.{threading.get_ident()}.tmp"
+        image.save(tmp, "WEBP", quality=80, method=4)
+        os.replace(tmp, target)
+    finally:
+        image.close()
+
+def ensure_thumbnail(original_path: str, content_type: str, content_hash: str, size: str) -> Optional[str]:
+    """
+    Zwraca ścieżkę miniatury, generując ją w razie potrzeby. Równoległe wywołania
+    dla tej samej miniatury czekają na jedno generowanie. None - format bez podglądu.
+    """
+    if size not in SIZES or not is_supported(content_type):
+        return None
+    target = thumbnail_path(original_path, content_hash, size)
+    if os.path.exists(target):
+        return target
+    with _inflight_lock:
+        future = _inflight.get(target)
+        owner = future is None
+        if owner:
+            future = _inflight[target] = Future()
+    if not owner:
+        return future.result()
+    try:
+        if not os.path.exists(target):
+            _render(original_path, content_type, target, size)
+        future.set_result(target)
+        return target
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(target, None)
+
+def attachment_hash(att) -> str:
+    """
+    Hash treści załącznika (Attachment albo ArchivedAttachment, także odłączonego
+    od sesji); liczony przy pierwszej potrzebie i zapisywany we własnej krótkiej
+    transakcji - czytanie pliku nie trzyma połączenia ani transakcji żądania.
+    """
+    if att.content_hash:
+        return att.content_hash
+    content_hash = file_hash(att.path)
+    model = type(att)
+    with Session(engine) as session:
+        # Warunek na NULL - równoległe wyliczenie tego samego pliku nie nadpisuje wyniku
+        session.exec(
+            sqlalchemy_update(model)
+            .where(model.id == att.id, model.content_hash.is_(None))
+            .values(content_hash=content_hash)
+        )
+        session.commit()
+    return content_hash
+
+def generate_for_attachment(attachment_id: int):
+    try:
+        with Session(engine) as session:
+            att = session.get(Attachment, attachment_id)
+            if not att or not is_supported(att.content_type) or not os.path.exists(att.path):
+                return
+        # Sesja zamknięta - hash (odczyt całego pliku) i miniatury bez połączenia z bazą
+        content_hash = attachment_hash(att)
+        for size in SIZES:
+            ensure_thumbnail(att.path, att.content_type, content_hash, size)
+    except Exception:
+        logger.error(f"Błąd generowania miniatur załącznika {attachment_id}", exc_info=True)
+
+def schedule_thumbnails(attachment_id: int, content_type: str):
+    """Zleca miniatury w tle; bez puli (THUMBNAIL_WORKERS=0) powstaną przy pierwszym żądaniu."""
+    global _executor
+    if settings.thumbnail_workers <= 0 or not is_supported(content_type):
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.thumbnail_workers, thread_name_prefix="thumbnails")
+        _executor.submit(generate_for_attachment, attachment_id)
+
+def remove_thumbnails(original_path: str, content_hash: Optional[str]):
+    if not content_hash:
+        return
+    for size in SIZES:
+        try:
+            os.remove(thumbnail_path(original_path, content_hash, size))
+        except FileNotFoundError:
+            pass
+
+def stop_thumbnail_worker():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,71 @@
+import logging
+from sqlalchemy import select as sqlalchemy_select, update as sqlalchemy_update, func, case
+from sqlmodel import Session
+from app.models.ticket import Ticket, Comment
+from app.models.attachment import Attachment
+from app.core.db import engine
+
+logger = logging.getLogger("app.error")
+
+def rebuild_ticket_counters(session: Session):
+    """
+    Przelicza od nowa comment_count, attachment_count, last_comment_at
+    i last_activity_at wszystkich zgłoszeń na podstawie tabel comment/attachment.
+    """
+    comment_count = (
+        sqlalchemy_select(func.count(Comment.id))
+        .where(Comment.ticket_id == Ticket.id)
+        .scalar_subquery()
+    )
+    last_comment_at = (
+        sqlalchemy_select(func.max(Comment.created_at))
+        .where(Comment.ticket_id == Ticket.id)
+        .scalar_subquery()
+    )
+    attachment_count = (
+        sqlalchemy_select(func.count(Attachment.id))
+        .where(Attachment.ticket_id == Ticket.id)
+        .scalar_subquery()
+    )
+    last_upload_at = (
+        sqlalchemy_select(func.max(Attachment.uploaded_at))
+        .where(Attachment.ticket_id == Ticket.id)
+        .scalar_subquery()
+    )
+    session.exec(
+        sqlalchemy_update(Ticket).values(
+            comment_count=comment_count,
+            attachment_count=attachment_count,
+            last_comment_at=last_comment_at,
+            # Przeliczone liczniki są częścią TicketRead - nowa wersja unieważnia ETagi klientów
+            version=Ticket.version + 1
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    # last_activity_at = najpóźniejsza z dat: updated_at, ostatni komentarz, ostatni załącznik
+    # (CASE zamiast GREATEST, którego nie ma w SQLite)
+    session.exec(
+        sqlalchemy_update(Ticket).values(
+            last_activity_at=case(
+                (Ticket.last_comment_at > Ticket.updated_at, Ticket.last_comment_at),
+                else_=Ticket.updated_at
+            )
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    session.exec(
+        sqlalchemy_update(Ticket).values(
+            last_activity_at=case(
+                (last_upload_at > Ticket.last_activity_at, last_upload_at),
+                else_=Ticket.last_activity_at
+            )
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    session.commit()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    with Session(engine) as session:
+        rebuild_ticket_counters(session)
+    logging.info("Liczniki aktywności zgłoszeń zostały przebudowane.")
@@ -0,0 +1,48 @@
+"""
+Środowisko migracji: baza z DATABASE_URL, schemat docelowy (autogenerate)
+z modeli app.models. init_db przekazuje własne połączenie w
+config.attributes["connection"]; z wiersza poleceń (alembic ...) używany
+jest silnik aplikacji, a z --sql powstaje skrypt SQL do wykonania przez DBA.
+"""
+import pkgutil
+import importlib
+from logging.config import fileConfig
+from alembic import context
+from sqlmodel import SQLModel
+import app.models
+
+config = context.config
+
+# Wszystkie tabele muszą być w metadanych - app.models nie ma __init__ importującego moduły
+for module in pkgutil.iter_modules(app.models.__path__):
+    importlib.import_module(f"app.models.{module.name}")
+
+target_metadata = SQLModel.metadata
+
+def run_migrations(connection):
+    # render_as_batch: SQLite nie ma ALTER COLUMN ani ADD CONSTRAINT - tabela jest przebudowywana
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite"
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+connection = config.attributes.get("connection")
+if connection is None and config.config_file_name is not None:
+    # Z wiersza poleceń - konfiguracja logów z alembic.ini bez wyłączania loggerów aplikacji
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+if context.is_offline_mode():
+    # alembic upgrade 0001:head --sql > upgrade.sql
+    from app.core.config import settings
+    context.configure(url=settings.database_url, target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+elif connection is not None:
+    run_migrations(connection)
+else:
+    from app.core.db import engine
+    with engine.begin() as conn:
+        run_migrations(conn)
@@ -0,0 +1,85 @@
+"""Schemat bazowy: tabele tworzone wcześniej przez create_all
+
+Bazy utworzone przed wprowadzeniem migracji (bez tabeli alembic_version)
+init_db oznacza tą rewizją (alembic stamp 0001) i dalej migruje od niej.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "user",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("full_name", sa.String(), nullable=False),
+        sa.Column("role", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+    )
+    op.create_index("ix_user_email", "user", ["email"], unique=True)
+    op.create_table(
+        "category",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+    )
+    op.create_index("ix_category_name", "category", ["name"], unique=True)
+    op.create_table(
+        "priority",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("level", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_priority_name", "priority", ["name"], unique=True)
+    op.create_table(
+        "passwordresettoken",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("code", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("used", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_passwordresettoken_email", "passwordresettoken", ["email"])
+    op.create_table(
+        "ticket",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.Column("category_id", sa.Integer(), sa.ForeignKey("category.id")),
+        sa.Column("priority_id", sa.Integer(), sa.ForeignKey("priority.id")),
+        sa.Column("created_by", sa.Integer(), nullable=False),
+        sa.Column("assigned_to", sa.Integer(), sa.ForeignKey("user.id")),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "comment",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("ticket.id"), nullable=False),
+        sa.Column("author_id", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("content", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "attachment",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("ticket.id"), nullable=False),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("content_type", sa.String(), nullable=False),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("uploaded_at", sa.DateTime(), nullable=False),
+    )
+
+def downgrade():
+    for table in ("attachment", "comment", "ticket", "passwordresettoken", "priority", "category", "user"):
+        op.drop_table(table)
@@ -0,0 +1,32 @@
+"""Kolejka zgłoszeń: poziom priorytetu w zgłoszeniu i indeks częściowy ix_ticket_queue
+
+priority_level istniejących zgłoszeń jest uzupełniany z priority.level.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migration_ops import Schema
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+QUEUE_WHERE = "assigned_to IS NULL AND status = 'open'"
+
+def upgrade():
+    schema = Schema()
+    if schema.add_column("ticket", sa.Column("priority_level", sa.Integer())):
+        op.execute(
+            "UPDATE ticket SET priority_level = "
+            "(SELECT priority.level FROM priority WHERE priority.id = ticket.priority_id)"
+        )
+    schema.create_index("ix_ticket_queue", "ticket", ["priority_level", "created_at", "id"], QUEUE_WHERE)
+
+def downgrade():
+    op.drop_index("ix_ticket_queue", table_name="ticket")
+    with op.batch_alter_table("ticket") as batch:
+        batch.drop_column("priority_level")
@@ -0,0 +1,24 @@
+"""Wersja zgłoszenia pod ETag i zapisy warunkowe (If-Match)
+
+Istniejące zgłoszenia dostają wersję 1.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migration_ops import Schema
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    schema = Schema()
+    schema.add_column("ticket", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+def downgrade():
+    with op.batch_alter_table("ticket") as batch:
+        batch.drop_column("version")
@@ -0,0 +1,72 @@
+"""Liczniki aktywności zgłoszeń i indeksy sortowań listy
+
+Liczniki i last_activity_at istniejących zgłoszeń są uzupełniane jak w
+python -m app.services.ticket_counters.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migration_ops import Schema
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# (nazwa, kolumny) - sortowania listy zgłoszeń i lista klienta
+TICKET_INDEXES = [
+    ("ix_ticket_last_activity_at", ["last_activity_at"]),
+    ("ix_ticket_created_at_id", ["created_at", "id"]),
+    ("ix_ticket_comment_count_id", ["comment_count", "id"]),
+    ("ix_ticket_attachment_count_id", ["attachment_count", "id"]),
+    ("ix_ticket_created_by_activity", ["created_by", "last_activity_at", "id"]),
+]
+
+def upgrade():
+    schema = Schema()
+
+    # Kolumny NOT NULL dostają wartość domyślną dla istniejących wierszy
+    added = {
+        column.name for column in (
+            sa.Column("comment_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("attachment_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("last_comment_at", sa.DateTime()),
+            sa.Column("last_activity_at", sa.DateTime()),
+        )
+        if schema.add_column("ticket", column)
+    }
+    if added & {"comment_count", "attachment_count", "last_comment_at"}:
+        op.execute(
+            "UPDATE ticket SET "
+            "comment_count = (SELECT count(*) FROM comment WHERE comment.ticket_id = ticket.id), "
+            "last_comment_at = (SELECT max(comment.created_at) FROM comment WHERE comment.ticket_id = ticket.id), "
+            "attachment_count = (SELECT count(*) FROM attachment WHERE attachment.ticket_id = ticket.id)"
+        )
+    if "last_activity_at" in added:
+        # Najpóźniejsza z dat: updated_at, ostatni komentarz, ostatni załącznik
+        op.execute(
+            "UPDATE ticket SET last_activity_at = "
+            "CASE WHEN last_comment_at > updated_at THEN last_comment_at ELSE updated_at END"
+        )
+        op.execute(
+            "UPDATE ticket SET last_activity_at = "
+            "(SELECT max(attachment.uploaded_at) FROM attachment WHERE attachment.ticket_id = ticket.id) "
+            "WHERE (SELECT max(attachment.uploaded_at) FROM attachment WHERE attachment.ticket_id = ticket.id) "
+            "> last_activity_at"
+        )
+    if schema.is_nullable("ticket", "last_activity_at"):
+        # SQLite przebudowuje tabelę; indeksy (także częściowe) batch odtwarza sam
+        with op.batch_alter_table("ticket") as batch:
+            batch.alter_column("last_activity_at", existing_type=sa.DateTime(), nullable=False)
+    for name, columns in TICKET_INDEXES:
+        schema.create_index(name, "ticket", columns)
+
+def downgrade():
+    for name, _ in reversed(TICKET_INDEXES):
+        op.drop_index(name, table_name="ticket")
+    with op.batch_alter_table("ticket") as batch:
+        for column in ("last_activity_at", "last_comment_at", "attachment_count", "comment_count"):
+            batch.drop_column(column)
@@ -0,0 +1,37 @@
+"""Indeksy wyszukiwania zgłoszeń, komentarzy i załączników; klucz obcy ticket.created_by
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+from app.core.migration_ops import Schema
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# (tabela, nazwa, kolumny)
+INDEXES = [
+    ("ticket", "ix_ticket_created_by", ["created_by"]),
+    ("ticket", "ix_ticket_assigned_to", ["assigned_to"]),
+    ("ticket", "ix_ticket_status", ["status"]),
+    ("comment", "ix_comment_ticket_id", ["ticket_id"]),
+    ("attachment", "ix_attachment_ticket_id", ["ticket_id"]),
+]
+
+def upgrade():
+    schema = Schema()
+    if not schema.has_foreign_key("ticket", ["created_by"]):
+        # SQLite przebudowuje tabelę; indeksy (także częściowe) batch odtwarza sam
+        with op.batch_alter_table("ticket") as batch:
+            batch.create_foreign_key("ticket_created_by_fkey", "user", ["created_by"], ["id"])
+    for table, name, columns in INDEXES:
+        schema.create_index(name, table, columns)
+
+def downgrade():
+    for table, name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    with op.batch_alter_table("ticket") as batch:
+        batch.drop_constraint("ticket_created_by_fkey", type_="foreignkey")
@@ -0,0 +1,48 @@
+"""Powiadomienia o zdarzeniach zgłoszeń i preferencje digestów e-mail
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migration_ops import Schema
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+NOTIFICATION_PENDING_WHERE = "sent_at IS NULL"
+
+def upgrade():
+    schema = Schema()
+    schema.create_table(
+        "notification",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("ticket.id"), nullable=False),
+        sa.Column("event", sa.String(), nullable=False),
+        sa.Column("message", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("sent_at", sa.DateTime()),
+        sa.Column("claimed_at", sa.DateTime()),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("failed_at", sa.DateTime()),
+        indexes=[("ix_notification_user_id", ["user_id"])]
+    )
+    # Tabela z wcześniejszej wersji - bez rezerwacji i licznika prób wysyłki
+    schema.add_column("notification", sa.Column("claimed_at", sa.DateTime()))
+    schema.add_column("notification", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+    schema.add_column("notification", sa.Column("failed_at", sa.DateTime()))
+    schema.create_index("ix_notification_pending", "notification", ["user_id", "created_at"], NOTIFICATION_PENDING_WHERE)
+    schema.create_table(
+        "notificationpreference",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("user.id"), primary_key=True),
+        sa.Column("email_enabled", sa.Boolean(), nullable=False),
+        sa.Column("digest_minutes", sa.Integer()),
+    )
+
+def downgrade():
+    op.drop_table("notificationpreference")
+    op.drop_table("notification")
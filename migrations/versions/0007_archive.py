@@ -0,0 +1,61 @@
+"""Archiwum długo zamkniętych zgłoszeń: ticket_archive, comment_archive, attachment_archive
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migration_ops import Schema
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    schema = Schema()
+    schema.create_table(
+        "ticket_archive",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.Column("category_id", sa.Integer()),
+        sa.Column("priority_id", sa.Integer()),
+        sa.Column("created_by", sa.Integer(), nullable=False),
+        sa.Column("assigned_to", sa.Integer()),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("comment_count", sa.Integer(), nullable=False),
+        sa.Column("attachment_count", sa.Integer(), nullable=False),
+        sa.Column("last_comment_at", sa.DateTime()),
+        sa.Column("last_activity_at", sa.DateTime()),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+        indexes=[("ix_ticket_archive_created_by", ["created_by"])]
+    )
+    schema.create_table(
+        "comment_archive",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("ticket_archive.id"), nullable=False),
+        sa.Column("author_id", sa.Integer(), nullable=False),
+        sa.Column("content", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        indexes=[("ix_comment_archive_ticket_id", ["ticket_id"])]
+    )
+    schema.create_table(
+        "attachment_archive",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("ticket_archive.id"), nullable=False),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("content_type", sa.String(), nullable=False),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("uploaded_at", sa.DateTime(), nullable=False),
+        indexes=[("ix_attachment_archive_ticket_id", ["ticket_id"])]
+    )
+
+def downgrade():
+    # Zarchiwizowane zgłoszenia nie wracają do tabeli ticket - przed downgrade przywróć je ręcznie
+    for table in ("attachment_archive", "comment_archive", "ticket_archive"):
+        op.drop_table(table)
@@ -0,0 +1,34 @@
+"""Sygnatury MinHash i kubełki LSH do wykrywania duplikatów zgłoszeń
+
+Indeks istniejących otwartych zgłoszeń buduje python -m app.services.dedup.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migration_ops import Schema
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    schema = Schema()
+    schema.create_table(
+        "ticketsignature",
+        sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("ticket.id"), primary_key=True),
+        sa.Column("minhash", sa.String(), nullable=False),
+    )
+    schema.create_table(
+        "ticketlshbucket",
+        sa.Column("band_key", sa.BigInteger(), primary_key=True),
+        sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("ticket.id"), primary_key=True),
+        indexes=[("ix_ticketlshbucket_ticket_id", ["ticket_id"])]
+    )
+
+def downgrade():
+    op.drop_table("ticketlshbucket")
+    op.drop_table("ticketsignature")
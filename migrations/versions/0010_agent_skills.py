@@ -0,0 +1,29 @@
+"""Umiejętności agentów (kategoria, priorytet, waga) dla automatycznego przypisywania
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migration_ops import Schema
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    schema = Schema()
+    schema.create_table(
+        "agentskill",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("category_id", sa.Integer(), sa.ForeignKey("category.id")),
+        sa.Column("priority_id", sa.Integer(), sa.ForeignKey("priority.id")),
+        sa.Column("weight", sa.Float(), nullable=False),
+        indexes=[("ix_agentskill_user_id", ["user_id"])]
+    )
+
+def downgrade():
+    op.drop_table("agentskill")
@@ -0,0 +1,33 @@
+"""Indeksy katalogu użytkowników: prefiks e-maila i nazwiska, rola i aktywność
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migration_ops import Schema
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    schema = Schema()
+    # Wyszukiwanie po prefiksie lower(x) LIKE 'abc%'
+    schema.create_index(
+        "ix_user_email_prefix", "user",
+        [sa.func.lower(sa.column("email")).label("email_lower")],
+        postgresql_ops={"email_lower": "text_pattern_ops"}
+    )
+    schema.create_index(
+        "ix_user_full_name_prefix", "user",
+        [sa.func.lower(sa.column("full_name")).label("full_name_lower")],
+        postgresql_ops={"full_name_lower": "text_pattern_ops"}
+    )
+    schema.create_index("ix_user_role_active", "user", ["role", "is_active"])
+
+def downgrade():
+    for name in ("ix_user_role_active", "ix_user_full_name_prefix", "ix_user_email_prefix"):
+        op.drop_index(name, table_name="user")
@@ -0,0 +1,27 @@
+"""Hash treści załączników (wspólne miniatury identycznych plików)
+
+Załączniki sprzed migracji dostają hash przy pierwszym żądaniu miniatury.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migration_ops import Schema
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    schema = Schema()
+    schema.add_column("attachment", sa.Column("content_hash", sa.String()))
+    # Archiwum z wcześniejszej wersji - bez hasha treści załącznika
+    schema.add_column("attachment_archive", sa.Column("content_hash", sa.String()))
+
+def downgrade():
+    for table in ("attachment_archive", "attachment"):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("content_hash")
@@ -0,0 +1,57 @@
+"""Terminy SLA zgłoszeń i historia naruszeń
+
+Terminy SLA (first_response_due, resolution_due) dostają tylko
+zgłoszenia utworzone albo zmienione po migracji.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migration_ops import Schema
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+SLA_FIRST_RESPONSE_WHERE = "first_response_at IS NULL AND first_response_due IS NOT NULL"
+SLA_RESOLUTION_WHERE = "status NOT IN ('closed', 'resolved') AND resolution_due IS NOT NULL"
+
+# (nazwa, kolumny, warunek indeksu częściowego)
+TICKET_INDEXES = [
+    ("ix_ticket_sla_first_response", ["first_response_due"], SLA_FIRST_RESPONSE_WHERE),
+    ("ix_ticket_sla_resolution", ["resolution_due"], SLA_RESOLUTION_WHERE),
+]
+
+def upgrade():
+    schema = Schema()
+
+    for table in ("ticket", "ticket_archive"):
+        for column in ("first_response_due", "first_response_at", "resolution_due"):
+            schema.add_column(table, sa.Column(column, sa.DateTime()))
+    for name, columns, where in TICKET_INDEXES:
+        schema.create_index(name, "ticket", columns, where)
+
+    schema.create_table(
+        "sla_breach",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ticket_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("due_at", sa.DateTime(), nullable=False),
+        sa.Column("breached_at", sa.DateTime(), nullable=False),
+        sa.Column("priority_id", sa.Integer()),
+        sa.Column("assigned_to", sa.Integer()),
+        sa.UniqueConstraint("ticket_id", "kind", "due_at", name="uq_sla_breach"),
+        indexes=[("ix_sla_breach_ticket_id", ["ticket_id"]), ("ix_sla_breach_breached_at", ["breached_at"])]
+    )
+
+def downgrade():
+    op.drop_table("sla_breach")
+    for name, _, _ in reversed(TICKET_INDEXES):
+        op.drop_index(name, table_name="ticket")
+    for table in ("ticket_archive", "ticket"):
+        with op.batch_alter_table(table) as batch:
+            for column in ("resolution_due", "first_response_at", "first_response_due"):
+                batch.drop_column(column)
@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import pytest
+
+# Moduły aplikacji tworzą silnik przy imporcie - testy nie mogą sięgać do bazy z konfiguracji.
+# Plik zamiast sqlite:// - baza w pamięci jest osobna dla każdego połączenia (wątki TestClient)
+TEST_DIR = tempfile.mkdtemp(prefix="helpdesk-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+os.environ["SLA_LOCK_FILE"] = os.path.join(TEST_DIR, "sla.lock")
+
+@pytest.fixture(scope="session")
+def app_client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    # Załączniki trafiają do względnego UPLOAD_ROOT - katalog roboczy poza repozytorium
+    cwd = os.getcwd()
+    os.chdir(TEST_DIR)
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        os.chdir(cwd)
+
+@pytest.fixture
+def client(app_client):
+    """Klient aplikacji na migrowanej bazie; po teście tabele i stan w pamięci są czyszczone."""
+    yield app_client
+    from sqlmodel import SQLModel
+    from app.core.db import engine
+    from app.core.cache import cache
+    from app.services import sla
+    with engine.begin() as conn:
+        for table in reversed(SQLModel.metadata.sorted_tables):
+            conn.execute(table.delete())
+    cache.clear_local()
+    sla.deadline_queue.clear()
+    # Identyfikatory zgłoszeń zaczynają się od nowa - pliki załączników też
+    shutil.rmtree(os.path.join(TEST_DIR, "attachments"), ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def password_hash():
+    from app.core.security import hash_password
+    return hash_password("secret")
+
+@pytest.fixture
+def make_user(client, password_hash):
+    """
+    make_user(email, role) -> nagłówki Authorization nowego użytkownika (hasło "secret").
+    Wiersz zapisywany bezpośrednio, z jednym hashem na sesję testów - bcrypt przy
+    każdej rejestracji i logowaniu zajmowałby większość czasu testów.
+    """
+    from sqlmodel import Session
+    from app.api.auth import create_access_token
+    from app.core.db import engine
+    from app.models.user import User
+    from app.services.routing import agent_router
+
+    def make(email: str, role: str = "client") -> dict:
+        with Session(engine) as session:
+            user = User(email=email, hashed_password=password_hash, full_name="", role=role)
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+            agent_router.on_user_change(user, session)
+            return {"Authorization": f"Bearer {create_access_token(user.id, user.email)}"}
+    return make
@@ -0,0 +1,71 @@
+"""
+Admission control: nadmiar ponad limit i kolejkę dostaje od razu 503
+z Retry-After, także bez kolejki (ADMISSION_QUEUE_SIZE=0).
+"""
+import asyncio
+import httpx
+from app.core.admission import AdmissionMiddleware, Gate, LANE_AGENT, LANE_ANONYMOUS
+
+def blocking_app(release: asyncio.Event):
+    """Aplikacja, która trzyma slot, dopóki test nie ustawi release."""
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+def admission(app, queue_size: int, queue_timeout: float = 5) -> AdmissionMiddleware:
+    return AdmissionMiddleware(
+        app, max_concurrency=1, route_limits="", exempt="",
+        queue_size=queue_size, queue_timeout=queue_timeout, retry_after=7
+    )
+
+async def run_requests(queue_size: int, count: int, queue_timeout: float = 5, hold: float = 0) -> list:
+    release = asyncio.Event()
+    middleware = admission(blocking_app(release), queue_size, queue_timeout)
+    transport = httpx.ASGITransport(app=middleware)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        tasks = []
+        for _ in range(count):
+            tasks.append(asyncio.create_task(client.get("/tickets/")))
+            # Kolejne żądanie dopiero, gdy poprzednie zajęło slot albo miejsce w kolejce
+            while middleware.gate.active + middleware.gate.queued + middleware.gate.shed < len(tasks):
+                await asyncio.sleep(0.01)
+        # Odrzucone kończą się bez czekania na zwolnienie slotu
+        while sum(task.done() for task in tasks) < middleware.gate.shed:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(hold)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+def test_sheds_without_queue():
+    responses = asyncio.run(run_requests(queue_size=0, count=2))
+
+    assert [r.status_code for r in responses] == [200, 503]
+    assert responses[1].headers["Retry-After"] == "7"
+
+def test_sheds_when_queue_is_full():
+    responses = asyncio.run(run_requests(queue_size=1, count=3))
+
+    # Drugie czeka w kolejce i dostaje slot po pierwszym, trzecie jest odrzucane od razu
+    assert [r.status_code for r in responses] == [200, 200, 503]
+    assert responses[2].headers["Retry-After"] == "7"
+    assert responses[2].json()["detail"]
+
+def test_sheds_after_queue_timeout():
+    responses = asyncio.run(run_requests(queue_size=1, count=2, queue_timeout=0.05, hold=0.5))
+
+    assert [r.status_code for r in responses] == [200, 503]
+
+def test_higher_lane_evicts_lowest_waiter():
+    async def scenario():
+        gate = Gate("*", limit=1, queue_size=1, timeout=5)
+        assert await gate.acquire(LANE_ANONYMOUS)
+        anonymous = asyncio.create_task(gate.acquire(LANE_ANONYMOUS))
+        await asyncio.sleep(0)
+        agent = asyncio.create_task(gate.acquire(LANE_AGENT))
+        assert await anonymous is False
+        gate.release()
+        return await agent, gate.shed
+
+    assert asyncio.run(scenario()) == (True, 1)
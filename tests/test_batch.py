@@ -0,0 +1,89 @@
+"""
+POST /batch: każda pozycja ma własny status, pliki i strumienie dostają 406,
+a odczyty GET (równoległe, każdy z własną sesją) widzą zapisy wykonane przed nimi.
+"""
+from sqlmodel import Session
+from app.core.db import engine
+from app.models.ticket import Ticket
+
+def create_ticket(client, headers) -> int:
+    return client.post("/tickets/", json={"title": "t", "description": "d"}, headers=headers).json()["id"]
+
+def batch(client, headers, requests) -> list:
+    response = client.post("/batch", json={"requests": requests}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_each_item_has_its_own_status(client, make_user):
+    owner = make_user("client@example.com")
+    other = make_user("other@example.com")
+    own_ticket = create_ticket(client, owner)
+    foreign_ticket = create_ticket(client, other)
+
+    results = batch(client, owner, [
+        {"id": "own", "path": f"/tickets/{own_ticket}"},
+        {"id": "foreign", "path": f"/tickets/{foreign_ticket}"},
+        {"id": "missing", "path": "/tickets/999999"},
+        {"id": "no-route", "path": "/no-such-path"},
+        {"id": "nested", "method": "POST", "path": "/batch", "body": {"requests": []}},
+        {"id": "invalid", "method": "POST", "path": "/tickets/", "body": {"title": "t"}},
+    ])
+
+    assert [(r["id"], r["status"]) for r in results] == [
+        ("own", 200), ("foreign", 403), ("missing", 404), ("no-route", 404), ("nested", 400), ("invalid", 422),
+    ]
+    assert results[0]["body"]["id"] == own_ticket
+    assert results[0]["headers"]["etag"]
+
+def test_files_and_streams_are_rejected(client, make_user):
+    headers = make_user("client@example.com")
+    ticket_id = create_ticket(client, headers)
+    client.post(f"/tickets/{ticket_id}/attachments", files={"files": ("a.txt", b"abc", "text/plain")}, headers=headers)
+    attachment_id = client.get(f"/tickets/{ticket_id}/attachments", headers=headers).json()[0]["id"]
+
+    results = batch(client, headers, [
+        {"path": f"/tickets/attachments/{attachment_id}"},
+        {"path": f"/tickets/{ticket_id}/attachments.zip"},
+        {"path": f"/tickets/{ticket_id}/attachments"},
+    ])
+
+    assert [r["status"] for r in results] == [406, 406, 200]
+    assert results[0]["body"] is not None and "detail" in results[0]["body"]
+    assert results[2]["body"][0]["filename"] == "a.txt"
+
+def test_reads_see_preceding_writes(client, make_user):
+    customer = make_user("client@example.com")
+    agent = make_user("agent@example.com", "helpdesk")
+    ticket_id = create_ticket(client, customer)
+    path = f"/tickets/{ticket_id}"
+
+    results = batch(client, agent, [
+        {"path": path},
+        {"path": path},
+        {"method": "PATCH", "path": path, "body": {"status": "in_progress"}},
+        {"path": path},
+        {"path": path},
+    ])
+
+    assert [r["status"] for r in results] == [200] * 5
+    assert [r["body"]["status"] for r in results] == ["open", "open", "in_progress", "in_progress", "in_progress"]
+
+def test_failed_write_does_not_affect_later_items(client, make_user):
+    customer = make_user("client@example.com")
+    agent = make_user("agent@example.com", "helpdesk")
+    ticket_id = create_ticket(client, customer)
+    path = f"/tickets/{ticket_id}"
+
+    results = batch(client, agent, [
+        {"method": "PATCH", "path": path, "headers": {"If-Match": '"stale"'}, "body": {"status": "closed"}},
+        {"method": "PATCH", "path": "/tickets/999999", "body": {"status": "closed"}},
+        {"method": "POST", "path": f"{path}/comment", "body": {"content": "Sprawdzamy"}},
+        {"path": path},
+    ])
+
+    assert [r["status"] for r in results] == [412, 404, 200, 200]
+    assert results[3]["body"]["status"] == "open"
+    assert [c["content"] for c in results[3]["body"]["comments"]] == ["Sprawdzamy"]
+    with Session(engine) as session:
+        ticket = session.get(Ticket, ticket_id)
+        assert (ticket.status, ticket.comment_count) == ("open", 1)
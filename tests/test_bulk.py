@@ -0,0 +1,40 @@
+"""
+Eksport i import (python -m app.bulk) obejmują też archiwum: zgłoszenia,
+komentarze i załączniki wracają do tabel archiwum z nowymi identyfikatorami.
+"""
+from sqlmodel import Session, select
+from app.bulk import export_data, import_data
+from app.core.db import engine
+from app.models.archive import ArchivedTicket, ArchivedComment, ArchivedAttachment
+from app.models.ticket import Ticket
+from app.services.archive import archive_closed_tickets
+
+def test_export_and_import_include_archive(client, make_user, tmp_path):
+    customer = make_user("client@example.com")
+    agent = make_user("agent@example.com", "helpdesk")
+    archived_id = client.post("/tickets/", json={"title": "old", "description": "d"}, headers=customer).json()["id"]
+    client.post(f"/tickets/{archived_id}/comment", json={"content": "c"}, headers=agent)
+    client.post(
+        f"/tickets/{archived_id}/attachments", files={"files": ("a.txt", b"abc", "text/plain")}, headers=customer
+    )
+    client.patch(f"/tickets/{archived_id}", json={"status": "closed"}, headers=agent)
+    with Session(engine) as session:
+        assert archive_closed_tickets(session, older_than_days=0) == 1
+    hot_id = client.post("/tickets/", json={"title": "new", "description": "d"}, headers=customer).json()["id"]
+
+    export_data(str(tmp_path), "csv")
+    import_data(str(tmp_path), "csv")
+
+    with Session(engine) as session:
+        tickets = session.exec(select(Ticket).order_by(Ticket.id)).all()
+        archived = session.exec(select(ArchivedTicket).order_by(ArchivedTicket.id)).all()
+        comments = session.exec(select(ArchivedComment)).all()
+        attachments = session.exec(select(ArchivedAttachment)).all()
+    assert [t.title for t in tickets] == ["new", "new"]
+    assert [t.title for t in archived] == ["old", "old"]
+    imported = archived[1].id
+    # Identyfikatory archiwum i gorącej tabeli się nie pokrywają
+    assert imported not in {t.id for t in tickets} | {archived_id, hot_id}
+    assert sorted(c.ticket_id for c in comments) == [archived_id, imported]
+    assert sorted(a.ticket_id for a in attachments) == [archived_id, imported]
+    assert {a.path for a in attachments} == {f"attachments/{archived_id}/a.txt", f"attachments/{imported}/a.txt"}
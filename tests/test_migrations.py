@@ -0,0 +1,103 @@
+"""
+Migracje Alembic: schemat po alembic upgrade head ma odpowiadać modelom,
+a baza z create_all sprzed migracji (rewizja 0001 albo nowsze modele bez
+alembic_version) dostaje brakujące kolumny, indeksy i tabele.
+
+Zawsze na SQLite; na PostgreSQL po ustawieniu TEST_DATABASE_URL (pusta baza
+testowa - tabele są tworzone i usuwane przez test).
+"""
+import os
+import pkgutil
+import importlib
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, text
+from sqlmodel import SQLModel
+from app.core.db import ALEMBIC_INI, migrate
+import app.models
+
+# Porównanie z modelami wymaga wszystkich tabel w metadanych (jak w migrations/env.py)
+for module in pkgutil.iter_modules(app.models.__path__):
+    importlib.import_module(f"app.models.{module.name}")
+
+def alembic_config(conn) -> Config:
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["connection"] = conn
+    return config
+
+def schema_diff(conn) -> list:
+    # Warunków indeksów częściowych (i na SQLite indeksów wyrażeń) Alembic nie porównuje
+    return compare_metadata(MigrationContext.configure(conn), SQLModel.metadata)
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def engine(request, tmp_path):
+    if request.param == "sqlite":
+        engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    elif os.getenv("TEST_DATABASE_URL"):
+        engine = create_engine(os.environ["TEST_DATABASE_URL"])
+    else:
+        pytest.skip("TEST_DATABASE_URL nie jest ustawione")
+    yield engine
+    if request.param == "postgresql":
+        with engine.begin() as conn:
+            SQLModel.metadata.drop_all(conn)
+            conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    engine.dispose()
+
+def test_upgrade_matches_models(engine):
+    with engine.begin() as conn:
+        command.upgrade(alembic_config(conn), "head")
+    with engine.connect() as conn:
+        assert schema_diff(conn) == []
+
+def test_upgrade_backfills_existing_tickets(engine):
+    with engine.begin() as conn:
+        command.upgrade(alembic_config(conn), "0001")
+        conn.execute(text(
+            "INSERT INTO \"user\" (id, email, hashed_password, full_name, role, is_active) "
+            "VALUES (1, 'a@example.com', 'x', '', 'client', true)"
+        ))
+        conn.execute(text("INSERT INTO priority (id, name, level) VALUES (1, 'P2', 2)"))
+        conn.execute(text(
+            "INSERT INTO ticket (id, title, description, priority_id, created_by, status, created_at, updated_at) "
+            "VALUES (1, 't', 'd', 1, 1, 'open', '2026-01-01', '2026-01-02'), "
+            "(2, 'u', 'd', NULL, 1, 'closed', '2026-01-01', '2026-01-02')"
+        ))
+        conn.execute(text(
+            "INSERT INTO comment (ticket_id, author_id, content, created_at) "
+            "VALUES (1, 1, 'c', '2026-01-03'), (1, 1, 'c', '2026-01-04')"
+        ))
+        conn.execute(text(
+            "INSERT INTO attachment (ticket_id, filename, content_type, path, uploaded_at) "
+            "VALUES (2, 'f.txt', 'text/plain', 'uploads/2/f.txt', '2026-01-05')"
+        ))
+        command.upgrade(alembic_config(conn), "head")
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT id, priority_level, version, comment_count, attachment_count, last_comment_at, last_activity_at "
+            "FROM ticket ORDER BY id"
+        )).all()
+    assert [(r[0], r[1], r[2], r[3], r[4]) for r in rows] == [(1, 2, 1, 2, 0), (2, None, 1, 0, 1)]
+    assert str(rows[0][5]).startswith("2026-01-04") and str(rows[0][6]).startswith("2026-01-04")
+    assert rows[1][5] is None and str(rows[1][6]).startswith("2026-01-05")
+
+def test_migrate_database_created_by_create_all(engine):
+    with engine.begin() as conn:
+        SQLModel.metadata.create_all(conn)
+        migrate(conn)
+    with engine.connect() as conn:
+        version = conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        assert version == ScriptDirectory.from_config(Config(str(ALEMBIC_INI))).get_current_head()
+        assert schema_diff(conn) == []
+
+def test_downgrade_to_baseline(engine):
+    with engine.begin() as conn:
+        command.upgrade(alembic_config(conn), "head")
+        command.downgrade(alembic_config(conn), "0001")
+        command.upgrade(alembic_config(conn), "head")
+    with engine.connect() as conn:
+        assert schema_diff(conn) == []
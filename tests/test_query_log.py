@@ -0,0 +1,67 @@
+"""
+Detektor N+1 (assert_no_n_plus_one) na endpointach, które wczytują dane
+zbiorczo, i na pętli z zapytaniem na wiersz.
+"""
+import pytest
+from sqlmodel import Session
+from app.core.db import engine
+from app.core.query_log import assert_no_n_plus_one
+from app.models.user import User
+
+# Więcej wierszy niż domyślny próg N_PLUS_ONE_THRESHOLD (10)
+ROWS = 15
+
+@pytest.fixture
+def seeded(client, make_user):
+    """Admin, klient ze zgłoszeniami i agenci komentujący każde z nich."""
+    admin = make_user("admin@example.com", "admin")
+    customer = make_user("client@example.com")
+    agents = [make_user(f"agent{i:02d}@example.com", "helpdesk") for i in range(ROWS)]
+    ticket_ids = [
+        client.post("/tickets/", json={"title": f"t{i}", "description": "d"}, headers=customer).json()["id"]
+        for i in range(ROWS)
+    ]
+    for agent in agents:
+        for ticket_id in ticket_ids[:2]:
+            client.post(f"/tickets/{ticket_id}/comment", json={"content": "c"}, headers=agent)
+    return admin, ticket_ids
+
+def test_ticket_list_has_no_n_plus_one(client, seeded):
+    admin, _ = seeded
+    with assert_no_n_plus_one() as stats:
+        response = client.get("/tickets/?include_archived=true", headers=admin)
+    assert response.status_code == 200 and len(response.json()) == ROWS
+    assert stats.count > 0
+
+def test_ticket_detail_has_no_n_plus_one(client, seeded):
+    admin, ticket_ids = seeded
+    with assert_no_n_plus_one():
+        response = client.get(f"/tickets/{ticket_ids[0]}", headers=admin)
+    assert len(response.json()["comments"]) == ROWS
+
+def test_directory_has_no_n_plus_one(client, seeded):
+    admin, _ = seeded
+    with assert_no_n_plus_one():
+        response = client.get("/users/directory?limit=200", headers=admin)
+    assert response.status_code == 200 and len(response.json()["items"]) == ROWS + 2
+
+def test_batch_has_no_n_plus_one(client, seeded):
+    admin, ticket_ids = seeded
+    requests = [
+        {"path": "/tickets/"},
+        {"path": "/users/directory"},
+        {"path": f"/tickets/{ticket_ids[0]}"},
+        {"method": "PATCH", "path": f"/tickets/{ticket_ids[1]}", "body": {"status": "in_progress"}},
+    ]
+    with assert_no_n_plus_one():
+        response = client.post("/batch", json={"requests": requests}, headers=admin)
+    assert [item["status"] for item in response.json()] == [200, 200, 200, 200]
+
+def test_query_per_row_is_detected(client, seeded):
+    with Session(engine) as session:
+        user_ids = [user.id for user in session.query(User).all()]
+    with pytest.raises(AssertionError, match="N\\+1 query pattern detected"):
+        with assert_no_n_plus_one():
+            with Session(engine) as session:
+                for user_id in user_ids:
+                    session.get(User, user_id)
@@ -0,0 +1,125 @@
+"""
+Plany gorących zapytań na bazie z danymi zbliżonymi do produkcji.
+
+Zawsze na SQLite; na PostgreSQL po ustawieniu TEST_DATABASE_URL (pusta baza
+testowa - tabele są tworzone i usuwane przez test).
+"""
+import os
+import random
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlmodel import SQLModel
+from app.core.query_plans import HOT_QUERIES, check_query_plans, explain
+from app.api.tickets import ticket_list_query, queue_candidate_query
+from app.models.user import User
+from app.models.priority import Priority
+from app.models.category import Category
+from app.models.ticket import Ticket, Comment
+from app.models.attachment import Attachment
+from app.models.password_reset import PasswordResetToken
+
+USERS = 500
+TICKETS = 20000
+COMMENTS = 40000
+ATTACHMENTS = 5000
+RESET_TOKENS = 2000
+
+def seed(conn):
+    rnd = random.Random(42)
+    now = datetime(2026, 1, 1)
+    roles = ["client"] * 450 + ["helpdesk"] * 40 + ["admin"] * 10
+    conn.execute(insert(User), [
+        {"id": i + 1, "email": f"user{i:05d}@example.com", "full_name": f"User {i}",
+         "hashed_password": "x", "role": role, "is_active": rnd.random() > 0.05}
+        for i, role in enumerate(roles[:USERS])
+    ])
+    clients = [i + 1 for i, role in enumerate(roles) if role == "client"]
+    agents = [i + 1 for i, role in enumerate(roles) if role == "helpdesk"]
+    conn.execute(insert(Priority), [{"id": level, "name": f"P{level}", "level": level} for level in range(1, 5)])
+    conn.execute(insert(Category), [{"id": i, "name": f"C{i}"} for i in range(1, 6)])
+    tickets = []
+    for i in range(TICKETS):
+        status = rnd.choices(["closed", "resolved", "in_progress", "open"], [60, 10, 20, 10])[0]
+        created = now - timedelta(minutes=rnd.randrange(0, 60 * 24 * 365))
+        priority = rnd.choice([None, 1, 2, 3, 4])
+        tickets.append({
+            "id": i + 1, "title": f"t{i}", "description": "d",
+            "category_id": rnd.randrange(1, 6), "priority_id": priority, "priority_level": priority,
+            "created_by": rnd.choice(clients),
+            "assigned_to": None if status == "open" and rnd.random() < 0.7 else rnd.choice(agents),
+            "status": status, "created_at": created, "updated_at": created, "version": 1,
+            "comment_count": rnd.randrange(0, 20), "attachment_count": rnd.randrange(0, 5),
+            "last_activity_at": created + timedelta(minutes=rnd.randrange(0, 60 * 24 * 30)),
+        })
+    conn.execute(insert(Ticket), tickets)
+    conn.execute(insert(Comment), [
+        {"id": i + 1, "ticket_id": rnd.randrange(1, TICKETS + 1), "author_id": rnd.randrange(1, USERS + 1),
+         "content": "c", "created_at": now}
+        for i in range(COMMENTS)
+    ])
+    conn.execute(insert(Attachment), [
+        {"id": i + 1, "ticket_id": rnd.randrange(1, TICKETS + 1), "filename": "f.txt",
+         "content_type": "text/plain", "path": f"attachments/{i}/f.txt", "uploaded_at": now}
+        for i in range(ATTACHMENTS)
+    ])
+    conn.execute(insert(PasswordResetToken), [
+        {"id": i + 1, "email": f"user{rnd.randrange(USERS):05d}@example.com", "code": f"{i:06d}",
+         "expires_at": now - timedelta(days=1), "used": True}
+        for i in range(RESET_TOKENS)
+    ])
+    conn.exec_driver_sql("ANALYZE")
+
+def seeded_engine(url: str):
+    engine = create_engine(url)
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        seed(conn)
+    return engine
+
+@pytest.fixture(scope="module")
+def sqlite_engine(tmp_path_factory):
+    engine = seeded_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    yield engine
+    engine.dispose()
+
+@pytest.fixture(scope="module")
+def postgres_engine():
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL nie ustawiony")
+    engine = seeded_engine(url)
+    yield engine
+    SQLModel.metadata.drop_all(engine)
+    engine.dispose()
+
+def test_hot_queries_use_indexes_sqlite(sqlite_engine):
+    with sqlite_engine.begin() as conn:
+        assert check_query_plans(conn, disable_seqscan=False) == {}
+
+def test_claim_query_reads_queue_index_sqlite(sqlite_engine):
+    with sqlite_engine.begin() as conn:
+        assert "ix_ticket_queue" in explain(conn, queue_candidate_query())
+
+def test_client_list_reads_activity_index_sqlite(sqlite_engine):
+    with sqlite_engine.begin() as conn:
+        plan = explain(conn, ticket_list_query(1, "last_activity"))
+    assert "ix_ticket_created_by_activity" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_hot_queries_use_indexes_postgres(postgres_engine):
+    # Bez enable_seqscan=off - plan, który planner wybierze na danych po ANALYZE
+    with postgres_engine.begin() as conn:
+        assert check_query_plans(conn, disable_seqscan=False) == {}
+
+def test_claim_query_needs_no_sort_postgres(postgres_engine):
+    with postgres_engine.begin() as conn:
+        plan = explain(conn, queue_candidate_query())
+    assert "ix_ticket_queue" in plan
+    assert "Sort" not in plan
+
+def test_every_hot_query_is_registered():
+    # Zabezpieczenie przed literówką w HOT_QUERIES - każdy wpis buduje zapytanie
+    for name, build in HOT_QUERIES.items():
+        assert build() is not None, name
@@ -0,0 +1,48 @@
+"""
+Kolejka zgłoszeń (POST /tickets/queue/claim): równolegli agenci nie dostają
+tego samego zgłoszenia, a przypisanie trafia do historii zgłoszenia.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from sqlmodel import Session, select
+from app.core.db import engine
+from app.models.notification import Notification
+
+TICKETS = 20
+
+def test_concurrent_claims_never_share_a_ticket(client, make_user):
+    customer = make_user("client@example.com")
+    agents = [make_user(f"agent{i}@example.com", "helpdesk") for i in range(4)]
+    for i in range(TICKETS):
+        client.post("/tickets/", json={"title": f"t{i}", "description": "d"}, headers=customer)
+
+    def claim_all(headers):
+        claimed = []
+        while True:
+            response = client.post("/tickets/queue/claim", headers=headers)
+            if response.status_code == 404:
+                return claimed
+            # 409: na SQLite (bez SKIP LOCKED) wszystkie próby przegrały wyścig - klient ponawia
+            if response.status_code == 409:
+                continue
+            assert response.status_code == 200, response.text
+            claimed.append(response.json()["id"])
+
+    with ThreadPoolExecutor(max_workers=len(agents) * 2) as pool:
+        results = list(pool.map(claim_all, agents * 2))
+    claimed = [ticket_id for result in results for ticket_id in result]
+    assert len(claimed) == TICKETS
+    assert len(set(claimed)) == TICKETS
+
+def test_claim_records_assignment_event(client, make_user):
+    customer = make_user("client@example.com")
+    agent = make_user("agent@example.com", "helpdesk")
+    ticket = client.post("/tickets/", json={"title": "t", "description": "d"}, headers=customer).json()
+
+    claimed = client.post("/tickets/queue/claim", headers=agent).json()
+
+    assert claimed["id"] == ticket["id"]
+    with Session(engine) as session:
+        events = session.exec(select(Notification).where(Notification.ticket_id == ticket["id"])).all()
+    assert [(n.event, n.message) for n in events] == [
+        ("assigned", f"Zgłoszenie przypisane do użytkownika #{claimed['assigned_to']}")
+    ]
@@ -0,0 +1,77 @@
+"""
+Kolejka terminów SLA: naruszenia w kolejności terminów, jedno zdarzenie na
+termin i przejęcie kolejki przez kolejny worker po zwolnieniu blokady.
+"""
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from sqlmodel import Session, select
+from app.core.db import engine
+from app.models.notification import Notification
+from app.models.sla_breach import SlaBreach
+from app.models.ticket import Ticket
+from app.services import sla
+
+def test_deadlines_pop_in_due_order():
+    queue = sla.DeadlineQueue()
+    now = datetime.utcnow()
+    queue.schedule(1, sla.RESOLUTION, now - timedelta(minutes=1))
+    queue.schedule(2, sla.FIRST_RESPONSE, now - timedelta(minutes=3))
+    queue.schedule(3, sla.FIRST_RESPONSE, now - timedelta(minutes=2))
+    # Zmieniony termin - stary wpis w kopcu jest pomijany
+    queue.schedule(1, sla.RESOLUTION, now - timedelta(minutes=4))
+    # Spełniony termin znika z kolejki
+    queue.schedule(3, sla.FIRST_RESPONSE, None)
+
+    assert [queue.pop_due()[:2] for _ in range(2)] == [(1, sla.RESOLUTION), (2, sla.FIRST_RESPONSE)]
+    assert len(queue) == 0
+    queue.stop()
+    assert queue.pop_due() is None
+
+def test_future_deadline_waits():
+    queue = sla.DeadlineQueue()
+    queue.schedule(1, sla.FIRST_RESPONSE, datetime.utcnow() + timedelta(seconds=0.2))
+    started = time.monotonic()
+    assert queue.pop_due()[:2] == (1, sla.FIRST_RESPONSE)
+    assert time.monotonic() - started >= 0.15
+
+def test_overdue_ticket_records_one_breach(client, make_user):
+    customer = make_user("client@example.com")
+    make_user("admin@example.com", "admin")
+    ticket_id = client.post("/tickets/", json={"title": "t", "description": "d"}, headers=customer).json()["id"]
+    due = datetime.utcnow().replace(microsecond=0) - timedelta(minutes=5)
+    with Session(engine) as session:
+        session.exec(update(Ticket).where(Ticket.id == ticket_id).values(first_response_due=due))
+        session.commit()
+
+    # Właściciel kolejki (worker testów) wczytuje terminy z bazy - wątek sla-timer zapisuje naruszenie
+    with Session(engine) as session:
+        sla.load_pending(session)
+    deadline = time.monotonic() + 5
+    while True:
+        with Session(engine) as session:
+            breaches = session.exec(select(SlaBreach).where(SlaBreach.ticket_id == ticket_id)).all()
+        if breaches or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+
+    assert [(b.kind, b.due_at) for b in breaches] == [(sla.FIRST_RESPONSE, due)]
+    # Ten sam termin po zmianie właściciela - bez drugiego zdarzenia
+    assert sla.record_breach(ticket_id, sla.FIRST_RESPONSE, due) is False
+    with Session(engine) as session:
+        events = session.exec(select(Notification.event).where(Notification.ticket_id == ticket_id)).all()
+    assert events == ["sla_breach"]
+
+def test_second_worker_takes_over_after_release(client):
+    owner = sla.ownership
+    assert owner.held
+    standby = sla.OwnershipLock()
+    try:
+        assert standby.try_acquire() is False
+        owner.release()
+        assert standby.try_acquire() is True
+        assert owner.try_acquire() is False
+    finally:
+        standby.release()
+        # Przywracamy właściciela workera testów
+        assert owner.try_acquire() is True
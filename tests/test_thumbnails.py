@@ -0,0 +1,58 @@
+"""
+Miniatury załączników: brakujący hash treści zapisywany poza sesją żądania,
+usunięcie załącznika sprząta miniatury ostatniej kopii pliku.
+"""
+import io
+import os
+import pytest
+from sqlalchemy import update
+from sqlmodel import Session
+from app.core.db import engine
+from app.models.attachment import Attachment
+from app.services.thumbnails import Image, thumbnail_path
+
+pytestmark = pytest.mark.skipif(Image is None, reason="miniatury wymagają Pillow")
+
+def png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+def upload_image(client, headers, filename: str = "a.png") -> int:
+    ticket_id = client.post("/tickets/", json={"title": "t", "description": "d"}, headers=headers).json()["id"]
+    client.post(f"/tickets/{ticket_id}/attachments", files={"files": (filename, png(), "image/png")}, headers=headers)
+    return client.get(f"/tickets/{ticket_id}/attachments", headers=headers).json()[0]["id"]
+
+def test_thumbnail_backfills_missing_hash(client, make_user):
+    headers = make_user("client@example.com")
+    attachment_id = upload_image(client, headers)
+    with Session(engine) as session:
+        # Załącznik sprzed migracji - bez hasha
+        session.exec(update(Attachment).where(Attachment.id == attachment_id).values(content_hash=None))
+        session.commit()
+
+    response = client.get(f"/tickets/attachments/{attachment_id}/thumbnail", headers=headers)
+
+    assert response.status_code == 200
+    with Session(engine) as session:
+        content_hash = session.get(Attachment, attachment_id).content_hash
+    assert content_hash and response.headers["ETag"] == f'"{content_hash}-thumbnail"'
+    response = client.get(
+        f"/tickets/attachments/{attachment_id}/thumbnail",
+        headers={**headers, "If-None-Match": response.headers["ETag"]}
+    )
+    assert response.status_code == 304
+
+def test_delete_removes_thumbnails(client, make_user):
+    headers = make_user("client@example.com")
+    attachment_id = upload_image(client, headers)
+    assert client.get(f"/tickets/attachments/{attachment_id}/thumbnail", headers=headers).status_code == 200
+    with Session(engine) as session:
+        att = session.get(Attachment, attachment_id)
+        target = thumbnail_path(att.path, att.content_hash, "thumbnail")
+    assert os.path.exists(target)
+
+    response = client.delete(f"/tickets/attachments/{attachment_id}", headers=headers)
+
+    assert response.status_code == 200
+    assert not os.path.exists(target)
@@ -0,0 +1,87 @@
+"""
+Wersje zgłoszeń: każda zmiana pól TicketRead zmienia ETag, a wyścig zapisów
+kończy się 412 tylko dla klienta z If-Match.
+"""
+from fastapi import HTTPException, Response
+import pytest
+from sqlalchemy import update
+from sqlmodel import Session, select
+from app.api.tickets import TicketUpdate, update_ticket
+from app.core.db import engine
+from app.models.ticket import Ticket
+from app.models.user import User
+
+def create_ticket(client, headers) -> int:
+    return client.post("/tickets/", json={"title": "t", "description": "d"}, headers=headers).json()["id"]
+
+def etag(client, ticket_id: int, headers) -> str:
+    response = client.get(f"/tickets/{ticket_id}", headers=headers)
+    assert response.status_code == 200
+    return response.headers["ETag"]
+
+def test_attachment_upload_changes_etag(client, make_user):
+    headers = make_user("client@example.com")
+    ticket_id = create_ticket(client, headers)
+    before = etag(client, ticket_id, headers)
+
+    client.post(f"/tickets/{ticket_id}/attachments", files={"files": ("a.txt", b"abc", "text/plain")}, headers=headers)
+
+    response = client.get(f"/tickets/{ticket_id}", headers={**headers, "If-None-Match": before})
+    assert response.status_code == 200
+    assert response.json()["attachment_count"] == 1
+    attachment_id = client.get(f"/tickets/{ticket_id}/attachments", headers=headers).json()[0]["id"]
+    after_upload = response.headers["ETag"]
+
+    client.delete(f"/tickets/attachments/{attachment_id}", headers=headers)
+
+    response = client.get(f"/tickets/{ticket_id}", headers={**headers, "If-None-Match": after_upload})
+    assert response.status_code == 200
+    assert response.json()["attachment_count"] == 0
+
+def test_resumable_upload_changes_etag(client, make_user):
+    headers = make_user("client@example.com")
+    ticket_id = create_ticket(client, headers)
+    before = etag(client, ticket_id, headers)
+    upload_id = client.post(
+        f"/tickets/{ticket_id}/uploads", json={"filename": "a.bin", "size": 3}, headers=headers
+    ).json()["upload_id"]
+    client.patch(
+        f"/tickets/uploads/{upload_id}", content=b"abc",
+        headers={**headers, "Upload-Offset": "0", "Content-Type": "application/offset+octet-stream"}
+    )
+    assert client.post(f"/tickets/uploads/{upload_id}/finalize", headers=headers).status_code == 201
+
+    response = client.get(f"/tickets/{ticket_id}", headers={**headers, "If-None-Match": before})
+    assert response.status_code == 200
+    assert response.json()["attachment_count"] == 1
+
+def stale_update(ticket_id: int, email: str, if_match=None):
+    """update_ticket na sesji, która wczytała zgłoszenie przed cudzym zapisem."""
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.email == email)).one()
+        stale = session.get(Ticket, ticket_id)
+        with Session(engine) as other:
+            other.exec(update(Ticket).where(Ticket.id == ticket_id).values(version=Ticket.version + 1))
+            other.commit()
+        assert stale.version == 1
+        return update_ticket(ticket_id, TicketUpdate(status="in_progress"), Response(), if_match, user, session)
+
+def test_lost_race_without_if_match_is_retried(client, make_user):
+    ticket_id = create_ticket(client, make_user("client@example.com"))
+    make_user("agent@example.com", "helpdesk")
+
+    ticket = stale_update(ticket_id, "agent@example.com")
+
+    assert ticket.status == "in_progress"
+    assert ticket.version == 3
+
+def test_lost_race_with_if_match_fails(client, make_user):
+    headers = make_user("client@example.com")
+    ticket_id = create_ticket(client, headers)
+    make_user("agent@example.com", "helpdesk")
+    current = etag(client, ticket_id, headers)
+
+    with pytest.raises(HTTPException) as error:
+        stale_update(ticket_id, "agent@example.com", if_match=current)
+
+    assert error.value.status_code == 412
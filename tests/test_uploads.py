@@ -0,0 +1,71 @@
+"""
+Wznawialny upload (PATCH z Upload-Offset, finalize) i sprzątanie
+przeterminowanych sesji.
+"""
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from sqlmodel import Session
+from app.api.uploads import expire_uploads
+from app.core.db import engine
+from app.models.upload import UploadSession
+
+DATA = b"0123456789"
+
+def create_upload(client, headers, filename="a.bin", size=len(DATA)) -> str:
+    ticket_id = client.post("/tickets/", json={"title": "t", "description": "d"}, headers=headers).json()["id"]
+    response = client.post(f"/tickets/{ticket_id}/uploads", json={"filename": filename, "size": size}, headers=headers)
+    assert response.status_code == 201
+    return response.json()["upload_id"]
+
+def send_chunk(client, headers, upload_id: str, offset: int, chunk: bytes):
+    return client.patch(
+        f"/tickets/uploads/{upload_id}", content=chunk,
+        headers={**headers, "Upload-Offset": str(offset), "Content-Type": "application/offset+octet-stream"}
+    )
+
+def test_offset_mismatch_is_rejected(client, make_user):
+    headers = make_user("client@example.com")
+    upload_id = create_upload(client, headers)
+    assert send_chunk(client, headers, upload_id, 0, DATA[:4]).status_code == 204
+
+    response = send_chunk(client, headers, upload_id, 0, DATA[:4])
+
+    assert response.status_code == 409
+    assert response.headers["Upload-Offset"] == "4"
+    assert send_chunk(client, headers, upload_id, 4, DATA[4:]).status_code == 204
+
+def test_upload_can_be_finalized_once(client, make_user):
+    headers = make_user("client@example.com")
+    upload_id = create_upload(client, headers)
+    assert client.post(f"/tickets/uploads/{upload_id}/finalize", headers=headers).status_code == 409
+    send_chunk(client, headers, upload_id, 0, DATA)
+
+    first = client.post(f"/tickets/uploads/{upload_id}/finalize", headers=headers)
+    second = client.post(f"/tickets/uploads/{upload_id}/finalize", headers=headers)
+
+    assert first.status_code == 201
+    assert second.status_code == 404
+    attachment = client.get(f"/tickets/attachments/{first.json()['id']}", headers=headers)
+    assert attachment.content == DATA
+
+def test_sweeper_removes_expired_uploads(client, make_user):
+    headers = make_user("client@example.com")
+    expired_id = create_upload(client, headers, "expired.bin")
+    active_id = create_upload(client, headers, "active.bin")
+    send_chunk(client, headers, expired_id, 0, DATA[:4])
+    with Session(engine) as session:
+        paths = {u.id: u.path for u in (session.get(UploadSession, expired_id), session.get(UploadSession, active_id))}
+        session.exec(
+            update(UploadSession)
+            .where(UploadSession.id == expired_id)
+            .values(expires_at=datetime.utcnow() - timedelta(minutes=1))
+        )
+        session.commit()
+
+        assert expire_uploads(session) == 1
+
+    assert client.get(f"/tickets/uploads/{expired_id}", headers=headers).status_code == 404
+    assert client.get(f"/tickets/uploads/{active_id}", headers=headers).status_code == 200
+    assert not os.path.exists(paths[expired_id])
+    assert os.path.exists(paths[active_id])